@@ -1,10 +1,65 @@
+import json
 from django.contrib import admin
+from django.db import models
 from django.utils import timezone
-from .models import ActivityLog, SecurityEvent
+from .filters import AutocompleteFilter
+from .models import DETAIL_FIELDS, ActivityLog, SecurityEvent
+from .paginators import EstimatedCountPaginator
+from .services.log_exporter import LogExporter
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist settings for the append-only log tables: estimated counts,
+    no second unfiltered COUNT(*), and JSON/text columns of the row and its
+    select_related relations left out of the changelist query.
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    changelist_related = ()
+
+    class Media:
+        css = {
+            'all': ('admin/css/vendor/select2/select2.min.css', 'admin/css/autocomplete.css')
+        }
+        js = (
+            'admin/js/vendor/jquery/jquery.min.js',
+            'admin/js/vendor/select2/select2.full.min.js',
+            'admin/js/jquery.init.js',
+            'admin/js/autocomplete.js',
+            'activities/js/autocomplete_filter.js',
+        )
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        match = getattr(request, 'resolver_match', None)
+        if match is not None and match.url_name and match.url_name.endswith('_changelist'):
+            deferred = self._heavy_columns(self.model)
+            for relation in self.changelist_related:
+                related_model = self.model._meta.get_field(relation).related_model
+                deferred += [f'{relation}__{name}' for name in self._heavy_columns(related_model)]
+            queryset = queryset.defer(*deferred)
+        return queryset
+
+    @admin.action(description='Export selected rows as CSV')
+    def export_csv(self, request, queryset):
+        return LogExporter.response(queryset, 'csv', request=request)
+
+    @admin.action(description='Export selected rows as JSON Lines')
+    def export_jsonl(self, request, queryset):
+        return LogExporter.response(queryset, 'jsonl', request=request)
+
+    def _heavy_columns(self, model):
+        displayed = set(self.list_display)
+        return [
+            field.name for field in model._meta.concrete_fields
+            if isinstance(field, (models.JSONField, models.TextField)) and field.name not in displayed
+        ]
 
 
 @admin.register(ActivityLog)
-class ActivityLogAdmin(admin.ModelAdmin):
+class ActivityLogAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         'action_name',
         'house',
@@ -26,7 +81,9 @@ class ActivityLogAdmin(admin.ModelAdmin):
         'is_billable',          # NEW
         'device_platform',      # NEW
         'created_at',
-        'house',
+        ('house', AutocompleteFilter),
+        ('component', AutocompleteFilter),
+        ('user', AutocompleteFilter),
         'action_type',
         'source'
     )
@@ -41,8 +98,10 @@ class ActivityLogAdmin(admin.ModelAdmin):
         'session_id',           # NEW
         'request_id'            # NEW
     )
-    readonly_fields = ('created_at', 'updated_at')
-    date_hierarchy = 'created_at'
+    # Detail fields are properties backed by activity_log_detail
+    readonly_fields = ('created_at', 'updated_at') + DETAIL_FIELDS
+    changelist_related = ('user', 'house', 'component')
+    actions = ['export_csv', 'export_jsonl']
 
     # Permission methods for security:
     def has_add_permission(self, request):
@@ -119,6 +178,27 @@ class ActivityLogAdmin(admin.ModelAdmin):
         queryset = queryset.select_related('user', 'house', 'component', 'action_type')
         return queryset
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        A JSON object searches action_parameters/action_result by containment,
+        anything else also hits the full-text index
+        """
+        search_term = search_term.strip()
+        if search_term.startswith('{'):
+            try:
+                payload = json.loads(search_term)
+            except json.JSONDecodeError:
+                payload = None
+            if isinstance(payload, dict):
+                matches = (queryset.payload_contains(parameters=payload) |
+                           queryset.payload_contains(result=payload))
+                return matches, False
+
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results = results | queryset.search(search_term)
+        return results, may_have_duplicates
+
     # Optional: Add custom column for action_parameters preview
     def action_params_preview(self, obj):
         """Show a preview of action parameters"""
@@ -131,7 +211,7 @@ class ActivityLogAdmin(admin.ModelAdmin):
 
 
 @admin.register(SecurityEvent)
-class SecurityEventAdmin(admin.ModelAdmin):
+class SecurityEventAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = (
         'event_type',
         'severity',
@@ -147,7 +227,9 @@ class SecurityEventAdmin(admin.ModelAdmin):
         'severity',
         'is_resolved',
         'created_at',
-        'house'
+        ('house', AutocompleteFilter),
+        ('component', AutocompleteFilter),
+        ('user', AutocompleteFilter)
     )
     search_fields = (
         'event_type',
@@ -162,7 +244,7 @@ class SecurityEventAdmin(admin.ModelAdmin):
         'session_id'            # NEW
     )
     readonly_fields = ('created_at', 'resolved_at')
-    date_hierarchy = 'created_at'
+    changelist_related = ('user', 'house', 'component')
 
     fieldsets = (
         ('Event Details', {
@@ -208,7 +290,7 @@ class SecurityEventAdmin(admin.ModelAdmin):
         queryset = queryset.select_related('user', 'house', 'component', 'resolved_by')
         return queryset
 
-    actions = ['mark_as_resolved']
+    actions = ['mark_as_resolved', 'export_csv', 'export_jsonl']
 
     def mark_as_resolved(self, request, queryset):
         updated = queryset.update(
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ActivitiesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'activities'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .services.query_budget import install_query_recorder
+        connection_created.connect(install_query_recorder, dispatch_uid='activities.query_budget')
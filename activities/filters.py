@@ -0,0 +1,46 @@
+from django.contrib import admin
+from django.urls import reverse
+
+
+class AutocompleteFilter(admin.FieldListFilter):
+    """
+    Sidebar filter for a foreign key that searches options through the admin
+    autocomplete view instead of rendering every related row.
+
+    The related model must be registered in the admin with search_fields.
+    Usage: list_filter = (('house', AutocompleteFilter), ...)
+    """
+
+    template = 'admin/activities/autocomplete_filter.html'
+
+    def __init__(self, field, request, params, model, model_admin, field_path):
+        self.lookup_kwarg = f'{field_path}__{field.target_field.name}__exact'
+        super().__init__(field, request, params, model, model_admin, field_path)
+        value = self.used_parameters.get(self.lookup_kwarg)
+        self.lookup_val = value[-1] if isinstance(value, list) else value
+        self.source_model = model
+
+    def expected_parameters(self):
+        return [self.lookup_kwarg]
+
+    def get_facet_counts(self, pk_attname, filtered_qs):
+        return {}
+
+    def choices(self, changelist):
+        selected = None
+        if self.lookup_val:
+            remote_model = self.field.remote_field.model
+            selected = remote_model._default_manager.filter(
+                **{self.field.target_field.name: self.lookup_val}
+            ).first()
+        yield {
+            'selected': selected is not None,
+            'value': self.lookup_val,
+            'display': str(selected) if selected is not None else '',
+            'query_string': changelist.get_query_string(remove=[self.lookup_kwarg]),
+            'parameter_name': self.lookup_kwarg,
+            'ajax_url': reverse(f'{changelist.model_admin.admin_site.name}:autocomplete'),
+            'app_label': self.source_model._meta.app_label,
+            'model_name': self.source_model._meta.model_name,
+            'field_name': self.field.name,
+        }
@@ -0,0 +1,151 @@
+"""
+Django management command to benchmark activity log search on a synthetic table
+
+Builds activity_log_detail_bench (same layout as activity_log_detail, including
+the generated search_vector column), fills it with synthetic rows and compares:
+    • ILIKE sequential scans over user_agent / JSON text
+    • tsvector full-text search through the GIN index
+    • jsonb @> containment with and without the jsonb_path_ops GIN index
+
+Usage:
+    python manage.py benchmark_activity_search --rows=10000000
+    python manage.py benchmark_activity_search --rows=1000000 --keep
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+BENCH_TABLE = 'activity_log_detail_bench'
+
+POPULATE_SQL = f"""
+INSERT INTO {BENCH_TABLE} (
+    log_id, action_parameters, action_result, automation_source, user_agent, request_path,
+    app_version, firmware_version, subscription_tier
+)
+SELECT
+    md5(g::text || %(salt)s)::uuid,
+    jsonb_build_object(
+        'component_id', md5((g %% 50000)::text)::uuid,
+        'parameters', jsonb_build_object('brightness', g %% 100),
+        'source', (ARRAY['mobile_app', 'web_app', 'api'])[1 + g %% 3]
+    ),
+    CASE WHEN g %% 50 = 0
+        THEN jsonb_build_object('success', false, 'error_code', 'CONTROL_ERROR',
+                                'error_message', 'Device not responding')
+        ELSE jsonb_build_object('success', true, 'device_status', 'online')
+    END,
+    '',
+    (ARRAY['Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X)',
+           'Mozilla/5.0 (Android 11; Mobile)',
+           'Mozilla/5.0 (Windows NT 10.0; Win64; x64)',
+           'SmartHomeApp/2.1.0',
+           'ESP32HTTPClient/' || (g %% 7)::text])[1 + g %% 5],
+    '', '', '', ''
+FROM generate_series(1, %(rows)s) AS g
+"""
+
+QUERIES = [
+    ('ILIKE user_agent (seq scan)',
+     f"SELECT count(*) FROM {BENCH_TABLE} WHERE user_agent ILIKE '%ESP32HTTPClient/3%'"),
+    ('ILIKE result::text (seq scan)',
+     f"SELECT count(*) FROM {BENCH_TABLE} WHERE action_result::text ILIKE '%CONTROL_ERROR%'"),
+    ('tsvector @@ websearch_to_tsquery',
+     f"SELECT count(*) FROM {BENCH_TABLE} "
+     f"WHERE search_vector @@ websearch_to_tsquery('simple', 'CONTROL_ERROR')"),
+    ('jsonb @> containment',
+     f"SELECT count(*) FROM {BENCH_TABLE} WHERE action_result @> '{{\"error_code\": \"CONTROL_ERROR\"}}'"),
+]
+
+
+class Command(BaseCommand):
+    help = 'Benchmark full-text and JSON containment search on a synthetic activity log table (Postgres only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10_000_000,
+            help='Number of synthetic rows (default: 10000000)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=3,
+            help='Runs per query, the best time is reported (default: 3)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help=f'Keep {BENCH_TABLE} after the run'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs PostgreSQL (tsvector / jsonb GIN indexes).')
+
+        rows = options['rows']
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'activity_log_detail' AND column_name = 'search_vector'"
+            )
+            if cursor.fetchone() is None:
+                raise CommandError('activity_log_detail.search_vector is missing, run migrate first.')
+
+            self.stdout.write(f'📦 Building {BENCH_TABLE} with {rows:,} rows...')
+            cursor.execute(f'DROP TABLE IF EXISTS {BENCH_TABLE}')
+            cursor.execute(
+                f'CREATE UNLOGGED TABLE {BENCH_TABLE} '
+                f'(LIKE activity_log_detail INCLUDING DEFAULTS INCLUDING GENERATED)'
+            )
+            started = time.perf_counter()
+            cursor.execute(POPULATE_SQL, {'rows': rows, 'salt': str(time.time())})
+            self.stdout.write(f'   Loaded in {time.perf_counter() - started:.1f}s')
+
+            self.stdout.write('')
+            self.stdout.write('⏱  Without indexes:')
+            cursor.execute(f'ANALYZE {BENCH_TABLE}')
+            self._run_queries(cursor, options['repeat'])
+
+            self.stdout.write('')
+            self.stdout.write('📇 Creating GIN indexes...')
+            for statement in (
+                f'CREATE INDEX ON {BENCH_TABLE} USING gin (search_vector)',
+                f'CREATE INDEX ON {BENCH_TABLE} USING gin (action_parameters jsonb_path_ops)',
+                f'CREATE INDEX ON {BENCH_TABLE} USING gin (action_result jsonb_path_ops)',
+            ):
+                started = time.perf_counter()
+                cursor.execute(statement)
+                self.stdout.write(f'   {statement.split(" USING ")[1]}: {time.perf_counter() - started:.1f}s')
+            cursor.execute(f'ANALYZE {BENCH_TABLE}')
+            cursor.execute(
+                "SELECT pg_size_pretty(pg_relation_size(%s)), pg_size_pretty(pg_indexes_size(%s))",
+                [BENCH_TABLE, BENCH_TABLE]
+            )
+            heap_size, index_size = cursor.fetchone()
+            self.stdout.write(f'   Heap: {heap_size}, indexes: {index_size}')
+
+            self.stdout.write('')
+            self.stdout.write('⏱  With GIN indexes:')
+            self._run_queries(cursor, options['repeat'])
+
+            if not options['keep']:
+                cursor.execute(f'DROP TABLE {BENCH_TABLE}')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark finished'))
+
+    def _run_queries(self, cursor, repeat):
+        for label, sql in QUERIES:
+            best = None
+            for _ in range(max(repeat, 1)):
+                started = time.perf_counter()
+                cursor.execute(sql)
+                matched = cursor.fetchone()[0]
+                elapsed = time.perf_counter() - started
+                best = elapsed if best is None else min(best, elapsed)
+            cursor.execute('EXPLAIN ' + sql)
+            plan = ' '.join(line[0].strip() for line in cursor.fetchall()[:3])
+            self.stdout.write(f'   {label:<36} {best * 1000:>10.1f} ms  ({matched:,} rows)')
+            self.stdout.write(f'      {plan[:140]}')
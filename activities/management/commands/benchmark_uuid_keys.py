@@ -0,0 +1,163 @@
+"""
+Django management command to compare uuid4 and uuid7 primary keys under an
+append-heavy insert load
+
+Creates uuid_key_bench_v4 / uuid_key_bench_v7 (id uuid primary key plus a
+created_at and a small payload, like a narrow activity_log), inserts the same
+number of rows into each in batches and reports:
+    • insert throughput, overall and per fifth of the run (uuid4 slows
+      down as the index outgrows shared_buffers)
+    • primary key index size, and leaf density / fragmentation when the
+      pgstattuple extension is available
+    • WAL bytes written per table (full page images from page splits)
+
+Ids are generated in SQL in both cases (gen_random_uuid() needs PostgreSQL
+13+) so only the key order differs.
+
+Usage:
+    python manage.py benchmark_uuid_keys --rows=10000000
+    python manage.py benchmark_uuid_keys --rows=1000000 --batch-size=10000 --keep
+"""
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+
+TABLES = {
+    'uuid4': 'uuid_key_bench_v4',
+    'uuid7': 'uuid_key_bench_v7',
+}
+
+# 48-bit millisecond timestamp, version nibble, 12 random bits, variant and
+# 62 random bits - the same layout as activities.ids.uuid7
+UUID7_SQL = (
+    "(lpad(to_hex(floor(extract(epoch FROM clock_timestamp()) * 1000)::bigint), 12, '0')"
+    " || '7' || substr(md5(random()::text), 1, 3)"
+    " || to_hex(8 + floor(random() * 4)::int) || substr(md5(random()::text), 1, 15))::uuid"
+)
+UUID4_SQL = "gen_random_uuid()"
+
+INSERT_SQL = """
+INSERT INTO {table} (id, created_at, payload)
+SELECT {id_sql}, clock_timestamp(), 'device_control'
+FROM generate_series(1, %s)
+"""
+
+
+class Command(BaseCommand):
+    help = 'Benchmark insert throughput and index size of uuid4 vs uuid7 primary keys (Postgres only)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10_000_000,
+            help='Rows inserted per key type (default: 10000000)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50_000,
+            help='Rows per INSERT statement (default: 50000)'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark tables after the run'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('This benchmark needs PostgreSQL (index size and WAL statistics).')
+
+        rows = options['rows']
+        batch_size = max(options['batch_size'], 1)
+        results = {}
+
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'")
+            has_pgstattuple = cursor.fetchone() is not None
+
+            for key_type, table in TABLES.items():
+                self.stdout.write(f'📦 {key_type}: inserting {rows:,} rows into {table}...')
+                cursor.execute(f'DROP TABLE IF EXISTS {table}')
+                cursor.execute(
+                    f'CREATE TABLE {table} (id uuid PRIMARY KEY, created_at timestamptz NOT NULL, payload text)'
+                )
+                id_sql = UUID7_SQL if key_type == 'uuid7' else UUID4_SQL
+                statement = INSERT_SQL.format(table=table, id_sql=id_sql)
+
+                cursor.execute('SELECT pg_current_wal_lsn()')
+                wal_start = cursor.fetchone()[0]
+                started = window_started = time.perf_counter()
+                inserted = window_rows = 0
+                report_every = max(rows // 5, batch_size)
+                while inserted < rows:
+                    count = min(batch_size, rows - inserted)
+                    cursor.execute(statement, [count])
+                    inserted += count
+                    window_rows += count
+                    if window_rows >= report_every or inserted == rows:
+                        elapsed = time.perf_counter() - window_started
+                        self.stdout.write(
+                            f'   {inserted:>12,} rows  {window_rows / elapsed:>10,.0f} rows/s (last window)'
+                        )
+                        window_started = time.perf_counter()
+                        window_rows = 0
+                seconds = time.perf_counter() - started
+
+                cursor.execute('SELECT pg_wal_lsn_diff(pg_current_wal_lsn(), %s)', [wal_start])
+                wal_bytes = int(cursor.fetchone()[0])
+                cursor.execute(f'ANALYZE {table}')
+                cursor.execute(
+                    'SELECT pg_relation_size(%s), pg_relation_size(%s)',
+                    [table, f'{table}_pkey']
+                )
+                heap_bytes, index_bytes = cursor.fetchone()
+                density = fragmentation = None
+                if has_pgstattuple:
+                    cursor.execute(
+                        'SELECT avg_leaf_density, leaf_fragmentation FROM pgstatindex(%s)',
+                        [f'{table}_pkey']
+                    )
+                    density, fragmentation = cursor.fetchone()
+
+                results[key_type] = {
+                    'rows_per_second': rows / seconds if seconds else 0,
+                    'seconds': seconds,
+                    'heap_bytes': heap_bytes,
+                    'index_bytes': index_bytes,
+                    'wal_bytes': wal_bytes,
+                    'density': density,
+                    'fragmentation': fragmentation,
+                }
+
+            if not options['keep']:
+                for table in TABLES.values():
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
+
+        self.stdout.write('')
+        self.stdout.write(f'{"":<22}{"uuid4":>16}{"uuid7":>16}')
+        self._row('Insert time', results, lambda r: f"{r['seconds']:.1f}s")
+        self._row('Throughput', results, lambda r: f"{r['rows_per_second']:,.0f}/s")
+        self._row('Heap size', results, lambda r: self._size(r['heap_bytes']))
+        self._row('PK index size', results, lambda r: self._size(r['index_bytes']))
+        self._row('WAL written', results, lambda r: self._size(r['wal_bytes']))
+        if results['uuid4']['density'] is not None:
+            self._row('Leaf density', results, lambda r: f"{r['density']:.1f}%")
+            self._row('Leaf fragmentation', results, lambda r: f"{r['fragmentation']:.1f}%")
+        else:
+            self.stdout.write('   (CREATE EXTENSION pgstattuple for leaf density / fragmentation)')
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS('✅ Benchmark finished'))
+
+    def _row(self, label, results, render):
+        self.stdout.write(f'{label:<22}{render(results["uuid4"]):>16}{render(results["uuid7"]):>16}')
+
+    @staticmethod
+    def _size(num_bytes):
+        for unit in ('B', 'kB', 'MB', 'GB'):
+            if num_bytes < 1024 or unit == 'GB':
+                return f'{num_bytes:.1f} {unit}' if unit != 'B' else f'{num_bytes} B'
+            num_bytes /= 1024
@@ -1,14 +1,66 @@
 """
 Django management command to generate sample activity logs for testing
+
+Default mode goes through ActivityLogger one log at a time. --bulk builds rows
+in vectorized NumPy batches and writes them straight to activity_log /
+activity_log_detail (COPY FROM STDIN on PostgreSQL, executemany elsewhere),
+spreading created_at over --months with a daily activity curve.
+
+Usage:
+    python manage.py generate_sample_logs --count=50
+    python manage.py generate_sample_logs --bulk --count=50000000 --seed=42 --months=12
 """
-from django.core.management.base import BaseCommand
+import json
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
 from django.utils import timezone
-from activities.services.activity_logger import ActivityLogger
+from django.utils.dateparse import parse_datetime
+from activities.services.activity_logger import COPY_NULL, ActivityLogger, copy_escape
 from users.models import User
 from houses.models import House
 from devices.models import Component
 import random
-from datetime import timedelta
+from datetime import timedelta, timezone as dt_timezone
+
+
+LOG_COLUMNS = [
+    'id', 'user_id', 'house_id', 'component_id', 'action_type_id', 'action_name', 'log_level',
+    'source', 'is_automated', 'ip_address', 'session_id', 'request_id', 'duration_ms',
+    'device_platform', 'is_billable', 'status_code', 'created_at', 'updated_at',
+]
+
+DETAIL_COLUMNS = [
+    'log_id', 'action_parameters', 'action_result', 'automation_source', 'user_agent',
+    'request_path', 'household_member_id', 'app_version', 'firmware_version', 'latitude',
+    'longitude', 'subscription_tier', 'execution_time', 'memory_usage',
+]
+
+# Bulk rows are produced in COPY text format
+NULL = COPY_NULL
+
+# Relative activity per hour of day (UTC), morning and evening peaks
+HOURLY_WEIGHTS = [
+    1, 1, 1, 1, 1, 2, 4, 7, 8, 6, 5, 5,
+    5, 5, 5, 5, 6, 8, 10, 10, 9, 7, 4, 2,
+]
+
+# log type -> weight, same mix as the per-row mode
+LOG_TYPES = ['device', 'login', 'security', 'house', 'automation']
+LOG_TYPE_WEIGHTS = [40, 30, 15, 10, 5]
+
+# (source, device_platform, user agent) combinations for app traffic
+CLIENTS = [
+    ('mobile_app', 'ios', 'Mozilla/5.0 (iPhone; CPU iPhone OS 14_0 like Mac OS X)'),
+    ('mobile_app', 'android', 'Mozilla/5.0 (Android 11; Mobile)'),
+    ('mobile_app', 'android', 'SmartHomeApp/2.1.0'),
+    ('web_app', 'web', 'Mozilla/5.0 (Windows NT 10.0; Win64; x64)'),
+    ('api', 'api', 'python-requests/2.32'),
+]
+
+SECURITY_EVENTS = ['failed_login', 'access_denied', 'unusual_activity', 'device_tamper']
+HOUSE_ACTIONS = ['created', 'updated', 'user_added', 'user_removed']
+DEVICE_ERRORS = ['Device not responding', 'Connection timeout', 'Invalid command', 'Device offline']
 
 
 class Command(BaseCommand):
@@ -26,6 +78,35 @@ class Command(BaseCommand):
             action='store_true',
             help='Delete existing activity logs before generating new ones'
         )
+        parser.add_argument(
+            '--bulk',
+            action='store_true',
+            help='High-volume mode: vectorized batches written with COPY / executemany'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=None,
+            help='Random seed, the same seed and --end give the same rows'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50000,
+            help='Rows per batch in --bulk mode (default: 50000)'
+        )
+        parser.add_argument(
+            '--months',
+            type=int,
+            default=6,
+            help='Spread created_at over this many months in --bulk mode (default: 6)'
+        )
+        parser.add_argument(
+            '--end',
+            type=str,
+            default=None,
+            help='Newest created_at in --bulk mode, ISO datetime (default: now)'
+        )
 
     def handle(self, *args, **options):
         count = options['count']
@@ -48,6 +129,9 @@ class Command(BaseCommand):
             self.stdout.write(self.style.ERROR('❌ No houses found. Please create houses first.'))
             return
 
+        if options['bulk']:
+            return self._handle_bulk(count, options)
+
         # Get components for each house
         house_components = {}
         for house in houses:
@@ -293,4 +377,229 @@ class Command(BaseCommand):
         self.stdout.write('🎯 Tips:')
         self.stdout.write('   • Run with --count=50 for more logs')
         self.stdout.write('   • Run with --delete to clear old logs first')
-        self.stdout.write('   • Logs include realistic IPs, user agents, and error scenarios')
\ No newline at end of file
+        self.stdout.write('   • Logs include realistic IPs, user agents, and error scenarios')
+
+    # ========== BULK MODE ==========
+
+    def _handle_bulk(self, count, options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError('--bulk needs numpy (pip install numpy)')
+
+        end = parse_datetime(options['end']) if options['end'] else timezone.now()
+        if end is None:
+            raise CommandError(f"Invalid --end datetime: {options['end']}")
+        if timezone.is_naive(end):
+            end = timezone.make_aware(end, dt_timezone.utc)
+
+        rng = np.random.default_rng(options['seed'])
+        pools = self._build_pools(np)
+        batch_size = max(options['batch_size'], 1)
+
+        self.stdout.write(f'📊 Generating {count:,} activity logs in batches of {batch_size:,}...')
+        self.stdout.write(f'🕒 created_at spread over {options["months"]} months up to {end.isoformat()}')
+        self.stdout.write(f'💾 Writer: {"COPY FROM STDIN" if connection.vendor == "postgresql" else "executemany"}')
+
+        started = time.perf_counter()
+        written = 0
+        while written < count:
+            size = min(batch_size, count - written)
+            logs, details = self._generate_batch(np, rng, size, pools, end, options['months'])
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    self._write_rows(cursor, 'activity_log', LOG_COLUMNS, logs)
+                    self._write_rows(cursor, 'activity_log_detail', DETAIL_COLUMNS, details)
+            written += size
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f'   {written:,}/{count:,} rows ({written / elapsed:,.0f} rows/s)')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f'✅ {written:,} logs written in {elapsed:.1f}s ({written / elapsed:,.0f} rows/s)'
+        ))
+        self.stdout.write('   Usage counters are not updated in bulk mode, run reconcile_usage afterwards.')
+
+    def _build_pools(self, np):
+        """
+        Pre-render every per-entity and per-variant string once, batches then
+        only pick from these arrays by index
+        """
+        users = list(User.objects.order_by('pk').values_list('pk', 'email'))
+        houses = list(House.objects.order_by('pk').values_list('pk', 'name'))
+        components = list(
+            Component.objects.order_by('pk').values_list('pk', 'house_id', 'name', 'component_type__name')
+        )
+        house_index = {pk: index for index, (pk, _) in enumerate(houses)}
+
+        def strings(values):
+            array = np.empty(len(values), dtype=object)
+            array[:] = values
+            return array
+
+        def payload(data):
+            # Strip the closing brace so per-row suffixes can be appended
+            return copy_escape(json.dumps(data))[:-1]
+
+        brightness = [{'brightness': value} for value in range(10, 101, 10)]
+        temperature = [{'temperature': value} for value in range(16, 31)]
+        colors = [{'color': color} for color in ['white', 'warm', 'cool', 'red', 'blue', 'green']]
+        device_parameters = [{}, {}] + brightness + temperature + colors
+
+        return {
+            'user_ids': strings([pk.hex for pk, _ in users]),
+            'user_emails': strings([payload({'action': 'login', 'email': email}) for _, email in users]),
+            'house_ids': strings([pk.hex for pk, _ in houses]),
+            'house_names': strings([payload({'house_name': name}) for _, name in houses]),
+            'component_ids': strings([pk.hex for pk, _, _, _ in components]),
+            'component_houses': np.array([house_index[house_id] for _, house_id, _, _ in components], dtype=np.int64),
+            'component_payloads': strings([
+                payload({'component_id': str(pk), 'component_name': name, 'component_type': type_name})
+                for pk, _, name, type_name in components
+            ]),
+            'device_parameters': strings([
+                ', ' + copy_escape(json.dumps({'parameters': parameters}))[1:] for parameters in device_parameters
+            ]),
+            'device_results': strings([
+                copy_escape(json.dumps({'success': True, 'device_status': 'online', 'ack_received': True})),
+                copy_escape(json.dumps({'success': True, 'device_status': 'slow', 'ack_received': True})),
+            ] + [
+                copy_escape(json.dumps({'success': False, 'device_status': 'offline', 'error_message': error}))
+                for error in DEVICE_ERRORS
+            ]),
+            'client_sources': strings([source for source, _, _ in CLIENTS]),
+            'client_platforms': strings([platform for _, platform, _ in CLIENTS]),
+            'client_agents': strings([copy_escape(agent) for _, _, agent in CLIENTS]),
+            'ip_addresses': strings([f'192.168.{subnet}.{host}' for subnet in range(4) for host in range(1, 255)]),
+            'security_names': strings([f'security_{event}' for event in SECURITY_EVENTS]),
+            'security_payloads': strings([
+                copy_escape(json.dumps({'event_type': event, 'details': f'Sample {event.replace("_", " ")} event'}))
+                for event in SECURITY_EVENTS
+            ]),
+            'house_actions': strings([f'house_{action}' for action in HOUSE_ACTIONS]),
+        }
+
+    def _generate_batch(self, np, rng, size, pools, end, months):
+        """
+        Build one batch of activity_log and activity_log_detail rows as lists
+        of COPY text columns
+        """
+        log_type = rng.choice(len(LOG_TYPES), size=size, p=np.array(LOG_TYPE_WEIGHTS) / sum(LOG_TYPE_WEIGHTS))
+        if not len(pools['component_ids']):
+            # No devices: device and automation rows become house management rows
+            log_type[(log_type == 0) | (log_type == 4)] = 3
+        device, login, security, house_rows, automation = (log_type == index for index in range(len(LOG_TYPES)))
+        with_component = device | automation
+
+        user = rng.integers(0, len(pools['user_ids']), size=size)
+        house = rng.integers(0, len(pools['house_ids']), size=size)
+        component = np.zeros(size, dtype=np.int64)
+        if len(pools['component_ids']):
+            component = rng.integers(0, len(pools['component_ids']), size=size)
+            house = np.where(with_component, pools['component_houses'][component], house)
+        client = rng.integers(0, len(CLIENTS), size=size)
+        failed = rng.random(size) < np.where(login, 0.2, 0.1)
+        variant = rng.integers(0, 1 << 16, size=size)
+
+        user_ids = pools['user_ids'][user]
+        user_ids[(login & failed) | (security & (variant % 2 == 0)) | automation] = NULL
+        house_ids = pools['house_ids'][house]
+        house_ids[login & failed] = NULL
+        component_ids = np.full(size, NULL, dtype=object)
+        component_ids[with_component] = pools['component_ids'][component[with_component]]
+
+        action_name = np.full(size, 'device_control', dtype=object)
+        action_name[login] = np.where(failed[login], 'user_login_failed', 'user_login')
+        action_name[security] = pools['security_names'][variant[security] % len(SECURITY_EVENTS)]
+        action_name[house_rows] = pools['house_actions'][variant[house_rows] % len(HOUSE_ACTIONS)]
+        action_name[automation] = 'automation_trigger'
+
+        log_level = np.where(failed, 'error', 'info').astype(object)
+        log_level[login & failed] = 'warning'
+        log_level[automation & failed] = 'warning'
+        log_level[security] = 'security'
+
+        source = pools['client_sources'][client]
+        source[security] = 'system'
+        source[automation] = 'automation'
+        platform = pools['client_platforms'][client]
+        platform[security | automation] = 'unknown'
+
+        duration = rng.gamma(2.0, 120.0, size=size).astype(np.int64)
+        billable = np.where(device | house_rows | automation, 't', 'f').astype(object)
+        automated = np.where(automation, 't', 'f').astype(object)
+
+        # created_at: linear growth over the days before `end` (denser towards
+        # the end), hour of day from HOURLY_WEIGHTS, uniform within the hour
+        span_days = max(months, 1) * 30
+        day = (span_days * np.sqrt(rng.random(size))).astype(np.int64)
+        hour = rng.choice(24, size=size, p=np.array(HOURLY_WEIGHTS) / sum(HOURLY_WEIGHTS))
+        start = np.datetime64(end.replace(tzinfo=None).date(), 'us') - np.timedelta64(span_days, 'D')
+        created = (start + day.astype('timedelta64[D]') + hour.astype('timedelta64[h]')
+                   + rng.integers(0, 3_600_000_000, size=size).astype('timedelta64[us]'))
+        created_at = np.datetime_as_string(created, unit='us').astype(object) + '+00:00'
+
+        # uuid7 ids carrying created_at, random bits from the generator so
+        # --seed reproduces them
+        raw = rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+        millis = created.astype('datetime64[ms]').astype('>u8').view(np.uint8).reshape(size, 8)
+        raw[:, :6] = millis[:, 2:]
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x70
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        blob = raw.tobytes().hex()
+        ids = np.array([blob[offset:offset + 32] for offset in range(0, size * 32, 32)], dtype=object)
+
+        parameters = pools['user_emails'][user] + '}'
+        parameters[device | automation] = (pools['component_payloads'][component[with_component]]
+                                           + pools['device_parameters'][variant[with_component]
+                                                                        % len(pools['device_parameters'])])
+        parameters[security] = pools['security_payloads'][variant[security] % len(SECURITY_EVENTS)]
+        parameters[house_rows] = pools['house_names'][house[house_rows]] + '}'
+
+        results = pools['device_results'][np.where(failed, 2 + variant % len(DEVICE_ERRORS), variant % 2)]
+        results[login | security | house_rows] = np.where(failed[login | security | house_rows],
+                                                           '{"success": false}', '{"success": true}')
+
+        user_agent = pools['client_agents'][client]
+        user_agent[security | automation] = ''
+        automation_source = np.where(automation, 'automation_rule', '').astype(object)
+        execution_time = np.where(with_component, (duration / 1000).round(3).astype(str), NULL).astype(object)
+        duration_ms = duration.astype(str).astype(object)
+        ip_address = pools['ip_addresses'][variant % len(pools['ip_addresses'])]
+        ip_address[automation] = NULL
+
+        empty = np.full(size, '', dtype=object)
+        nulls = np.full(size, NULL, dtype=object)
+        logs = [
+            ids, user_ids, house_ids, component_ids, nulls, action_name, log_level,
+            source, automated, ip_address, empty, empty, duration_ms,
+            platform, billable, nulls, created_at, created_at,
+        ]
+        details = [
+            ids, parameters, results, automation_source, user_agent,
+            empty, nulls, empty, empty, nulls,
+            nulls, empty, execution_time, nulls,
+        ]
+        return logs, details
+
+    def _write_rows(self, cursor, table, columns, data):
+        if connection.vendor == 'postgresql':
+            ActivityLogger.copy_rows(cursor, table, columns, ('\t'.join(row) + '\n' for row in zip(*data)))
+            return
+
+        # COPY text -> Python values for the DB-API fallback
+        converted = []
+        for name, column in zip(columns, data):
+            if name in ('is_automated', 'is_billable'):
+                column = [value == 't' for value in column]
+            elif name in ('created_at', 'updated_at'):
+                # Same layout the SQLite backend writes: naive UTC, space separator
+                column = [value[:-6].replace('T', ' ') for value in column]
+            else:
+                column = [None if value == NULL else value for value in column]
+            converted.append(column)
+        placeholders = ', '.join(['%s'] * len(columns))
+        cursor.executemany(
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})', list(zip(*converted))
+        )
@@ -0,0 +1,63 @@
+"""
+Django management command to import activity logs from a JSON Lines file
+
+Used for historical logs exported from old hubs and for replaying logs during
+migrations. One JSON object per line, keyed like ActivityLog fields (user_id,
+house_id, component_id, action_name, action_parameters, created_at, ...).
+Rows are streamed through ActivityLogger.bulk_ingest (COPY on PostgreSQL).
+
+Usage:
+    python manage.py import_activity_logs hub_export.jsonl
+    cat hub_export.jsonl | python manage.py import_activity_logs -
+"""
+import json
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from activities.services.activity_logger import ActivityLogger
+
+
+class Command(BaseCommand):
+    help = 'Bulk import activity logs from a JSON Lines file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            type=str,
+            help='JSON Lines file, "-" reads stdin'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=10000,
+            help='Rows per COPY chunk (default: 10000)'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        try:
+            source = sys.stdin if path == '-' else open(path, encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        def rows():
+            for line_number, line in enumerate(source, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise CommandError(f'Line {line_number}: invalid JSON ({e})')
+
+        self.stdout.write(f'📥 Importing activity logs from {path}...')
+        try:
+            stats = ActivityLogger.bulk_ingest(rows(), chunk_size=options['chunk_size'])
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {stats['rows']:,} logs in {stats['seconds']:.1f}s "
+            f"({stats['rows_per_second']:,.0f} rows/s)"
+        ))
+        self.stdout.write('   Run reconcile_usage to refresh the usage counters.')
@@ -0,0 +1,344 @@
+"""
+Django management command to review the indexes of the project's tables
+
+For every table of the local apps (users, houses, devices, automation,
+activities) it lists the indexes found in the database and reports:
+    • indexes declared on the models but missing in the database, and indexes
+      in the database the models do not declare (e.g. created by RunSQL)
+    • redundant indexes: exact duplicates and indexes whose columns are a
+      leading prefix of another index on the same table
+    • write amplification: index writes per inserted / non-HOT updated row
+    • BRIN candidates: created_at btree indexes on append-only tables
+
+On PostgreSQL it adds index sizes and usage from pg_stat_user_indexes, write
+statistics from pg_stat_user_tables and the created_at correlation from
+pg_stats. On other databases only the structural checks run.
+
+Usage:
+    python manage.py index_report
+    python manage.py index_report --app activities --app devices
+    python manage.py index_report --table activity_log
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, models
+
+# BRIN only pays off when created_at follows the physical row order
+BRIN_MIN_CORRELATION = 0.9
+# (updates + deletes) / inserts above this means the table is not append-only
+APPEND_ONLY_MAX_CHANGE_RATIO = 0.01
+# Known append-only tables, used where there are no write statistics
+APPEND_ONLY_TABLES = ('activity_log', 'security_event')
+
+
+class Command(BaseCommand):
+    help = 'Report redundant, unused and missing indexes and BRIN candidates for the project tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--app',
+            action='append',
+            dest='apps',
+            help='Only this app label (repeatable, default: all local apps)'
+        )
+        parser.add_argument(
+            '--table',
+            action='append',
+            dest='tables',
+            help='Only this table (repeatable)'
+        )
+
+    def handle(self, *args, **options):
+        self.postgres = connection.vendor == 'postgresql'
+        tables = self._tables(options['apps'], options['tables'])
+        if not tables:
+            raise CommandError('No matching tables.')
+
+        self.stdout.write(f'🔎 Index report for {len(tables)} tables ({connection.vendor})')
+        if not self.postgres:
+            self.stdout.write('   Usage, size and BRIN statistics need PostgreSQL, showing structural checks only.')
+
+        totals = {'redundant': 0, 'unused': 0, 'missing': 0, 'brin': 0}
+        with connection.cursor() as cursor:
+            existing = set(connection.introspection.table_names(cursor))
+            for table, model in tables:
+                if table not in existing:
+                    self.stdout.write('')
+                    self.stdout.write(self.style.WARNING(f'⚠️  {table}: table missing, run migrate'))
+                    continue
+                self._report_table(cursor, table, model, totals)
+
+        self.stdout.write('')
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {totals['redundant']} redundant, {totals['unused']} unused, "
+            f"{totals['missing']} missing indexes, {totals['brin']} BRIN candidates"
+        ))
+
+    # ========== COLLECTION ==========
+
+    def _tables(self, app_labels, table_names):
+        """
+        [(table, model)] for the managed models of the selected apps,
+        including auto-created many-to-many tables
+        """
+        base_dir = str(settings.BASE_DIR)
+        selected = []
+        for app_config in apps.get_app_configs():
+            if app_labels:
+                if app_config.label not in app_labels:
+                    continue
+            elif not app_config.path.startswith(base_dir):
+                continue
+            for model in app_config.get_models(include_auto_created=True):
+                meta = model._meta
+                if not meta.managed or meta.proxy:
+                    continue
+                if table_names and meta.db_table not in table_names:
+                    continue
+                selected.append((meta.db_table, model))
+        return sorted(selected)
+
+    def _actual_indexes(self, cursor, table):
+        """
+        {name: info} for every index (including the ones backing primary
+        key and unique constraints) of the table
+        """
+        indexes = {}
+        for name, constraint in connection.introspection.get_constraints(cursor, table).items():
+            if not (constraint['index'] or constraint['unique'] or constraint['primary_key']):
+                continue
+            if constraint.get('check') or (constraint.get('foreign_key') and not constraint['index']):
+                continue
+            indexes[name] = {
+                'columns': tuple(constraint['columns'] or ()),
+                'unique': bool(constraint['unique'] or constraint['primary_key']),
+                'primary_key': bool(constraint['primary_key']),
+                'type': constraint.get('type') or 'idx',
+                'special': False,
+                'scans': None,
+                'size': None,
+                'definition': '',
+            }
+
+        if self.postgres:
+            cursor.execute(
+                """
+                SELECT s.indexrelname, s.idx_scan, pg_relation_size(s.indexrelid),
+                       pg_get_indexdef(s.indexrelid),
+                       i.indpred IS NOT NULL OR i.indexprs IS NOT NULL
+                FROM pg_stat_user_indexes s
+                JOIN pg_index i ON i.indexrelid = s.indexrelid
+                WHERE s.relname = %s
+                """,
+                [table]
+            )
+            for name, scans, size, definition, special in cursor.fetchall():
+                if name not in indexes:
+                    continue
+                info = indexes[name]
+                info.update(scans=scans, size=size, definition=definition)
+                # Partial, expression and pattern_ops indexes answer different
+                # queries than a plain index on the same columns
+                info['special'] = special or '_pattern_ops' in definition
+        else:
+            for info in indexes.values():
+                info['special'] = not info['columns']
+        return indexes
+
+    def _declared_indexes(self, model):
+        """
+        Column tuples the model asks an index for (fields, Meta.indexes,
+        unique_together, UniqueConstraints)
+        """
+        meta = model._meta
+        declared = set()
+        for field in meta.local_concrete_fields:
+            if field.primary_key or field.unique or field.db_index:
+                declared.add((field.column,))
+        for index in meta.indexes:
+            if index.fields:
+                declared.add(tuple(meta.get_field(name.lstrip('-')).column for name in index.fields))
+        for fields in meta.unique_together:
+            declared.add(tuple(meta.get_field(name).column for name in fields))
+        for constraint in meta.constraints:
+            if isinstance(constraint, models.UniqueConstraint) and constraint.fields:
+                declared.add(tuple(meta.get_field(name).column for name in constraint.fields))
+        return declared
+
+    def _table_stats(self, cursor, table):
+        if not self.postgres:
+            return None
+        cursor.execute(
+            """
+            SELECT n_tup_ins, n_tup_upd, n_tup_hot_upd, n_tup_del, n_live_tup,
+                   pg_relation_size(relid), pg_indexes_size(relid)
+            FROM pg_stat_user_tables WHERE relname = %s
+            """,
+            [table]
+        )
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        keys = ('inserts', 'updates', 'hot_updates', 'deletes', 'live_rows', 'heap_size', 'index_size')
+        return dict(zip(keys, row))
+
+    def _correlation(self, cursor, table, column):
+        cursor.execute(
+            "SELECT correlation FROM pg_stats WHERE tablename = %s AND attname = %s",
+            [table, column]
+        )
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    # ========== CHECKS ==========
+
+    def _redundant(self, indexes):
+        """
+        [(name, covering name, reason)] for indexes another index already
+        covers. Unique and primary key indexes are never reported, they
+        enforce constraints.
+        """
+        plain = {name: info for name, info in indexes.items()
+                 if info['columns'] and not info['special'] and info['type'] in ('idx', 'btree')}
+        redundant = []
+        for name, info in sorted(plain.items()):
+            if info['unique']:
+                continue
+            for other_name, other in sorted(plain.items()):
+                if other_name == name or other_name in {found for found, _, _ in redundant}:
+                    continue
+                columns, other_columns = info['columns'], other['columns']
+                if columns == other_columns:
+                    redundant.append((name, other_name, 'duplicate of'))
+                    break
+                if len(columns) < len(other_columns) and other_columns[:len(columns)] == columns:
+                    redundant.append((name, other_name, 'prefix of'))
+                    break
+        return redundant
+
+    def _report_table(self, cursor, table, model, totals):
+        indexes = self._actual_indexes(cursor, table)
+        declared = self._declared_indexes(model)
+        stats = self._table_stats(cursor, table)
+
+        self.stdout.write('')
+        header = f'📋 {table} ({model._meta.label}), {len(indexes)} indexes'
+        if stats:
+            header += (f", {stats['live_rows']:,} rows, heap {self._size(stats['heap_size'])}, "
+                       f"indexes {self._size(stats['index_size'])}")
+        self.stdout.write(header)
+
+        for name, info in sorted(indexes.items(), key=lambda item: item[1]['columns']):
+            flags = []
+            if info['primary_key']:
+                flags.append('pk')
+            elif info['unique']:
+                flags.append('unique')
+            if info['type'] not in ('idx', 'btree'):
+                flags.append(info['type'])
+            if info['special']:
+                flags.append('partial/expression/opclass')
+            line = f"   {name:<50} ({', '.join(info['columns']) or 'expression'})"
+            if flags:
+                line += f" [{', '.join(flags)}]"
+            if info['size'] is not None:
+                line += f"  {self._size(info['size'])}, {info['scans']:,} scans"
+            self.stdout.write(line)
+
+        # Declared vs actual
+        actual_columns = {info['columns'] for info in indexes.values()}
+        for columns in sorted(declared - actual_columns):
+            totals['missing'] += 1
+            self.stdout.write(self.style.WARNING(
+                f"   ⚠️  declared but missing in the database: ({', '.join(columns)}), unapplied migration?"
+            ))
+        for name, info in sorted(indexes.items()):
+            if info['columns'] and info['columns'] not in declared and not info['special']:
+                self.stdout.write(f'   ℹ️  {name} is not declared on the model (created by migration SQL?)')
+
+        # Redundant
+        for name, covering, reason in self._redundant(indexes):
+            totals['redundant'] += 1
+            info = indexes[name]
+            saving = f", frees {self._size(info['size'])}" if info['size'] is not None else ''
+            self.stdout.write(self.style.WARNING(
+                f"   🔁 {name} ({', '.join(info['columns'])}) is a {reason} {covering}{saving}"
+            ))
+
+        # Unused (statistics since the last reset)
+        if self.postgres:
+            for name, info in sorted(indexes.items()):
+                if info['scans'] == 0 and not info['unique']:
+                    totals['unused'] += 1
+                    self.stdout.write(self.style.WARNING(
+                        f"   💤 {name} has never been scanned since the last stats reset "
+                        f"({self._size(info['size'])})"
+                    ))
+
+        # Write amplification
+        index_count = len(indexes)
+        if stats and (stats['inserts'] or stats['updates']):
+            non_hot = stats['updates'] - stats['hot_updates']
+            changed = stats['inserts'] + stats['updates']
+            index_writes = (stats['inserts'] + non_hot) * index_count / changed
+            self.stdout.write(
+                f"   ✍️  write amplification: 1 heap + {index_writes:.1f} index writes per row change "
+                f"({stats['hot_updates']:,} of {stats['updates']:,} updates HOT)"
+            )
+        else:
+            self.stdout.write(f'   ✍️  write amplification: 1 heap + {index_count} index writes per INSERT')
+
+        self._report_brin(cursor, table, model, indexes, stats, totals)
+
+    def _report_brin(self, cursor, table, model, indexes, stats, totals):
+        try:
+            created_at = model._meta.get_field('created_at')
+        except Exception:
+            return
+        if not getattr(created_at, 'auto_now_add', False):
+            return
+        btree = [name for name, info in indexes.items()
+                 if info['columns'] == (created_at.column,) and not info['special']
+                 and info['type'] in ('idx', 'btree') and not info['unique']]
+        if not btree:
+            return
+
+        if not self.postgres:
+            if table not in APPEND_ONLY_TABLES:
+                return
+            totals['brin'] += 1
+            self.stdout.write(
+                f'   🧱 {btree[0]}: BRIN candidate on PostgreSQL (append-only table, correlation unverified)'
+            )
+            return
+
+        correlation = self._correlation(cursor, table, created_at.column)
+        changes = (stats['updates'] + stats['deletes']) if stats else 0
+        inserts = stats['inserts'] if stats else 0
+        append_only = inserts and changes <= inserts * APPEND_ONLY_MAX_CHANGE_RATIO
+        if correlation is None or correlation < BRIN_MIN_CORRELATION or not append_only:
+            return
+
+        totals['brin'] += 1
+        size = indexes[btree[0]]['size']
+        self.stdout.write(self.style.WARNING(
+            f'   🧱 {btree[0]} ({self._size(size)}): created_at correlation {correlation:.2f}, '
+            f'{changes:,} updates/deletes for {inserts:,} inserts - a BRIN index is a fraction of the size:'
+        ))
+        self.stdout.write(
+            f'      CREATE INDEX CONCURRENTLY {table}_created_at_brin ON {table} '
+            f'USING brin ({created_at.column}) WITH (pages_per_range = 32);'
+        )
+        self.stdout.write(
+            '      Keep the btree while ORDER BY created_at LIMIT n queries (admin, API listings) need it.'
+        )
+
+    @staticmethod
+    def _size(num_bytes):
+        if num_bytes is None:
+            return '?'
+        for unit in ('B', 'kB', 'MB', 'GB'):
+            if num_bytes < 1024 or unit == 'GB':
+                return f'{num_bytes:.1f} {unit}' if unit != 'B' else f'{num_bytes} B'
+            num_bytes /= 1024
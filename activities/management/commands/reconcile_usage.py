@@ -0,0 +1,54 @@
+"""
+Django management command to rebuild the billable usage counters from the database
+
+Meant to run nightly (cron / Render cron job). Counts billable activity logs
+per user and per house for the period with two GROUP BY queries and overwrites
+the cache counters, correcting drift from cache evictions or Redis restarts.
+When several instances run the same cron entry, only the one that gets the
+'activities.reconcile_usage' advisory lock does the work.
+
+Usage:
+    python manage.py reconcile_usage
+    python manage.py reconcile_usage --period=202610
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from activities.models import ActivityLog
+from activities.services.leader_lock import LeaderLock
+from activities.services.usage_counter import UsageCounter
+
+
+class Command(BaseCommand):
+    help = 'Reconcile billable usage counters in the cache with the activity log'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--period',
+            type=str,
+            default=None,
+            help='Billing period as YYYYMM (default: current month)'
+        )
+
+    def handle(self, *args, **options):
+        period = options['period'] or UsageCounter.period()
+        try:
+            start, end = UsageCounter.period_bounds(period)
+        except ValueError:
+            raise CommandError(f'Invalid period "{period}", expected YYYYMM')
+
+        billable = ActivityLog.objects.filter(is_billable=True, created_at__gte=start, created_at__lt=end)
+
+        with LeaderLock('activities.reconcile_usage') as is_leader:
+            if not is_leader:
+                self.stdout.write(self.style.WARNING('⚠️  Another instance is reconciling, skipped'))
+                return
+            for scope, column in (('user', 'user_id'), ('house', 'house_id')):
+                counts = {
+                    row[column]: row['total']
+                    for row in billable.filter(**{f'{column}__isnull': False})
+                    .order_by().values(column).annotate(total=Count('id'))
+                }
+                UsageCounter.set_counts(scope, counts, period)
+                self.stdout.write(f'   {scope}: {len(counts)} counters, {sum(counts.values())} events')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Usage counters reconciled for {period}'))
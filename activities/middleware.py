@@ -0,0 +1,29 @@
+# activities/middleware.py
+from .services.query_budget import QueryBudget
+
+
+class QueryBudgetMiddleware:
+    """
+    Counts the queries and database time of every request and checks them
+    against settings.QUERY_BUDGET. With HEADER enabled (DEBUG by default) the
+    numbers are returned in X-Query-Count / X-Query-Time-Ms.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not QueryBudget.enabled():
+            return self.get_response(request)
+
+        with QueryBudget.track(request.path) as stats:
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        if match is not None:
+            stats.label = match.url_name or match.view_name or match._func_path
+        if QueryBudget.config().get('HEADER', False):
+            response['X-Query-Count'] = str(stats.queries)
+            response['X-Query-Time-Ms'] = f'{stats.milliseconds:.1f}'
+        QueryBudget.check(stats)
+        return response
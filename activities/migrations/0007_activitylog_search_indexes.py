@@ -0,0 +1,59 @@
+"""
+Full-text and JSON search support for activity_log (Postgres only).
+
+- search_vector: generated tsvector over action_name, user_agent, request_path
+  and the string/numeric values of action_parameters / action_result
+- GIN index on search_vector
+- jsonb_path_ops GIN indexes on action_parameters and action_result for
+  containment (@>) queries such as {"error_code": "CONTROL_ERROR"}
+
+Adding a STORED generated column rewrites the table, run this migration in a
+maintenance window on large tables. Other database vendors are skipped.
+"""
+
+from django.db import migrations
+
+
+FORWARD_SQL = [
+    """
+    ALTER TABLE activity_log ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('simple'::regconfig,
+            coalesce(action_name, '') || ' ' ||
+            coalesce(user_agent, '') || ' ' ||
+            coalesce(request_path, ''))
+        || jsonb_to_tsvector('simple'::regconfig, coalesce(action_parameters, '{}'::jsonb), '["string", "numeric"]')
+        || jsonb_to_tsvector('simple'::regconfig, coalesce(action_result, '{}'::jsonb), '["string", "numeric"]')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS activity_log_search_gin ON activity_log USING gin (search_vector)",
+    "CREATE INDEX IF NOT EXISTS activity_log_params_gin ON activity_log USING gin (action_parameters jsonb_path_ops)",
+    "CREATE INDEX IF NOT EXISTS activity_log_result_gin ON activity_log USING gin (action_result jsonb_path_ops)",
+]
+
+REVERSE_SQL = [
+    "DROP INDEX IF EXISTS activity_log_result_gin",
+    "DROP INDEX IF EXISTS activity_log_params_gin",
+    "DROP INDEX IF EXISTS activity_log_search_gin",
+    "ALTER TABLE activity_log DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0006_alter_activitylog_session_id_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
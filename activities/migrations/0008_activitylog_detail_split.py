@@ -0,0 +1,172 @@
+# Generated by Django 5.1.14 on 2026-10-19 00:47
+
+from importlib import import_module
+
+import django.core.serializers.json
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Copy the heavy columns into activity_log_detail before they are dropped.
+# Plain INSERT ... SELECT / UPDATE ... FROM so it runs set-based on both
+# Postgres and SQLite (3.33+) instead of row by row through the ORM.
+DETAIL_COLUMNS = [
+    'action_parameters', 'action_result', 'automation_source', 'user_agent', 'request_path',
+    'household_member_id', 'app_version', 'firmware_version', 'latitude', 'longitude',
+    'subscription_tier', 'execution_time', 'memory_usage',
+]
+
+
+def copy_details(apps, schema_editor):
+    columns = ', '.join(DETAIL_COLUMNS)
+    schema_editor.execute(
+        f'INSERT INTO activity_log_detail (log_id, {columns}) '
+        f'SELECT id, {columns} FROM activity_log'
+    )
+
+
+def copy_details_back(apps, schema_editor):
+    assignments = ', '.join(f'{column} = d.{column}' for column in DETAIL_COLUMNS)
+    schema_editor.execute(
+        f'UPDATE activity_log SET {assignments} '
+        f'FROM activity_log_detail AS d WHERE d.log_id = activity_log.id'
+    )
+
+
+# The full-text column can only reference columns of its own table, so it
+# moves with the payloads (see 0007 for the original definition).
+MOVE_SEARCH_SQL = [
+    'DROP INDEX IF EXISTS activity_log_result_gin',
+    'DROP INDEX IF EXISTS activity_log_params_gin',
+    'DROP INDEX IF EXISTS activity_log_search_gin',
+    'ALTER TABLE activity_log DROP COLUMN IF EXISTS search_vector',
+    """
+    ALTER TABLE activity_log_detail ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        to_tsvector('simple'::regconfig,
+            coalesce(user_agent, '') || ' ' ||
+            coalesce(request_path, ''))
+        || jsonb_to_tsvector('simple'::regconfig, coalesce(action_parameters, '{}'::jsonb), '["string", "numeric"]')
+        || jsonb_to_tsvector('simple'::regconfig, coalesce(action_result, '{}'::jsonb), '["string", "numeric"]')
+    ) STORED
+    """,
+    'CREATE INDEX IF NOT EXISTS activity_log_detail_search_gin ON activity_log_detail USING gin (search_vector)',
+    'CREATE INDEX IF NOT EXISTS activity_log_detail_params_gin '
+    'ON activity_log_detail USING gin (action_parameters jsonb_path_ops)',
+    'CREATE INDEX IF NOT EXISTS activity_log_detail_result_gin '
+    'ON activity_log_detail USING gin (action_result jsonb_path_ops)',
+]
+
+RESTORE_SEARCH_SQL = [
+    'DROP INDEX IF EXISTS activity_log_detail_result_gin',
+    'DROP INDEX IF EXISTS activity_log_detail_params_gin',
+    'DROP INDEX IF EXISTS activity_log_detail_search_gin',
+    'ALTER TABLE activity_log_detail DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def move_search_to_detail(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for statement in MOVE_SEARCH_SQL:
+        schema_editor.execute(statement)
+
+
+def move_search_back(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    search_indexes = import_module('activities.migrations.0007_activitylog_search_indexes')
+    for statement in RESTORE_SEARCH_SQL + search_indexes.FORWARD_SQL:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0007_activitylog_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityLogDetail',
+            fields=[
+                ('log', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='detail', serialize=False, to='activities.activitylog')),
+                ('action_parameters', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('action_result', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('automation_source', models.CharField(blank=True, max_length=100)),
+                ('user_agent', models.TextField(blank=True)),
+                ('request_path', models.CharField(blank=True, max_length=500)),
+                ('household_member_id', models.UUIDField(blank=True, help_text='Which household member performed the action', null=True)),
+                ('app_version', models.CharField(blank=True, help_text='Mobile app version (e.g., 1.2.3)', max_length=20)),
+                ('firmware_version', models.CharField(blank=True, help_text='ESP32 firmware version', max_length=20)),
+                ('latitude', models.DecimalField(blank=True, decimal_places=7, help_text='Latitude of the user/device', max_digits=10, null=True)),
+                ('longitude', models.DecimalField(blank=True, decimal_places=7, help_text='Longitude of the user/device', max_digits=10, null=True)),
+                ('subscription_tier', models.CharField(blank=True, help_text="User's subscription plan (free, basic, premium, enterprise)", max_length=20)),
+                ('execution_time', models.FloatField(blank=True, null=True)),
+                ('memory_usage', models.IntegerField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Activity Log Detail',
+                'verbose_name_plural': 'Activity Log Details',
+                'db_table': 'activity_log_detail',
+            },
+        ),
+        migrations.RunPython(copy_details, copy_details_back),
+        migrations.RunPython(move_search_to_detail, move_search_back),
+        migrations.RemoveIndex(
+            model_name='activitylog',
+            name='activity_lo_subscri_1424db_idx',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='action_parameters',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='action_result',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='app_version',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='automation_source',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='execution_time',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='firmware_version',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='household_member_id',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='latitude',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='longitude',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='memory_usage',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='request_path',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='subscription_tier',
+        ),
+        migrations.RemoveField(
+            model_name='activitylog',
+            name='user_agent',
+        ),
+    ]
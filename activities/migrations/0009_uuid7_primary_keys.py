@@ -0,0 +1,24 @@
+# Generated by Django 5.1.14 on 2026-10-19 01:17
+
+import activities.ids
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('activities', '0008_activitylog_detail_split'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='activitylog',
+            name='id',
+            field=models.UUIDField(default=activities.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+        migrations.AlterField(
+            model_name='securityevent',
+            name='id',
+            field=models.UUIDField(default=activities.ids.uuid7, editable=False, primary_key=True, serialize=False),
+        ),
+    ]
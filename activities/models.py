@@ -1,10 +1,178 @@
-import uuid
+import copy
 import json
-from django.db import models
+from django.db import connection, models
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
 from django.core.serializers.json import DjangoJSONEncoder
 from users.models import User
 from houses.models import House
 from devices.models import Component, ActionType
+from .ids import uuid7
+
+
+# Heavy payload columns that live in activity_log_detail. ActivityLog exposes
+# them as plain attributes, so callers can keep passing them to create().
+DETAIL_FIELDS = (
+    'action_parameters',
+    'action_result',
+    'automation_source',
+    'user_agent',
+    'request_path',
+    'household_member_id',
+    'app_version',
+    'firmware_version',
+    'latitude',
+    'longitude',
+    'subscription_tier',
+    'execution_time',
+    'memory_usage',
+)
+
+
+def _to_detail_lookup(lookup):
+    field_name = lookup.lstrip('-').split('__', 1)[0]
+    if field_name not in DETAIL_FIELDS:
+        return lookup
+    return f"-detail__{lookup[1:]}" if lookup.startswith('-') else f'detail__{lookup}'
+
+
+def _to_detail_q(q):
+    """Copy of a Q object with its detail field lookups rerouted"""
+    clone = copy.copy(q)
+    clone.children = [
+        _to_detail_q(child) if isinstance(child, Q)
+        else (_to_detail_lookup(child[0]), child[1]) if isinstance(child, tuple)
+        else child
+        for child in q.children
+    ]
+    return clone
+
+
+def _to_detail_args(args):
+    return [_to_detail_q(arg) if isinstance(arg, Q) else arg for arg in args]
+
+
+class ActivityLogQuerySet(models.QuerySet):
+    """
+    Compatibility layer for the hot/cold split: detail fields can be used as
+    if they were still columns of activity_log in filter() / exclude() (also
+    inside Q objects), values(), values_list(), order_by(), only(), defer()
+    and update(), they are routed through the activity_log_detail join.
+    bulk_create() writes both tables.
+
+    Not translated: F() and other expressions naming a detail field, and
+    annotate() / aggregate() over them, spell those detail__<field>.
+
+    Also hosts the search helpers backed by the Postgres-only search column
+    and GIN indexes (see migrations 0007/0008).
+    """
+
+    def filter(self, *args, **kwargs):
+        return super().filter(*_to_detail_args(args), **{_to_detail_lookup(k): v for k, v in kwargs.items()})
+
+    def exclude(self, *args, **kwargs):
+        return super().exclude(*_to_detail_args(args), **{_to_detail_lookup(k): v for k, v in kwargs.items()})
+
+    def values(self, *fields, **expressions):
+        # Keep the attribute names as keys: {'user_agent': ...}
+        expressions.update({field: F(f'detail__{field}') for field in fields if field in DETAIL_FIELDS})
+        return super().values(*[field for field in fields if field not in DETAIL_FIELDS], **expressions)
+
+    def values_list(self, *fields, **kwargs):
+        return super().values_list(
+            *[_to_detail_lookup(field) if isinstance(field, str) else field for field in fields], **kwargs)
+
+    def order_by(self, *field_names):
+        return super().order_by(
+            *[_to_detail_lookup(field) if isinstance(field, str) else field for field in field_names])
+
+    def only(self, *fields):
+        queryset = self
+        if any(field in DETAIL_FIELDS for field in fields):
+            queryset = queryset.select_related('detail')
+        return super(ActivityLogQuerySet, queryset).only(*[_to_detail_lookup(field) for field in fields])
+
+    def defer(self, *fields):
+        if fields == (None,):
+            return super().defer(None)
+        return super().defer(*[_to_detail_lookup(field) for field in fields])
+
+    def update(self, **kwargs):
+        """
+        Detail fields are updated in activity_log_detail first, so the hot
+        update cannot change which rows match. Logs without a detail row are
+        left without one.
+        """
+        if self.query.is_sliced:
+            raise TypeError('Cannot update a query once a slice has been taken.')
+        detail = {field: kwargs.pop(field) for field in list(kwargs) if field in DETAIL_FIELDS}
+        rows = 0
+        if detail:
+            rows = ActivityLogDetail.objects.using(self.db).filter(
+                log__in=self.values('pk')).update(**detail)
+        if kwargs:
+            rows = super().update(**kwargs)
+        return rows
+
+    def with_detail(self):
+        """Load the detail row in the same query (detail views, exports)"""
+        return self.select_related('detail')
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        details = [obj.get_detail() for obj in objs if obj._detail_dirty]
+        if details:
+            ActivityLogDetail.objects.using(self.db).bulk_create(details, batch_size=kwargs.get('batch_size'))
+            for obj in objs:
+                obj._detail_dirty = False
+        return objs
+
+    def search(self, text):
+        """
+        Full-text search over user agent, request path and the string values
+        of action_parameters / action_result, plus exact action_name matches
+        """
+        return self.filter(self.search_q(text))
+
+    def search_q(self, text):
+        if connection.vendor == 'postgresql':
+            return Q(action_name=text) | Q(pk__in=RawSQL(
+                "SELECT log_id FROM activity_log_detail "
+                "WHERE search_vector @@ websearch_to_tsquery('simple', %s)",
+                [text],
+            ))
+        return (
+            Q(action_name__icontains=text) |
+            Q(detail__user_agent__icontains=text) |
+            Q(detail__request_path__icontains=text)
+        )
+
+    def payload_contains(self, parameters=None, result=None):
+        """
+        JSON containment, e.g. payload_contains(result={'error_code': 'CONTROL_ERROR'}).
+        Uses the jsonb_path_ops GIN indexes on Postgres.
+        """
+        queryset = self
+        for field, value in (('action_parameters', parameters), ('action_result', result)):
+            if not value:
+                continue
+            if connection.vendor == 'postgresql':
+                queryset = queryset.filter(**{f'detail__{field}__contains': value})
+            else:
+                # SQLite & co. have no @> operator - match top-level keys instead
+                queryset = queryset.filter(**{f'detail__{field}__{key}': item for key, item in value.items()})
+        return queryset
+
+
+def _detail_property(name):
+    def getter(self):
+        return getattr(self.get_detail(), name)
+
+    def setter(self, value):
+        setattr(self.get_detail(), name, value)
+        self._detail_dirty = True
+
+    return property(getter, setter)
 
 
 class ActivityLog(models.Model):
@@ -36,7 +204,8 @@ class ActivityLog(models.Model):
         ('unknown', 'Unknown'),
     ]
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Time-ordered so inserts append to the primary key index
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
 
     # ========== EXISTING RELATIONSHIPS ==========
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='activities')
@@ -48,20 +217,15 @@ class ActivityLog(models.Model):
 
     # ========== ACTION DETAILS ==========
     action_name = models.CharField(max_length=100)
-    action_parameters = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
-    action_result = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
 
     # ========== LOG METADATA ==========
     log_level = models.CharField(max_length=10, choices=LOG_LEVELS, default='info')
     source = models.CharField(max_length=20, choices=SOURCE_TYPES, default='api')
 
     is_automated = models.BooleanField(default=False)
-    automation_source = models.CharField(max_length=100, blank=True)
 
     # ========== TECHNICAL DETAILS ==========
     ip_address = models.GenericIPAddressField(null=True, blank=True)
-    user_agent = models.TextField(blank=True)
-    request_path = models.CharField(max_length=500, blank=True)
 
     # ========== NEW: TRACKING & CORRELATION ==========
     session_id = models.CharField(max_length=100, blank=True, default='', db_index=True,
@@ -73,34 +237,14 @@ class ActivityLog(models.Model):
     duration_ms = models.IntegerField(null=True, blank=True,
                                        help_text="Action duration in milliseconds")
 
-    # ========== NEW: USER CONTEXT ==========
-    household_member_id = models.UUIDField(null=True, blank=True,
-                                            help_text="Which household member performed the action")
-
     # ========== NEW: CLIENT INFORMATION ==========
     device_platform = models.CharField(max_length=20, choices=DEVICE_PLATFORMS, default='unknown',
                                         help_text="Platform the action came from")
-    app_version = models.CharField(max_length=20, blank=True,
-                                    help_text="Mobile app version (e.g., 1.2.3)")
-    firmware_version = models.CharField(max_length=20, blank=True,
-                                         help_text="ESP32 firmware version")
-
-    # ========== NEW: GEOLOCATION (if user permits) ==========
-    latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True,
-                                    help_text="Latitude of the user/device")
-    longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True,
-                                     help_text="Longitude of the user/device")
 
     # ========== NEW: BUSINESS METRICS ==========
-    subscription_tier = models.CharField(max_length=20, blank=True,
-                                          help_text="User's subscription plan (free, basic, premium, enterprise)")
     is_billable = models.BooleanField(default=True,
                                        help_text="Whether this action counts toward billing/usage limits")
 
-    # ========== EXISTING PERFORMANCE METRICS ==========
-    execution_time = models.FloatField(null=True, blank=True)
-    memory_usage = models.IntegerField(null=True, blank=True)
-
     # ========== STATUS ==========
     status_code = models.IntegerField(null=True, blank=True)
 
@@ -108,6 +252,25 @@ class ActivityLog(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    # ========== DETAIL (activity_log_detail, loaded lazily) ==========
+    action_parameters = _detail_property('action_parameters')
+    action_result = _detail_property('action_result')
+    automation_source = _detail_property('automation_source')
+    user_agent = _detail_property('user_agent')
+    request_path = _detail_property('request_path')
+    household_member_id = _detail_property('household_member_id')
+    app_version = _detail_property('app_version')
+    firmware_version = _detail_property('firmware_version')
+    latitude = _detail_property('latitude')
+    longitude = _detail_property('longitude')
+    subscription_tier = _detail_property('subscription_tier')
+    execution_time = _detail_property('execution_time')
+    memory_usage = _detail_property('memory_usage')
+
+    _detail_dirty = False
+
+    objects = ActivityLogQuerySet.as_manager()
+
     class Meta:
         db_table = 'activity_log'
         verbose_name = 'Activity Log'
@@ -123,7 +286,6 @@ class ActivityLog(models.Model):
             models.Index(fields=['session_id', 'created_at']),
             models.Index(fields=['request_id']),
             models.Index(fields=['device_platform', 'created_at']),
-            models.Index(fields=['subscription_tier', 'created_at']),
             models.Index(fields=['is_billable', 'created_at']),
         ]
         ordering = ['-created_at']
@@ -132,6 +294,80 @@ class ActivityLog(models.Model):
         house_name = self.house.name if self.house else "Unknown House"
         return f"{self.action_name} - {house_name} - {self.created_at}"
 
+    def get_detail(self):
+        """
+        Return the detail row, fetching it on first access. New logs (and old
+        rows without a detail row) get an unsaved one with default values.
+        """
+        detail = None
+        if type(self).detail.is_cached(self) or not self._state.adding:
+            try:
+                detail = self.detail
+            except ActivityLogDetail.DoesNotExist:
+                pass
+        if detail is None:
+            detail = ActivityLogDetail(log=self)
+            self.detail = detail
+        return detail
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if self._detail_dirty:
+            detail = self.get_detail()
+            detail.save(using=kwargs.get('using'), force_insert=detail._state.adding)
+            self._detail_dirty = False
+
+
+class ActivityLogDetail(models.Model):
+    """
+    Cold half of an activity log: large JSON payloads, client, geo and billing
+    details. Kept out of activity_log so index lookups, listings and counts
+    only touch narrow rows.
+    """
+    log = models.OneToOneField(ActivityLog, on_delete=models.CASCADE, primary_key=True,
+                               related_name='detail')
+
+    # ========== ACTION DETAILS ==========
+    action_parameters = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    action_result = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    automation_source = models.CharField(max_length=100, blank=True)
+
+    # ========== TECHNICAL DETAILS ==========
+    user_agent = models.TextField(blank=True)
+    request_path = models.CharField(max_length=500, blank=True)
+
+    # ========== NEW: USER CONTEXT ==========
+    household_member_id = models.UUIDField(null=True, blank=True,
+                                            help_text="Which household member performed the action")
+
+    # ========== NEW: CLIENT INFORMATION ==========
+    app_version = models.CharField(max_length=20, blank=True,
+                                    help_text="Mobile app version (e.g., 1.2.3)")
+    firmware_version = models.CharField(max_length=20, blank=True,
+                                         help_text="ESP32 firmware version")
+
+    # ========== NEW: GEOLOCATION (if user permits) ==========
+    latitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True,
+                                    help_text="Latitude of the user/device")
+    longitude = models.DecimalField(max_digits=10, decimal_places=7, null=True, blank=True,
+                                     help_text="Longitude of the user/device")
+
+    # ========== NEW: BUSINESS METRICS ==========
+    subscription_tier = models.CharField(max_length=20, blank=True,
+                                          help_text="User's subscription plan (free, basic, premium, enterprise)")
+
+    # ========== EXISTING PERFORMANCE METRICS ==========
+    execution_time = models.FloatField(null=True, blank=True)
+    memory_usage = models.IntegerField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'activity_log_detail'
+        verbose_name = 'Activity Log Detail'
+        verbose_name_plural = 'Activity Log Details'
+
+    def __str__(self):
+        return f"Detail of {self.log_id}"
+
 
 class SecurityEvent(models.Model):
     EVENT_TYPES = [
@@ -150,7 +386,7 @@ class SecurityEvent(models.Model):
         ('critical', 'Critical'),
     ]
 
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = models.UUIDField(primary_key=True, default=uuid7, editable=False)
 
     # Event details
     event_type = models.CharField(max_length=50, choices=EVENT_TYPES)
@@ -0,0 +1,50 @@
+import json
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that avoids exact COUNT(*) on very large PostgreSQL tables.
+
+    Unfiltered querysets use the planner statistics in pg_class.reltuples,
+    filtered ones the row estimate of EXPLAIN. Estimates below
+    ESTIMATED_COUNT_THRESHOLD (or on other databases) fall back to an exact
+    count, so small tables and narrow filters still paginate exactly.
+    """
+
+    @cached_property
+    def count(self):
+        estimate = self._estimate()
+        threshold = getattr(settings, 'ESTIMATED_COUNT_THRESHOLD', 100000)
+        if estimate is None or estimate < threshold:
+            return super().count
+        return estimate
+
+    def _estimate(self):
+        queryset = self.object_list
+        query = getattr(queryset, 'query', None)
+        if query is None:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+
+        with connection.cursor() as cursor:
+            if not query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+                # -1 until the table has been vacuumed/analyzed
+                return row[0] if row and row[0] >= 0 else None
+
+            sql, params = queryset.order_by().values('pk').query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
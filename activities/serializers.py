@@ -0,0 +1,18 @@
+from rest_framework import serializers
+from .models import ActivityLog
+
+
+class ActivityLogSerializer(serializers.ModelSerializer):
+    house_name = serializers.CharField(source='house.name', read_only=True)
+    component_name = serializers.CharField(source='component.name', read_only=True)
+    user_email = serializers.CharField(source='user.email', read_only=True)
+
+    class Meta:
+        model = ActivityLog
+        fields = (
+            'id', 'created_at', 'action_name', 'log_level', 'source',
+            'house', 'house_name', 'component', 'component_name', 'user', 'user_email',
+            'action_parameters', 'action_result', 'ip_address', 'user_agent',
+            'request_path', 'request_id', 'session_id', 'status_code',
+        )
+        read_only_fields = fields
@@ -1,10 +1,53 @@
+import io
 import json
 import time
 import traceback
-from datetime import datetime
+from datetime import datetime, timezone as dt_timezone
+from django.db import connections, router, transaction
+from django.db.models import Model
 from django.utils import timezone
 from django.core.serializers.json import DjangoJSONEncoder
-from ..models import ActivityLog, ActionType
+from devices.metadata_cache import metadata_cache
+from devices.models import Component
+from ..ids import uuid7
+from ..models import ActivityLog, ActivityLogDetail, ActionType
+from .usage_counter import UsageCounter
+from .security_detector import security_detector
+from .async_log_writer import AsyncLogWriter
+
+
+# COPY text format: tab separated, \\N is NULL, backslash escapes
+COPY_NULL = '\\N'
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+_json_encoder = DjangoJSONEncoder()
+
+
+def copy_escape(value):
+    """
+    Escape a string for the COPY text format
+    """
+    return value.translate(COPY_ESCAPES)
+
+
+def _copy_value(value):
+    if value is None:
+        return COPY_NULL
+    if isinstance(value, str):
+        return value.translate(COPY_ESCAPES)
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    if isinstance(value, (dict, list)):
+        return _json_encoder.encode(value).translate(COPY_ESCAPES)
+    if isinstance(value, datetime):
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, dt_timezone.utc)
+        return value.isoformat()
+    if isinstance(value, Model):
+        return str(value.pk)
+    return str(value)
 
 
 class ActivityLogger:
@@ -17,6 +60,123 @@ class ActivityLogger:
         """
         Log device control activities
         """
+        log_data = ActivityLogger._device_control_data(user, house, component, action_type, parameters, result, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    @staticmethod
+    def log_user_authentication(user, house, action, result, **kwargs):
+        """
+        Log user authentication activities
+        """
+        log_data = ActivityLogger._user_authentication_data(user, house, action, result, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    @staticmethod
+    def log_house_management(user, house, action, parameters, result, **kwargs):
+        """
+        Log house management activities
+        """
+        log_data = ActivityLogger._house_management_data(user, house, action, parameters, result, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    @staticmethod
+    def log_automation_trigger(house, component, automation_rule, trigger_data, result, **kwargs):
+        """
+        Log automation rule triggers
+        """
+        log_data = ActivityLogger._automation_trigger_data(house, component, automation_rule, trigger_data, result, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    @staticmethod
+    def log_microcontroller_activity(microcontroller, action, data, result, **kwargs):
+        """
+        Log microcontroller activities
+        """
+        log_data = ActivityLogger._microcontroller_activity_data(microcontroller, action, data, result, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    @staticmethod
+    def log_security_event(user, house, event_type, details, **kwargs):
+        """
+        Log security events
+        """
+        log_data = ActivityLogger._security_event_data(user, house, event_type, details, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    @staticmethod
+    def log_system_health(metric_name, value, threshold, status, **kwargs):
+        """
+        Log system health metrics
+        """
+        log_data = ActivityLogger._system_health_data(metric_name, value, threshold, status, **kwargs)
+        return ActivityLogger._create_log(log_data)
+
+    # ========== ASYNC API ==========
+    # Safe to await from consumers and async views: nothing touches the
+    # database on the event loop. Entries are built and written in batches by
+    # async_log_writer (one thread hop and one COPY/INSERT per batch).
+
+    @staticmethod
+    async def alog(log_data):
+        """
+        Queue a prepared log_data dict (ActivityLog fields, FKs as instances
+        or *_id values)
+        """
+        async_log_writer.submit(dict, log_data)
+
+    @staticmethod
+    async def alog_device_control(*args, **kwargs):
+        """
+        Queue a log_device_control entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._device_control_data, *args, **kwargs)
+
+    @staticmethod
+    async def alog_user_authentication(*args, **kwargs):
+        """
+        Queue a log_user_authentication entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._user_authentication_data, *args, **kwargs)
+
+    @staticmethod
+    async def alog_house_management(*args, **kwargs):
+        """
+        Queue a log_house_management entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._house_management_data, *args, **kwargs)
+
+    @staticmethod
+    async def alog_automation_trigger(*args, **kwargs):
+        """
+        Queue a log_automation_trigger entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._automation_trigger_data, *args, **kwargs)
+
+    @staticmethod
+    async def alog_microcontroller_activity(*args, **kwargs):
+        """
+        Queue a log_microcontroller_activity entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._microcontroller_activity_data, *args, **kwargs)
+
+    @staticmethod
+    async def alog_security_event(*args, **kwargs):
+        """
+        Queue a log_security_event entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._security_event_data, *args, **kwargs)
+
+    @staticmethod
+    async def alog_system_health(*args, **kwargs):
+        """
+        Queue a log_system_health entry for the batching writer, returns immediately
+        """
+        async_log_writer.submit(ActivityLogger._system_health_data, *args, **kwargs)
+
+    # ========== LOG DATA BUILDERS ==========
+
+    @staticmethod
+    def _device_control_data(user, house, component, action_type, parameters, result, **kwargs):
         log_data = {
             'user': user,
             'house': house,
@@ -26,8 +186,8 @@ class ActivityLogger:
             'action_parameters': {
                 'component_id': str(component.id) if component else None,
                 'component_name': component.name if component else None,
-                'component_type': component.component_type.name if component else None,
-                'action_type': action_type.name if action_type else None,
+                'component_type': ActivityLogger._component_type_name(component) if component else None,
+                'action_type': getattr(action_type, 'name', action_type),
                 'parameters': parameters,
                 'device_state_before': kwargs.get('previous_state', {}),
                 'source': kwargs.get('source', 'mobile_app'),
@@ -52,13 +212,10 @@ class ActivityLogger:
             'execution_time': kwargs.get('execution_time'),
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
 
     @staticmethod
-    def log_user_authentication(user, house, action, result, **kwargs):
-        """
-        Log user authentication activities
-        """
+    def _user_authentication_data(user, house, action, result, **kwargs):
         log_data = {
             'user': user,
             'house': house,
@@ -85,15 +242,13 @@ class ActivityLogger:
             'source': kwargs.get('source', 'mobile_app'),
             'ip_address': kwargs.get('ip_address'),
             'user_agent': kwargs.get('user_agent', ''),
+            'is_billable': False,
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
 
     @staticmethod
-    def log_house_management(user, house, action, parameters, result, **kwargs):
-        """
-        Log house management activities
-        """
+    def _house_management_data(user, house, action, parameters, result, **kwargs):
         log_data = {
             'user': user,
             'house': house,
@@ -119,13 +274,10 @@ class ActivityLogger:
             'user_agent': kwargs.get('user_agent', ''),
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
 
     @staticmethod
-    def log_automation_trigger(house, component, automation_rule, trigger_data, result, **kwargs):
-        """
-        Log automation rule triggers
-        """
+    def _automation_trigger_data(house, component, automation_rule, trigger_data, result, **kwargs):
         log_data = {
             'user': kwargs.get('user'),
             'house': house,
@@ -151,13 +303,10 @@ class ActivityLogger:
             'execution_time': result.get('total_execution_time'),
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
 
     @staticmethod
-    def log_microcontroller_activity(microcontroller, action, data, result, **kwargs):
-        """
-        Log microcontroller activities
-        """
+    def _microcontroller_activity_data(microcontroller, action, data, result, **kwargs):
         log_data = {
             'house': microcontroller.house,
             'action_name': f'microcontroller_{action}',
@@ -181,15 +330,13 @@ class ActivityLogger:
             'log_level': 'info' if result.get('success', True) else 'error',
             'source': 'microcontroller',
             'ip_address': kwargs.get('ip_address'),
+            'is_billable': kwargs.get('is_billable', True),
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
 
     @staticmethod
-    def log_security_event(user, house, event_type, details, **kwargs):
-        """
-        Log security events
-        """
+    def _security_event_data(user, house, event_type, details, **kwargs):
         log_data = {
             'user': user,
             'house': house,
@@ -214,15 +361,13 @@ class ActivityLogger:
             'ip_address': kwargs.get('ip_address'),
             'user_agent': kwargs.get('user_agent', ''),
             'request_path': kwargs.get('request_path', ''),
+            'is_billable': False,
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
 
     @staticmethod
-    def log_system_health(metric_name, value, threshold, status, **kwargs):
-        """
-        Log system health metrics
-        """
+    def _system_health_data(metric_name, value, threshold, status, **kwargs):
         log_data = {
             'action_name': 'system_health_check',
             'action_parameters': {
@@ -242,9 +387,156 @@ class ActivityLogger:
             'log_level': 'warning' if status == 'warning' else 'error' if status == 'critical' else 'info',
             'source': 'system',
             'house': kwargs.get('house'),
+            'is_billable': False,
         }
 
-        return ActivityLogger._create_log(log_data)
+        return log_data
+
+    # ========== BULK INGEST ==========
+
+    @classmethod
+    def bulk_ingest(cls, rows, chunk_size=10000, using=None):
+        """
+        Stream log rows into activity_log / activity_log_detail.
+
+        `rows` is any iterable of dicts keyed like ActivityLog fields (FKs as
+        instances or *_id values, detail fields inline). Missing id/created_at
+        are filled in, created_at is kept as given so historical imports keep
+        their timestamps. On PostgreSQL each chunk is sent with COPY FROM
+        STDIN, other databases fall back to executemany.
+
+        Usage counters and the security detector are not fed, run
+        reconcile_usage after large imports.
+
+        Returns {'rows', 'seconds', 'rows_per_second'}
+        """
+        using = using or router.db_for_write(ActivityLog)
+        connection = connections[using]
+        writer = cls._copy_chunk if connection.vendor == 'postgresql' else cls._insert_chunk
+        log_fields = ActivityLog._meta.concrete_fields
+        detail_fields = ActivityLogDetail._meta.concrete_fields
+
+        started = time.perf_counter()
+        total = 0
+        chunk = []
+
+        def flush():
+            logs, details = [], []
+            for row in chunk:
+                log_values, detail_values = cls._ingest_values(row)
+                logs.append(log_values)
+                details.append(detail_values)
+            with transaction.atomic(using=using):
+                with connection.cursor() as cursor:
+                    writer(cursor, connection, ActivityLog._meta.db_table, log_fields, logs)
+                    writer(cursor, connection, ActivityLogDetail._meta.db_table, detail_fields, details)
+
+        for row in rows:
+            chunk.append(row)
+            if len(chunk) >= chunk_size:
+                flush()
+                total += len(chunk)
+                chunk = []
+        if chunk:
+            flush()
+            total += len(chunk)
+
+        seconds = time.perf_counter() - started
+        return {
+            'rows': total,
+            'seconds': seconds,
+            'rows_per_second': total / seconds if seconds else 0.0,
+        }
+
+    _ingest_plans = None
+
+    @classmethod
+    def _ingest_values(cls, row):
+        """
+        Split one input dict into activity_log and activity_log_detail values,
+        in concrete field order
+        """
+        if cls._ingest_plans is None:
+            # (attname, name, default) per column, defaults evaluated once
+            log_plan, detail_plan = (
+                [(field.attname, field.name, field.get_default()) for field in model._meta.concrete_fields]
+                for model in (ActivityLog, ActivityLogDetail)
+            )
+            names = [name for _, name, _ in log_plan]
+            positions = [names.index(name) for name in ('id', 'created_at', 'updated_at')]
+            cls._ingest_plans = (log_plan, detail_plan, positions)
+        log_plan, detail_plan, (id_pos, created_pos, updated_pos) = cls._ingest_plans
+
+        log_values = [row.get(attname, row.get(name, default)) for attname, name, default in log_plan]
+        detail_values = [row.get(name, default) for _, name, default in detail_plan]
+
+        # Primary key and timestamps are per row
+        log_id = row.get('id') or uuid7()
+        created_at = row.get('created_at') or timezone.now()
+        log_values[id_pos] = detail_values[0] = log_id
+        log_values[created_pos] = created_at
+        log_values[updated_pos] = row.get('updated_at') or created_at
+        return log_values, detail_values
+
+    @staticmethod
+    def copy_rows(cursor, table, columns, lines):
+        """
+        COPY already formatted text lines (one row each, newline terminated)
+        into `table`
+        """
+        buffer = io.StringIO()
+        buffer.writelines(lines)
+        buffer.seek(0)
+        cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN', buffer)
+
+    @classmethod
+    def _copy_chunk(cls, cursor, connection, table, fields, rows):
+        cls.copy_rows(
+            cursor, table, [field.column for field in fields],
+            # None and str inline, they are most of the values
+            ('\t'.join([
+                COPY_NULL if value is None
+                else value.translate(COPY_ESCAPES) if value.__class__ is str
+                else _copy_value(value)
+                for value in row
+            ]) + '\n' for row in rows),
+        )
+
+    @staticmethod
+    def _insert_chunk(cursor, connection, table, fields, rows):
+        columns = ', '.join(connection.ops.quote_name(field.column) for field in fields)
+        placeholders = ', '.join(['%s'] * len(fields))
+        params = [
+            [
+                field.get_db_prep_save(value.pk if isinstance(value, Model) else value, connection)
+                for field, value in zip(fields, row)
+            ]
+            for row in rows
+        ]
+        cursor.executemany(f'INSERT INTO {table} ({columns}) VALUES ({placeholders})', params)
+
+    @staticmethod
+    def _resolve_action_type(action_type_value):
+        """
+        ActionType instance for an instance, name or anything with a .name
+        """
+        if not action_type_value or isinstance(action_type_value, ActionType):
+            return action_type_value or None
+        name = getattr(action_type_value, 'name', action_type_value)
+        try:
+            return metadata_cache.action_type_by_name(str(name))
+        except Exception:
+            return None
+
+    @staticmethod
+    def _component_type_name(component):
+        """
+        Component type name without touching the database once cached
+        """
+        if Component.component_type.is_cached(component):
+            return component.component_type.name
+        component_type = metadata_cache.component_type(component.component_type_id)
+        return component_type.name if component_type else None
 
     @staticmethod
     def _create_log(log_data):
@@ -253,32 +545,10 @@ class ActivityLogger:
         """
         try:
             # Handle action_type - it could be ActionType instance or string
-            action_type_value = log_data.get('action_type')
-            action_type_instance = None
-
-            if action_type_value:
-                if isinstance(action_type_value, ActionType):
-                    # It's already an ActionType instance
-                    action_type_instance = action_type_value
-                elif hasattr(action_type_value, 'name'):
-                    # It has a .name attribute (might be ActionType instance)
-                    try:
-                        action_type_instance = ActionType.objects.filter(name=action_type_value.name).first()
-                    except:
-                        # If that fails, try to find by string
-                        try:
-                            action_type_instance = ActionType.objects.filter(name=str(action_type_value)).first()
-                        except:
-                            pass
-                else:
-                    # It's a string or something else
-                    try:
-                        action_type_instance = ActionType.objects.filter(name=str(action_type_value)).first()
-                    except:
-                        pass
+            action_type_instance = ActivityLogger._resolve_action_type(log_data.get('action_type'))
 
             # Create the log entry
-            return ActivityLog.objects.create(
+            log = ActivityLog.objects.create(
                 user=log_data.get('user'),
                 house=log_data.get('house'),
                 component=log_data.get('component'),
@@ -293,10 +563,77 @@ class ActivityLogger:
                 request_path=log_data.get('request_path', ''),
                 execution_time=log_data.get('execution_time'),
                 status_code=log_data.get('status_code'),
+                is_billable=log_data.get('is_billable', True),
             )
+
+            ActivityLogger._after_create(log_data)
+            return log
         except Exception as e:
             # Fallback logging if primary logging fails
             print(f"Failed to create activity log: {e}")
             print(f"Traceback: {traceback.format_exc()}")
             print(f"Log data that failed: {log_data}")
-            return None
\ No newline at end of file
+            return None
+
+    @staticmethod
+    def _after_create(log_data):
+        """
+        Feed the usage counters and the security detector for a written log
+        """
+        def related_id(name):
+            instance = log_data.get(name)
+            return instance.pk if instance is not None else log_data.get(f'{name}_id')
+
+        # Keep the usage counters in step without COUNT queries
+        if log_data.get('is_billable', True):
+            UsageCounter.record(user_id=related_id('user'), house_id=related_id('house'))
+
+        action_name = log_data.get('action_name')
+        if action_name == 'device_control':
+            security_detector.device_control(
+                component=log_data.get('component'), user=log_data.get('user'), house=log_data.get('house'),
+                ip_address=log_data.get('ip_address'), user_agent=log_data.get('user_agent', ''),
+            )
+        # Failed logins reach the detector from the user_login_failed signal
+        # (users.signals), counting them here too would halve the thresholds
+
+    @staticmethod
+    def _write_batch(entries):
+        """
+        Build and write a batch queued by the async API, called from
+        async_log_writer in a worker thread
+        """
+        rows = []
+        for builder, args, kwargs, created_at in entries:
+            try:
+                log_data = builder(*args, **kwargs)
+                log_data['action_type'] = ActivityLogger._resolve_action_type(log_data.get('action_type'))
+                log_data.setdefault('created_at', created_at)
+                rows.append(log_data)
+            except Exception as e:
+                print(f"Failed to build queued activity log: {e}")
+                print(f"Traceback: {traceback.format_exc()}")
+
+        try:
+            ActivityLogger.bulk_ingest(rows)
+        except Exception as e:
+            # One bad row fails the whole COPY, retry row by row to keep the rest
+            print(f"Batched activity log write failed, retrying rows one by one: {e}")
+            written = []
+            for log_data in rows:
+                try:
+                    ActivityLogger.bulk_ingest([log_data])
+                    written.append(log_data)
+                except Exception as e:
+                    print(f"Failed to create activity log: {e}")
+                    print(f"Log data that failed: {log_data}")
+            rows = written
+
+        for log_data in rows:
+            try:
+                ActivityLogger._after_create(log_data)
+            except Exception as e:
+                print(f"Activity log post-processing failed: {e}")
+
+
+async_log_writer = AsyncLogWriter(ActivityLogger._write_batch)
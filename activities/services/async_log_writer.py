@@ -0,0 +1,82 @@
+import asyncio
+import traceback
+import weakref
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.utils import timezone
+
+
+class AsyncLogWriter:
+    """
+    asyncio-side batching queue for activity logs.
+
+    submit() only appends (builder, args, kwargs, timestamp) to a per-loop
+    queue and returns. A background task per event loop collects up to
+    BATCH_SIZE entries (or whatever arrived within FLUSH_INTERVAL seconds) and
+    hands the batch to `write_batch` in one sync_to_async call, so building
+    the log data and all database work happen off the event loop.
+    """
+
+    def __init__(self, write_batch, batch_size=None, flush_interval=None, max_queue=None):
+        config = getattr(settings, 'ACTIVITY_LOG_ASYNC', {})
+        self.write_batch = write_batch
+        self.batch_size = batch_size or config.get('BATCH_SIZE', 500)
+        self.flush_interval = flush_interval or config.get('FLUSH_INTERVAL', 0.25)
+        self.max_queue = max_queue or config.get('MAX_QUEUE', 10000)
+        self.dropped = 0
+        # event loop -> (queue, writer task)
+        self._loops = weakref.WeakKeyDictionary()
+
+    def submit(self, builder, *args, **kwargs):
+        """
+        Queue one entry on the running loop, never blocks. Entries are dropped
+        (and counted) when the queue is full so a stalled database cannot grow
+        memory without bound.
+        """
+        queue = self._queue()
+        try:
+            queue.put_nowait((builder, args, kwargs, timezone.now()))
+        except asyncio.QueueFull:
+            self.dropped += 1
+            if self.dropped % 1000 == 1:
+                print(f"Activity log queue full, {self.dropped} entries dropped so far")
+
+    async def flush(self):
+        """
+        Wait until everything queued on this loop has been written
+        """
+        state = self._loops.get(asyncio.get_running_loop())
+        if state is not None:
+            await state[0].join()
+
+    def _queue(self):
+        loop = asyncio.get_running_loop()
+        state = self._loops.get(loop)
+        if state is None or state[1].done():
+            queue = asyncio.Queue(maxsize=self.max_queue)
+            task = loop.create_task(self._run(queue))
+            state = self._loops[loop] = (queue, task)
+        return state[0]
+
+    async def _run(self, queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            try:
+                await sync_to_async(self.write_batch)(batch)
+            except Exception as e:
+                print(f"Activity log batch write failed: {e}")
+                print(f"Traceback: {traceback.format_exc()}")
+            finally:
+                for _ in batch:
+                    queue.task_done()
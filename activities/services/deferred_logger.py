@@ -0,0 +1,74 @@
+import threading
+import traceback
+from django.db import connections, router, transaction
+from ..models import ActivityLog
+
+
+class DeferredActivityLogger:
+    """
+    Collects ActivityLog rows created from model/auth signals and writes them
+    after the surrounding transaction commits, one bulk_create per transaction
+    (per savepoint when savepoints are used). Rows added inside a transaction
+    or savepoint that rolls back are never written.
+
+    Outside a transaction (autocommit) the row is written immediately.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def log(self, using=None, **fields):
+        """
+        Queue one ActivityLog(**fields) for the current transaction
+        """
+        using = using or router.db_for_write(ActivityLog)
+        connection = connections[using]
+        log = ActivityLog(**fields)
+        if not connection.in_atomic_block:
+            self._flush(using, [log])
+            return
+        self._pending(connection, using).append(log)
+
+    def _pending(self, connection, using):
+        """
+        Pending list for the current savepoint stack, registering its
+        on_commit flush the first time
+        """
+        groups = self._groups(using)
+
+        # Django drops the on_commit hooks of rolled back savepoints and
+        # transactions, the lists behind those hooks are discarded with them
+        live = {id(hook) for _, hook, *_ in connection.run_on_commit}
+        for key in [key for key, (_, hook) in groups.items() if id(hook) not in live]:
+            del groups[key]
+
+        key = tuple(connection.savepoint_ids)
+        if key not in groups:
+            pending = []
+
+            def flush():
+                groups.pop(key, None)
+                self._flush(using, pending)
+
+            groups[key] = (pending, flush)
+            transaction.on_commit(flush, using=using)
+        return groups[key][0]
+
+    def _groups(self, using):
+        if not hasattr(self._local, 'groups'):
+            self._local.groups = {}
+        return self._local.groups.setdefault(using, {})
+
+    @staticmethod
+    def _flush(using, pending):
+        if not pending:
+            return
+        try:
+            ActivityLog.objects.using(using).bulk_create(pending)
+        except Exception as e:
+            # Logging must never break the committed request
+            print(f"Failed to write {len(pending)} deferred activity logs: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+
+deferred_logger = DeferredActivityLogger()
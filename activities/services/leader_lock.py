@@ -0,0 +1,64 @@
+import hashlib
+from django.db import connections, DEFAULT_DB_ALIAS
+
+
+class LeaderLock:
+    """
+    Leader election for singleton jobs with a PostgreSQL session advisory lock.
+
+    Every process that wants to run the job calls acquire() periodically; the
+    first one gets the lock and keeps it for as long as its database session
+    lives, the others get False and stay followers. If the leader dies or its
+    connection drops, PostgreSQL releases the lock and the next acquire()
+    elsewhere takes over.
+
+    The lock belongs to the connection of the calling thread, so acquire()
+    and release() must run on the same thread (sync_to_async's default
+    thread_sensitive mode does that). On other databases there is nothing to
+    elect with and acquire() always succeeds: run a single process there.
+    """
+
+    def __init__(self, name, using=DEFAULT_DB_ALIAS):
+        self.name = name
+        self.using = using
+        # Signed 64-bit key for pg_try_advisory_lock(bigint)
+        self.key = int.from_bytes(hashlib.blake2b(name.encode(), digest_size=8).digest(), 'big', signed=True)
+        self.held = False
+
+    @property
+    def supported(self):
+        return connections[self.using].vendor == 'postgresql'
+
+    def acquire(self):
+        """
+        Try to become (or confirm still being) the leader, never blocks
+        """
+        if not self.supported:
+            self.held = True
+            return True
+        with connections[self.using].cursor() as cursor:
+            if self.held:
+                # Session locks stack, so check instead of locking again. A
+                # reconnect loses the lock without any error.
+                cursor.execute(
+                    "SELECT 1 FROM pg_locks WHERE locktype = 'advisory' AND pid = pg_backend_pid() "
+                    "AND classid = %s AND objid = %s AND objsubid = 1 AND granted",
+                    [(self.key >> 32) & 0xFFFFFFFF, self.key & 0xFFFFFFFF]
+                )
+                if cursor.fetchone():
+                    return True
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.key])
+            self.held = bool(cursor.fetchone()[0])
+        return self.held
+
+    def release(self):
+        if self.held and self.supported:
+            with connections[self.using].cursor() as cursor:
+                cursor.execute('SELECT pg_advisory_unlock(%s)', [self.key])
+        self.held = False
+
+    def __enter__(self):
+        return self.acquire()
+
+    def __exit__(self, *exc_info):
+        self.release()
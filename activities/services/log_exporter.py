@@ -0,0 +1,181 @@
+import csv
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.db import models
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from ..models import ActivityLog, SecurityEvent
+
+
+class _LineBuffer:
+    """
+    File-like target for csv.writer that hands the formatted line back
+    instead of storing it
+    """
+
+    def write(self, value):
+        return value
+
+
+class LogExporter:
+    """
+    Streams ActivityLog / SecurityEvent querysets as CSV or JSON Lines.
+
+    Rows are read with values_list().iterator(chunk_size), which uses a
+    server-side cursor on PostgreSQL, and encoded chunk by chunk, so memory
+    stays flat regardless of the export size. The header (CSV) goes out
+    before the first query returns rows. Under ASGI the response gets an
+    async iterator (astream), a sync one would be read into memory whole by
+    the handler before the first byte is sent.
+    """
+
+    FORMATS = {
+        'csv': 'text/csv; charset=utf-8',
+        'jsonl': 'application/x-ndjson; charset=utf-8',
+    }
+    CHUNK_SIZE = 2000
+
+    # (column name, values_list lookup)
+    COLUMNS = {
+        ActivityLog: (
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('action_name', 'action_name'),
+            ('action_type', 'action_type__name'),
+            ('log_level', 'log_level'),
+            ('source', 'source'),
+            ('user_id', 'user_id'),
+            ('user_email', 'user__email'),
+            ('house_id', 'house_id'),
+            ('house_name', 'house__name'),
+            ('component_id', 'component_id'),
+            ('component_name', 'component__name'),
+            ('is_automated', 'is_automated'),
+            ('is_billable', 'is_billable'),
+            ('device_platform', 'device_platform'),
+            ('ip_address', 'ip_address'),
+            ('session_id', 'session_id'),
+            ('request_id', 'request_id'),
+            ('status_code', 'status_code'),
+            ('duration_ms', 'duration_ms'),
+            ('action_parameters', 'detail__action_parameters'),
+            ('action_result', 'detail__action_result'),
+            ('user_agent', 'detail__user_agent'),
+            ('request_path', 'detail__request_path'),
+        ),
+        SecurityEvent: (
+            ('id', 'id'),
+            ('created_at', 'created_at'),
+            ('event_type', 'event_type'),
+            ('severity', 'severity'),
+            ('description', 'description'),
+            ('user_id', 'user_id'),
+            ('user_email', 'user__email'),
+            ('house_id', 'house_id'),
+            ('house_name', 'house__name'),
+            ('component_id', 'component_id'),
+            ('ip_address', 'ip_address'),
+            ('user_agent', 'user_agent'),
+            ('request_path', 'request_path'),
+            ('session_id', 'session_id'),
+            ('is_resolved', 'is_resolved'),
+            ('resolved_at', 'resolved_at'),
+            ('resolution_notes', 'resolution_notes'),
+        ),
+    }
+
+    @classmethod
+    def response(cls, queryset, file_format, filename=None, chunk_size=None, request=None):
+        """
+        StreamingHttpResponse with the queryset encoded as `file_format`,
+        pass the request so ASGI requests get an async stream
+        """
+        if file_format not in cls.FORMATS:
+            raise ValueError(f"Unsupported export format: {file_format}")
+        if filename is None:
+            filename = (f"{queryset.model._meta.db_table}_"
+                        f"{timezone.now():%Y%m%d_%H%M%S}.{file_format}")
+        # DRF wraps the HttpRequest
+        if isinstance(getattr(request, '_request', request), ASGIRequest):
+            content = cls.astream(queryset, file_format, chunk_size)
+        else:
+            content = cls.stream(queryset, file_format, chunk_size)
+        response = StreamingHttpResponse(content, content_type=cls.FORMATS[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        # Ask nginx & co. not to buffer the whole body before sending it
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    @classmethod
+    def stream(cls, queryset, file_format, chunk_size=None):
+        """
+        Yield the encoded export, one string per chunk of rows
+        """
+        chunk_size = chunk_size or cls.CHUNK_SIZE
+        names, lookups = zip(*cls.COLUMNS[queryset.model])
+        rows = queryset.values_list(*lookups).iterator(chunk_size=chunk_size)
+
+        if file_format == 'csv':
+            writer = csv.writer(_LineBuffer())
+            yield writer.writerow(names)
+            encode = cls._csv_encoder(queryset.model, lookups, writer)
+        else:
+            encoder = DjangoJSONEncoder(separators=(',', ':'))
+            encode = lambda row: encoder.encode(dict(zip(names, row))) + '\n'
+
+        lines = []
+        for row in rows:
+            lines.append(encode(row))
+            if len(lines) >= chunk_size:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+
+    @classmethod
+    async def astream(cls, queryset, file_format, chunk_size=None):
+        """
+        stream() for ASGI: every chunk is fetched and encoded in the sync
+        thread that holds the database connection (and the server-side
+        cursor), the event loop only waits for it
+        """
+        chunks = cls.stream(queryset, file_format, chunk_size)
+        next_chunk = sync_to_async(next)
+        try:
+            while True:
+                chunk = await next_chunk(chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            # Client gone or export done, release the cursor
+            await sync_to_async(chunks.close)()
+
+    @staticmethod
+    def _csv_encoder(model, lookups, writer):
+        """
+        Row encoder that only converts the JSON and datetime columns, csv
+        already writes None as an empty field and str() for everything else
+        """
+        json_encoder = DjangoJSONEncoder(separators=(',', ':'))
+        converters = []
+        for index, lookup in enumerate(lookups):
+            field = model._meta.get_field(lookup.split('__')[0])
+            for part in lookup.split('__')[1:]:
+                field = field.related_model._meta.get_field(part)
+            if isinstance(field, models.JSONField):
+                converters.append((index, lambda value: json_encoder.encode(value) if value is not None else None))
+            elif isinstance(field, models.DateTimeField):
+                converters.append((index, lambda value: value.isoformat() if value is not None else None))
+
+        if not converters:
+            return writer.writerow
+
+        def encode(row):
+            row = list(row)
+            for index, convert in converters:
+                row[index] = convert(row[index])
+            return writer.writerow(row)
+
+        return encode
@@ -0,0 +1,147 @@
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Stats of the requests/messages being measured (nested blocks all count).
+# A ContextVar rather than a per-connection wrapper because sync_to_async
+# runs the ORM in another thread but copies the context along.
+_current_stats = ContextVar('query_budget_stats', default=())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryStats:
+    __slots__ = ('label', 'queries', 'seconds')
+
+    def __init__(self, label):
+        self.label = label
+        self.queries = 0
+        self.seconds = 0.0
+
+    @property
+    def milliseconds(self):
+        return self.seconds * 1000
+
+    def __repr__(self):
+        return f"<QueryStats {self.label}: {self.queries} queries, {self.milliseconds:.1f}ms>"
+
+
+def record_queries(execute, sql, params, many, context):
+    """
+    Connection execute wrapper, counts queries while a budget is active
+    """
+    active = _current_stats.get()
+    if not active:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - start
+        for stats in active:
+            stats.queries += 1
+            stats.seconds += elapsed
+
+
+def install_query_recorder(sender, connection, **kwargs):
+    """
+    connection_created receiver, adds record_queries to every new connection
+    """
+    if record_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_queries)
+
+
+class QueryBudget:
+    """
+    Per-request / per-message query counting against configurable budgets.
+
+    Budgets come from settings.QUERY_BUDGET: DEFAULT_QUERIES / DEFAULT_TIME_MS
+    and per-label overrides in VIEWS, e.g. {'house-list': 10,
+    'MobileAppConsumer': {'queries': 5, 'time_ms': 50}}. Labels are URL names
+    (falling back to the dotted view path) and '<consumer class>.<message
+    type>', where the bare class name covers all message types.
+    An exceeded budget is logged, or raised when RAISE is set.
+    """
+
+    @staticmethod
+    def config():
+        return getattr(settings, 'QUERY_BUDGET', {})
+
+    @classmethod
+    def enabled(cls):
+        return cls.config().get('ENABLED', True)
+
+    @classmethod
+    def limits(cls, label):
+        """
+        (max queries, max milliseconds) for a label, None means unlimited
+        """
+        config = cls.config()
+        queries = config.get('DEFAULT_QUERIES')
+        time_ms = config.get('DEFAULT_TIME_MS')
+        views = config.get('VIEWS', {})
+        # 'MobileAppConsumer.websocket.receive' falls back to 'MobileAppConsumer'
+        override = views.get(label, views.get(label.split('.', 1)[0]))
+        if isinstance(override, dict):
+            queries = override.get('queries', queries)
+            time_ms = override.get('time_ms', time_ms)
+        elif override is not None:
+            queries = override
+        return queries, time_ms
+
+    @classmethod
+    @contextmanager
+    def track(cls, label):
+        """
+        Count the queries run inside the block (including sync_to_async
+        calls made from it), yields the QueryStats
+        """
+        stats = QueryStats(label)
+        token = _current_stats.set(_current_stats.get() + (stats,))
+        try:
+            yield stats
+        finally:
+            _current_stats.reset(token)
+
+    @classmethod
+    def check(cls, stats):
+        max_queries, max_time_ms = cls.limits(stats.label)
+        problems = []
+        if max_queries is not None and stats.queries > max_queries:
+            problems.append(f"{stats.queries} queries (budget {max_queries})")
+        if max_time_ms is not None and stats.milliseconds > max_time_ms:
+            problems.append(f"{stats.milliseconds:.1f}ms in the database (budget {max_time_ms}ms)")
+        if not problems:
+            return
+        message = f"Query budget exceeded for {stats.label}: {', '.join(problems)}"
+        if cls.config().get('RAISE', False):
+            raise QueryBudgetExceeded(message)
+        logger.warning(message)
+
+
+def query_budget_consumer(consumer_class):
+    """
+    Class decorator for channels consumers, tracks every dispatched message
+    against the budget labelled '<consumer class>.<message type>'
+    """
+    original_dispatch = consumer_class.dispatch
+    label = consumer_class.__name__
+
+    @wraps(original_dispatch)
+    async def dispatch(self, message):
+        if not QueryBudget.enabled():
+            return await original_dispatch(self, message)
+        with QueryBudget.track(f"{label}.{message.get('type', '')}") as stats:
+            result = await original_dispatch(self, message)
+        QueryBudget.check(stats)
+        return result
+
+    consumer_class.dispatch = dispatch
+    return consumer_class
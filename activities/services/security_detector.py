@@ -0,0 +1,173 @@
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+from django.conf import settings
+from django.core.cache import cache
+from .usage_counter import incr_counter
+
+
+# rule name -> event raised when `threshold` hits land within `window` seconds.
+# Override per rule through settings.SECURITY_DETECTOR['RULES'].
+DEFAULT_RULES = {
+    'failed_login_ip': {
+        'event_type': 'failed_login',
+        'severity': 'high',
+        'window': 300,
+        'threshold': 10,
+        'description': '{count} failed logins from IP {key} within {window}s',
+    },
+    'failed_login_email': {
+        'event_type': 'failed_login',
+        'severity': 'medium',
+        'window': 300,
+        'threshold': 5,
+        'description': '{count} failed logins for {key} within {window}s',
+    },
+    'component_toggles': {
+        'event_type': 'unusual_activity',
+        'severity': 'medium',
+        'window': 60,
+        'threshold': 30,
+        'description': 'Rapid device switching: {count} commands to component {key} within {window}s',
+    },
+}
+
+
+class MemoryWindowCounter:
+    """
+    Exact sliding-window counters kept in process.
+
+    Keys are held in an LRU ordered dict capped at max_keys and each window
+    keeps at most `threshold` timestamps, so memory stays bounded whatever the
+    traffic (the count simply saturates at the threshold).
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._windows = OrderedDict()
+        self._fired = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, window, limit, now):
+        with self._lock:
+            timestamps = self._windows.get(key)
+            if timestamps is None or timestamps.maxlen != limit:
+                timestamps = self._windows[key] = deque(timestamps or (), maxlen=limit)
+                if len(self._windows) > self.max_keys:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(key)
+
+            timestamps.append(now)
+            cutoff = now - window
+            while timestamps and timestamps[0] <= cutoff:
+                timestamps.popleft()
+            return len(timestamps)
+
+    def first_alert(self, key, window, now):
+        """True once per key per window"""
+        with self._lock:
+            expires_at = self._fired.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._fired[key] = now + window
+            self._fired.move_to_end(key)
+            if len(self._fired) > self.max_keys:
+                self._fired.popitem(last=False)
+            return True
+
+
+class CacheWindowCounter:
+    """
+    Sliding-window counters shared by all workers through the cache (Redis).
+
+    The window is split into BUCKETS fixed buckets: a hit is one INCR and the
+    count is one get_many over the buckets, so the window slides in steps of
+    window / BUCKETS. Keys expire on their own, Redis eviction bounds memory.
+    """
+
+    BUCKETS = 10
+    KEY_PREFIX = 'secdet'
+
+    def hit(self, key, window, limit, now):
+        bucket_size = window / self.BUCKETS
+        current = int(now // bucket_size)
+        timeout = int(window + bucket_size) + 1
+        incr_counter(f'{self.KEY_PREFIX}:{key}:{current}', 1, timeout)
+        keys = [f'{self.KEY_PREFIX}:{key}:{bucket}' for bucket in range(current - self.BUCKETS + 1, current + 1)]
+        return sum(int(value or 0) for value in cache.get_many(keys).values())
+
+    def first_alert(self, key, window, now):
+        return cache.add(f'{self.KEY_PREFIX}:fired:{key}', 1, int(window))
+
+
+class SecurityDetector:
+    """
+    Streaming detector that turns bursts of auth failures and device commands
+    into SecurityEvent rows, without querying the activity log.
+
+    Fed from ActivityLogger and the auth signals. Every observation is one
+    counter hit; when a rule's threshold is crossed a single SecurityEvent is
+    created per (rule, key) and window.
+    """
+
+    def __init__(self, backend=None, max_keys=None, rules=None):
+        config = getattr(settings, 'SECURITY_DETECTOR', {})
+        backend = backend or config.get('BACKEND', 'memory')
+        max_keys = max_keys or config.get('MAX_KEYS', 10000)
+        self.counter = CacheWindowCounter() if backend == 'cache' else MemoryWindowCounter(max_keys)
+        self.rules = {name: dict(rule) for name, rule in DEFAULT_RULES.items()}
+        for name, overrides in (rules or config.get('RULES', {})).items():
+            self.rules.setdefault(name, {}).update(overrides)
+        self.enabled = config.get('ENABLED', True)
+
+    def observe(self, rule_name, key, now=None, **context):
+        """
+        Count one occurrence for the rule/key, return the SecurityEvent if
+        this hit crossed the threshold (None otherwise)
+        """
+        rule = self.rules.get(rule_name)
+        if not self.enabled or not rule or not key:
+            return None
+        now = time.time() if now is None else now
+        try:
+            counter_key = f'{rule_name}:{key}'
+            count = self.counter.hit(counter_key, rule['window'], rule['threshold'], now)
+            if count < rule['threshold'] or not self.counter.first_alert(counter_key, rule['window'], now):
+                return None
+            return self._raise_event(rule, key, count, context)
+        except Exception as e:
+            # Detection must never break the request that is being logged
+            print(f"Security detector error: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+            return None
+
+    def failed_login(self, ip_address=None, email=None, **context):
+        self.observe('failed_login_ip', ip_address, ip_address=ip_address, **context)
+        self.observe('failed_login_email', (email or '').lower() or None, ip_address=ip_address, **context)
+
+    def device_control(self, component=None, **context):
+        if component is not None:
+            self.observe('component_toggles', str(component.id), component=component, **context)
+
+    def _raise_event(self, rule, key, count, context):
+        from ..models import SecurityEvent
+
+        component = context.get('component')
+        return SecurityEvent.objects.create(
+            event_type=rule['event_type'],
+            severity=rule['severity'],
+            description=rule['description'].format(count=count, key=key, window=rule['window']),
+            user=context.get('user'),
+            house=context.get('house') or (component.house if component is not None else None),
+            component=component,
+            # ip_address is mandatory on SecurityEvent
+            ip_address=context.get('ip_address') or '0.0.0.0',
+            user_agent=context.get('user_agent') or '',
+            request_path=context.get('request_path') or '',
+            session_id=context.get('session_id') or '',
+        )
+
+
+security_detector = SecurityDetector()
@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils import timezone
+
+
+def incr_counter(key, amount=1, timeout=DEFAULT_TIMEOUT):
+    """
+    Atomic cache increment that creates the key on first use
+    """
+    try:
+        return cache.incr(key, amount)
+    except ValueError:
+        # First hit. add() is atomic, if another worker created the key in
+        # the meantime fall back to incr().
+        if cache.add(key, amount, timeout):
+            return amount
+        try:
+            return cache.incr(key, amount)
+        except ValueError:
+            return amount
+
+
+class UsageCounter:
+    """
+    Billable usage counters per (user, month) and (house, month).
+
+    Counters live in the cache (Redis in production) and are bumped with an
+    atomic INCR whenever a billable activity is logged, so quota checks never
+    have to COUNT(*) the activity log. The reconcile_usage command rewrites
+    them from the database every night to correct any drift.
+    """
+
+    KEY_PREFIX = 'usage'
+    # Keep a month's counter around a bit longer than the month itself
+    TIMEOUT = 40 * 24 * 60 * 60
+
+    @staticmethod
+    def period(when=None):
+        """Billing period key, e.g. '202610'"""
+        return timezone.localtime(when or timezone.now()).strftime('%Y%m')
+
+    @staticmethod
+    def period_bounds(period):
+        """Return (start, end) aware datetimes of a 'YYYYMM' period"""
+        start = timezone.make_aware(datetime.strptime(period, '%Y%m'))
+        end = (start + timedelta(days=32)).replace(day=1)
+        return start, end
+
+    @classmethod
+    def key(cls, scope, object_id, period):
+        return f'{cls.KEY_PREFIX}:{scope}:{object_id}:{period}'
+
+    @classmethod
+    def record(cls, user_id=None, house_id=None, when=None, amount=1):
+        """
+        Count one billable event for the user and/or house
+        """
+        period = cls.period(when)
+        for scope, object_id in (('user', user_id), ('house', house_id)):
+            if object_id:
+                incr_counter(cls.key(scope, object_id, period), amount, cls.TIMEOUT)
+
+    @classmethod
+    def get_usage(cls, user_id=None, house_id=None, period=None):
+        """
+        Current counters, one cache round trip
+        """
+        period = period or cls.period()
+        keys = {}
+        if user_id:
+            keys['user'] = cls.key('user', user_id, period)
+        if house_id:
+            keys['house'] = cls.key('house', house_id, period)
+        values = cache.get_many(list(keys.values())) if keys else {}
+        return {scope: int(values.get(key) or 0) for scope, key in keys.items()}
+
+    @staticmethod
+    def limits_for(tier=None):
+        """
+        {'user': n, 'house': n} for a subscription tier, None means unlimited
+        """
+        tier = tier or settings.DEFAULT_SUBSCRIPTION_TIER
+        return settings.USAGE_LIMITS.get(tier, settings.USAGE_LIMITS[settings.DEFAULT_SUBSCRIPTION_TIER])
+
+    @classmethod
+    def check_quota(cls, user_id=None, house_id=None, tier=None):
+        """
+        O(1) quota check for inline use before executing an action
+        """
+        usage = cls.get_usage(user_id=user_id, house_id=house_id)
+        limits = cls.limits_for(tier)
+        exceeded = [
+            scope for scope, used in usage.items()
+            if limits.get(scope) is not None and used >= limits[scope]
+        ]
+        return {
+            'allowed': not (exceeded and settings.ENFORCE_USAGE_LIMITS),
+            'exceeded': exceeded,
+            'usage': usage,
+            'limits': {scope: limits.get(scope) for scope in usage},
+            'period': cls.period(),
+        }
+
+    @classmethod
+    def set_counts(cls, scope, counts, period):
+        """
+        Overwrite counters with authoritative values {object_id: count}
+        """
+        cache.set_many(
+            {cls.key(scope, object_id, period): count for object_id, count in counts.items()},
+            cls.TIMEOUT
+        )
@@ -0,0 +1,12 @@
+'use strict';
+{
+    // Reload the changelist when an AutocompleteFilter selection changes
+    const $ = django.jQuery;
+    $(document).on('change', 'select.autocomplete-filter', function() {
+        const params = new URLSearchParams(this.dataset.queryString.replace(/^\?/, ''));
+        if (this.value) {
+            params.set(this.dataset.parameterName, this.value);
+        }
+        window.location.search = params.toString();
+    });
+}
@@ -0,0 +1,34 @@
+from contextlib import contextmanager
+from .services.query_budget import QueryBudget
+
+
+class QueryBudgetTestMixin:
+    """
+    TestCase mixin asserting that an endpoint stays within its query budget.
+
+        with self.assertQueryBudget('component-list'):
+            self.client.get('/api/devices/components/')
+
+    Limits default to settings.QUERY_BUDGET for the label, pass
+    max_queries / max_time_ms to pin a tighter budget in the test.
+    """
+
+    @contextmanager
+    def assertQueryBudget(self, label, max_queries=None, max_time_ms=None):
+        budget_queries, budget_time_ms = QueryBudget.limits(label)
+        max_queries = budget_queries if max_queries is None else max_queries
+        max_time_ms = budget_time_ms if max_time_ms is None else max_time_ms
+
+        with QueryBudget.track(label) as stats:
+            yield stats
+
+        if max_queries is not None:
+            self.assertLessEqual(
+                stats.queries, max_queries,
+                f"{label} ran {stats.queries} queries, budget is {max_queries}"
+            )
+        if max_time_ms is not None:
+            self.assertLessEqual(
+                stats.milliseconds, max_time_ms,
+                f"{label} spent {stats.milliseconds:.1f}ms in the database, budget is {max_time_ms}ms"
+            )
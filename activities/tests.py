@@ -1,3 +1,395 @@
-from django.test import TestCase
+import csv
+import io
+import json
+from datetime import timedelta
+from unittest import mock
+from asgiref.sync import sync_to_async
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from activities.models import ActivityLog, ActivityLogDetail
+from activities.paginators import EstimatedCountPaginator
+from activities.services.activity_logger import ActivityLogger
+from activities.services.deferred_logger import deferred_logger
+from activities.services.log_exporter import LogExporter
+from activities.services.query_budget import QueryBudgetExceeded
+from activities.services.usage_counter import UsageCounter
+from devices.metadata_cache import metadata_cache
+from devices.models import ActionType, Component, ComponentType
+from houses.models import House, HouseUser
+from users.models import User
 
-# Create your tests here.
+
+class ActivityLoggerQueryCountTests(TestCase):
+    """
+    Logging must not add SELECTs for ActionType / ComponentType metadata
+    """
+
+    def setUp(self):
+        metadata_cache.invalidate_action_types()
+        metadata_cache.invalidate_component_types()
+        self.user = User.objects.create_user(email='owner@example.com', password='secret',
+                                             first_name='Owner', last_name='User')
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        self.light = ComponentType.objects.create(name='light')
+        self.toggle = ActionType.objects.create(name='toggle')
+        self.component = Component.objects.create(
+            component_type=self.light, house=self.house, name='Lamp',
+            device_id='lamp-1', mac_address='AA:BB:CC:DD:EE:01',
+        )
+
+    def _log(self, component, action_type):
+        return ActivityLogger.log_device_control(
+            user=self.user, house=self.house, component=component, action_type=action_type,
+            parameters={'power': 'on'}, result={'success': True}, ip_address='10.0.0.1',
+        )
+
+    def _selects(self, context):
+        return [query['sql'] for query in context.captured_queries if query['sql'].lstrip().upper().startswith('SELECT')]
+
+    def test_device_control_needs_no_selects_once_warm(self):
+        self._log(Component.objects.get(pk=self.component.pk), 'toggle')
+
+        component = Component.objects.get(pk=self.component.pk)
+        with CaptureQueriesContext(connection) as context:
+            log = self._log(component, 'toggle')
+
+        self.assertEqual(self._selects(context), [])
+        # activity_log + activity_log_detail
+        self.assertEqual(len(context.captured_queries), 2)
+        self.assertEqual(log.action_type, self.toggle)
+        self.assertEqual(log.action_parameters['component_type'], 'light')
+
+    def test_action_type_instance_and_unknown_name_need_no_selects(self):
+        self._log(self.component, 'no_such_action')
+
+        with CaptureQueriesContext(connection) as context:
+            self._log(self.component, self.toggle)
+            log = self._log(self.component, 'no_such_action')
+
+        self.assertEqual(self._selects(context), [])
+        self.assertIsNone(log.action_type)
+
+    def test_cache_is_invalidated_on_save(self):
+        self.assertEqual(metadata_cache.action_type_by_name('toggle'), self.toggle)
+        self.assertIsNone(metadata_cache.action_type_by_name('switch'))
+
+        self.toggle.name = 'switch'
+        self.toggle.save()
+        self.light.name = 'lamp'
+        self.light.save()
+
+        self.assertIsNone(metadata_cache.action_type_by_name('toggle'))
+        self.assertEqual(metadata_cache.action_type_by_name('switch').pk, self.toggle.pk)
+        self.assertEqual(metadata_cache.component_type(self.light.pk).name, 'lamp')
+
+    def test_cache_is_size_bounded(self):
+        for index in range(metadata_cache.action_types.max_size + 10):
+            metadata_cache.action_types.set(('name', f'action-{index}'), None)
+        self.assertEqual(len(metadata_cache.action_types), metadata_cache.action_types.max_size)
+
+
+class QueryBudgetMiddlewareTests(TestCase):
+    """
+    Requests are counted per URL name and checked against QUERY_BUDGET
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='secret',
+                                             first_name='Owner', last_name='User')
+        self.client.force_login(self.user)
+
+    def _budget(self, **overrides):
+        return override_settings(QUERY_BUDGET={
+            'ENABLED': True, 'DEFAULT_QUERIES': 30, 'DEFAULT_TIME_MS': None,
+            'VIEWS': {}, 'RAISE': False, 'HEADER': True, **overrides,
+        })
+
+    def test_header_reports_query_count(self):
+        with self._budget(), CaptureQueriesContext(connection) as context:
+            response = self.client.get('/api/activities/usage/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(int(response['X-Query-Count']), len(context.captured_queries))
+        self.assertIn('X-Query-Time-Ms', response)
+
+    def test_exceeded_budget_is_logged(self):
+        with self._budget(VIEWS={'activity-usage': 0}), \
+                self.assertLogs('activities.services.query_budget', 'WARNING') as logs:
+            self.client.get('/api/activities/usage/')
+        self.assertIn('Query budget exceeded for activity-usage', logs.output[0])
+
+    def test_exceeded_budget_raises_when_configured(self):
+        with self._budget(VIEWS={'activity-usage': 0}, RAISE=True):
+            with self.assertRaises(QueryBudgetExceeded):
+                self.client.get('/api/activities/usage/')
+
+    def test_no_header_when_disabled(self):
+        with self._budget(HEADER=False):
+            response = self.client.get('/api/activities/usage/')
+        self.assertNotIn('X-Query-Count', response)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                       'LOCATION': 'usage-counter-tests'}})
+class UsageCounterTests(TestCase):
+    """
+    Billable usage is counted per user and house and checked against the tier limits
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='secret',
+                                             first_name='Owner', last_name='User')
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        HouseUser.objects.create(user=self.user, house=self.house, access_level='owner')
+        self.client.force_login(self.user)
+
+    def test_counters_per_user_house_and_period(self):
+        UsageCounter.record(user_id=self.user.id, house_id=self.house.id)
+        UsageCounter.record(user_id=self.user.id, amount=2)
+        UsageCounter.record(user_id=self.user.id, when=timezone.now() - timedelta(days=40))
+        self.assertEqual(UsageCounter.get_usage(user_id=self.user.id, house_id=self.house.id),
+                         {'user': 3, 'house': 1})
+
+    @override_settings(USAGE_LIMITS={'free': {'user': 2, 'house': None}}, DEFAULT_SUBSCRIPTION_TIER='free')
+    def test_quota_is_enforced_only_when_configured(self):
+        UsageCounter.record(user_id=self.user.id, house_id=self.house.id, amount=2)
+        quota = UsageCounter.check_quota(user_id=self.user.id, house_id=self.house.id)
+        self.assertEqual((quota['allowed'], quota['exceeded']), (True, ['user']))
+        with self.settings(ENFORCE_USAGE_LIMITS=True):
+            self.assertFalse(UsageCounter.check_quota(user_id=self.user.id)['allowed'])
+            self.assertTrue(UsageCounter.check_quota(house_id=self.house.id)['allowed'])
+
+    def test_usage_endpoint_checks_the_house(self):
+        UsageCounter.record(user_id=self.user.id, house_id=self.house.id)
+        response = self.client.get('/api/activities/usage/', {'house': str(self.house.id)})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['usage'], {'user': 1, 'house': 1})
+        self.assertEqual(self.client.get('/api/activities/usage/', {'house': 'not-a-uuid'}).status_code, 400)
+        other = House.objects.create(name='Other House', address='2 Main St', house_code='TEST02')
+        self.assertEqual(self.client.get('/api/activities/usage/', {'house': str(other.id)}).status_code, 404)
+
+
+class ActivityLogSearchTests(TestCase):
+    """
+    The search endpoint filters the user's logs and rejects malformed parameters
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='secret',
+                                             first_name='Owner', last_name='User')
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        HouseUser.objects.create(user=self.user, house=self.house, access_level='owner')
+        other = House.objects.create(name='Other House', address='2 Main St', house_code='TEST02')
+        for house, action_name, agent, result in (
+                (self.house, 'device_control', 'SmartHouse/1.2 (Android)', {'success': True}),
+                (self.house, 'device_control', 'SmartHouse/1.2 (iOS)', {'error_code': 'CONTROL_ERROR'}),
+                (self.house, 'login', 'Mozilla/5.0', {}),
+                (other, 'device_control', 'SmartHouse/1.2 (Android)', {'success': True}),
+        ):
+            ActivityLog.objects.create(house=house, user=self.user, action_name=action_name, user_agent=agent,
+                                       action_result=result)
+        self.client.force_login(self.user)
+
+    def search(self, **params):
+        return self.client.get('/api/activities/search/', params)
+
+    def test_text_payload_and_house_filters(self):
+        response = self.search(q='Android')
+        self.assertEqual(response.status_code, 200)
+        # Only logs of the user's houses
+        self.assertEqual([log['user_agent'] for log in response.json()['results']], ['SmartHouse/1.2 (Android)'])
+        response = self.search(result='{"error_code": "CONTROL_ERROR"}', house=str(self.house.id))
+        self.assertEqual([log['user_agent'] for log in response.json()['results']], ['SmartHouse/1.2 (iOS)'])
+        self.assertEqual(self.search(q='device_control').json()['count'], 2)
+
+    def test_limit_is_clamped(self):
+        self.assertEqual(self.search(limit=-5).json()['count'], 1)
+        self.assertEqual(self.search(limit=0).json()['count'], 1)
+        self.assertEqual(self.search(limit='many').json()['count'], 3)
+
+    def test_malformed_parameters_are_rejected(self):
+        for params in ({'house': 'not-a-uuid'}, {'component': '42'}, {'user': 'x'},
+                       {'since': 'yesterday'}, {'parameters': '[1, 2]'}):
+            response = self.search(**params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertIn('error', response.json())
+
+    def test_security_event_export_rejects_malformed_ids(self):
+        self.user.is_staff = True
+        self.user.save(update_fields=['is_staff'])
+        response = self.client.get('/api/activities/security-events/export.csv', {'house': 'not-a-uuid'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Invalid house id'})
+
+
+
+class LogExportTests(TestCase):
+    """
+    Exports stream chunk by chunk, with an async iterator under ASGI
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='admin@example.com', password='secret',
+                                                  first_name='Admin', last_name='User')
+        ActivityLog.objects.bulk_create([ActivityLog(action_name=f'action-{index}', user_agent='tests')
+                                         for index in range(5)])
+        self.queryset = ActivityLog.objects.order_by('action_name')
+
+    def test_wsgi_export_is_a_sync_stream(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/api/activities/export.jsonl', {'q': 'tests'})
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['action_name'] for line in lines],
+                         [f'action-{index}' for index in range(4, -1, -1)])
+
+    async def test_asgi_export_is_read_chunk_by_chunk(self):
+        request = AsyncRequestFactory().get('/api/activities/export.csv')
+        response = await sync_to_async(LogExporter.response)(self.queryset, 'csv', chunk_size=2, request=request)
+        self.assertTrue(response.is_async)
+        chunks = aiter(response.streaming_content)
+        self.assertTrue((await anext(chunks)).startswith(b'id,created_at,action_name,'))
+        rows = [list(csv.reader(io.StringIO((await anext(chunks)).decode()))) for _ in range(3)]
+        self.assertEqual([[row[2] for row in chunk] for chunk in rows],
+                         [['action-0', 'action-1'], ['action-2', 'action-3'], ['action-4']])
+        with self.assertRaises(StopAsyncIteration):
+            await anext(chunks)
+
+    async def test_asgi_view_streams_asynchronously(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get('/api/activities/export.csv')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content]).decode()
+        self.assertEqual(len(body.splitlines()), 6)
+
+class DeferredActivityLoggerTests(TestCase):
+    """
+    Signal logs are written once the transaction commits, and dropped with
+    the transaction or savepoint they were queued in
+    """
+
+    def logged(self):
+        return sorted(ActivityLog.objects.values_list('action_name', flat=True))
+
+    def test_logs_are_bulk_written_on_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                deferred_logger.log(action_name='first', user_agent='tests')
+                deferred_logger.log(action_name='second')
+                self.assertEqual(self.logged(), [])
+        # One flush for the transaction
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(self.logged(), ['first', 'second'])
+        self.assertEqual(ActivityLog.objects.get(action_name='first').user_agent, 'tests')
+
+    def test_rolled_back_transaction_writes_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    deferred_logger.log(action_name='lost')
+                    raise RuntimeError
+        self.assertEqual(callbacks, [])
+        self.assertEqual(self.logged(), [])
+
+    def test_rolled_back_savepoint_drops_only_its_logs(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                deferred_logger.log(action_name='before')
+                with self.assertRaises(RuntimeError):
+                    with transaction.atomic():
+                        deferred_logger.log(action_name='lost')
+                        raise RuntimeError
+                with transaction.atomic():
+                    deferred_logger.log(action_name='kept')
+                deferred_logger.log(action_name='after')
+        self.assertEqual(self.logged(), ['after', 'before', 'kept'])
+
+
+class LargeTableAdminTests(TestCase):
+    """
+    Log changelists paginate on the planner estimate instead of COUNT(*)
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='admin@example.com', password='secret',
+                                                  first_name='Admin', last_name='User')
+        self.client.force_login(self.user)
+        ActivityLog.objects.bulk_create([ActivityLog(action_name=f'action-{index}') for index in range(3)])
+
+    def counts(self, context):
+        return [query['sql'] for query in context.captured_queries if 'COUNT(' in query['sql'].upper()]
+
+    def test_changelist_uses_the_estimate(self):
+        # What the planner statistics report on a large PostgreSQL table
+        with mock.patch.object(EstimatedCountPaginator, '_estimate', return_value=250_000), \
+                CaptureQueriesContext(connection) as context:
+            response = self.client.get('/admin/activities/activitylog/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counts(context), [])
+        self.assertContains(response, '250000 Activity Logs')
+
+    def test_small_or_unknown_estimates_count_exactly(self):
+        queryset = ActivityLog.objects.order_by('created_at')
+        self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 3)
+        with mock.patch.object(EstimatedCountPaginator, '_estimate', return_value=50):
+            self.assertEqual(EstimatedCountPaginator(queryset, 10).count, 3)
+
+
+class ActivityLogDetailTests(TestCase):
+    """
+    Detail fields are written to activity_log_detail and can still be
+    queried as if they were columns of activity_log
+    """
+
+    def setUp(self):
+        ActivityLog.objects.bulk_create([
+            ActivityLog(action_name='android', user_agent='SmartHouse (Android)', subscription_tier='premium'),
+            ActivityLog(action_name='ios', user_agent='SmartHouse (iOS)', subscription_tier='basic'),
+            ActivityLog(action_name='bare'),
+        ])
+
+    def names(self, queryset):
+        return list(queryset.values_list('action_name', flat=True))
+
+    def test_bulk_create_writes_only_rows_with_details(self):
+        self.assertEqual(ActivityLog.objects.count(), 3)
+        self.assertEqual(sorted(ActivityLogDetail.objects.values_list('user_agent', flat=True)),
+                         ['SmartHouse (Android)', 'SmartHouse (iOS)'])
+        self.assertEqual(ActivityLog.objects.with_detail().get(action_name='bare').user_agent, '')
+
+    def test_save_writes_dirty_detail_fields(self):
+        log = ActivityLog.objects.get(action_name='bare')
+        with self.assertNumQueries(1):
+            log.log_level = 'warning'
+            log.save()
+        log.request_path = '/api/components/'
+        log.save()
+        log = ActivityLog.objects.get(pk=log.pk)
+        self.assertEqual(log.request_path, '/api/components/')
+        log.request_path = '/api/houses/'
+        log.save()
+        self.assertEqual(ActivityLogDetail.objects.get(log=log).request_path, '/api/houses/')
+
+    def test_lookups_are_rerouted_to_the_detail_table(self):
+        logs = ActivityLog.objects.order_by('action_name')
+        self.assertEqual(self.names(logs.filter(user_agent__contains='iOS')), ['ios'])
+        self.assertEqual(self.names(logs.filter(Q(user_agent__endswith='(iOS)') | Q(action_name='bare'))),
+                         ['bare', 'ios'])
+        self.assertEqual(self.names(logs.exclude(~Q(subscription_tier='premium'))), ['android'])
+        self.assertEqual(self.names(logs.filter(subscription_tier__gt='').order_by('-subscription_tier')),
+                         ['android', 'ios'])
+        self.assertEqual(list(logs.filter(action_name='ios').values('action_name', 'user_agent')),
+                         [{'action_name': 'ios', 'user_agent': 'SmartHouse (iOS)'}])
+        self.assertEqual(list(logs.exclude(action_name='bare').values_list('subscription_tier', flat=True)),
+                         ['premium', 'basic'])
+
+        self.assertEqual(logs.filter(action_name='ios').update(subscription_tier='premium', log_level='error'), 1)
+        self.assertEqual(self.names(logs.filter(subscription_tier='premium', log_level='error')), ['ios'])
+
+        with self.assertNumQueries(1):
+            log = logs.only('action_name', 'user_agent').get(action_name='android')
+            self.assertEqual(log.user_agent, 'SmartHouse (Android)')
@@ -3,4 +3,9 @@ from . import views
 
 urlpatterns = [
     path('', views.activity_home, name='activity-home'),
+    path('search/', views.search_activity_logs, name='activity-search'),
+    path('usage/', views.usage_quota, name='activity-usage'),
+    path('export.<str:file_format>', views.export_activity_logs, name='activity-export'),
+    path('security-events/export.<str:file_format>', views.export_security_events,
+         name='security-event-export'),
 ]
\ No newline at end of file
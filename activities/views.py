@@ -1,16 +1,168 @@
+import json
+from django.core.exceptions import ValidationError
 from django.http import HttpResponse
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from django.utils import timezone
 from django.db import connection
 from devices.models import Component
 from users.models import User
+from .models import ActivityLog, SecurityEvent
+from .serializers import ActivityLogSerializer
+from .services.log_exporter import LogExporter
+from .services.usage_counter import UsageCounter
 
 
 def activity_home(request):
     return HttpResponse("📊 I am the Activity Views!")
 
 
+def _visible_logs(user):
+    """
+    Activity logs the user may read: everything for staff, otherwise only
+    logs of houses the user is a member of
+    """
+    queryset = ActivityLog.objects.all()
+    if not user.is_staff:
+        user_houses = user.house_memberships.values_list('house_id', flat=True)
+        queryset = queryset.filter(house_id__in=user_houses)
+    return queryset
 
-    
\ No newline at end of file
+
+def _filter_logs(request, queryset):
+    """
+    Apply the search/export query parameters, returns (queryset, error response)
+    """
+    try:
+        parameters = json.loads(request.query_params.get('parameters') or '{}')
+        result = json.loads(request.query_params.get('result') or '{}')
+    except json.JSONDecodeError:
+        return queryset, Response({'error': 'parameters/result must be JSON objects'},
+                                  status=status.HTTP_400_BAD_REQUEST)
+    if not isinstance(parameters, dict) or not isinstance(result, dict):
+        return queryset, Response({'error': 'parameters/result must be JSON objects'},
+                                  status=status.HTTP_400_BAD_REQUEST)
+
+    text = request.query_params.get('q', '').strip()
+    if text:
+        queryset = queryset.search(text)
+    queryset = queryset.payload_contains(parameters=parameters, result=result)
+
+    for param, lookup in (('house', 'house_id'), ('component', 'component_id'), ('user', 'user_id'),
+                          ('log_level', 'log_level'), ('source', 'source')):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except ValidationError:
+                return queryset, Response({'error': f'Invalid {param} id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    for param, lookup in (('since', 'created_at__gte'), ('until', 'created_at__lt')):
+        value = request.query_params.get(param)
+        if value:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return queryset, Response({'error': f'Invalid {param} timestamp'},
+                                          status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**{lookup: parsed})
+
+    return queryset, None
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_activity_logs(request):
+    """
+    Search activity logs
+
+    Query parameters:
+        q           full-text search (websearch syntax on Postgres)
+        parameters  JSON object contained in action_parameters
+        result      JSON object contained in action_result, e.g. {"error_code": "CONTROL_ERROR"}
+        house, component, user, log_level, source, since, until, limit
+    """
+    queryset, error = _filter_logs(request, _visible_logs(request.user))
+    if error is not None:
+        return error
+
+    try:
+        limit = min(max(int(request.query_params.get('limit', 50)), 1), 500)
+    except ValueError:
+        limit = 50
+
+    queryset = queryset.select_related('house', 'component', 'user', 'detail').order_by('-created_at')[:limit]
+    serializer = ActivityLogSerializer(queryset, many=True)
+    return Response({'count': len(serializer.data), 'results': serializer.data})
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def usage_quota(request):
+    """
+    Billable usage of the current user (and optionally a house) this month
+
+    Query parameters:
+        house   house id, must be one of the user's houses
+    """
+    house_id = request.query_params.get('house')
+    try:
+        is_member = not house_id or request.user.house_memberships.filter(house_id=house_id).exists()
+    except ValidationError:
+        return Response({'error': 'Invalid house id'}, status=status.HTTP_400_BAD_REQUEST)
+    if not is_member:
+        return Response({'error': 'House not found'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(UsageCounter.check_quota(user_id=request.user.id, house_id=house_id))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_activity_logs(request, file_format):
+    """
+    Stream every matching activity log as CSV or JSON Lines (/export.csv,
+    /export.jsonl). Accepts the same query parameters as search, without limit.
+    """
+    if file_format not in LogExporter.FORMATS:
+        return Response({'error': f'Unsupported format, use one of: {", ".join(LogExporter.FORMATS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    queryset, error = _filter_logs(request, _visible_logs(request.user))
+    if error is not None:
+        return error
+    return LogExporter.response(queryset.order_by('-created_at'), file_format, request=request)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_security_events(request, file_format):
+    """
+    Stream security events as CSV or JSON Lines (staff only)
+
+    Query parameters:
+        event_type, severity, house, user, resolved (true/false), since, until
+    """
+    if file_format not in LogExporter.FORMATS:
+        return Response({'error': f'Unsupported format, use one of: {", ".join(LogExporter.FORMATS)}'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    queryset = SecurityEvent.objects.all()
+    for param, lookup in (('event_type', 'event_type'), ('severity', 'severity'),
+                          ('house', 'house_id'), ('user', 'user_id')):
+        value = request.query_params.get(param)
+        if value:
+            try:
+                queryset = queryset.filter(**{lookup: value})
+            except ValidationError:
+                return Response({'error': f'Invalid {param} id'}, status=status.HTTP_400_BAD_REQUEST)
+    resolved = request.query_params.get('resolved')
+    if resolved in ('true', 'false'):
+        queryset = queryset.filter(is_resolved=resolved == 'true')
+    for param, lookup in (('since', 'created_at__gte'), ('until', 'created_at__lt')):
+        value = request.query_params.get(param)
+        if value:
+            parsed = parse_datetime(value)
+            if parsed is None:
+                return Response({'error': f'Invalid {param} timestamp'},
+                                status=status.HTTP_400_BAD_REQUEST)
+            queryset = queryset.filter(**{lookup: parsed})
+    return LogExporter.response(queryset.order_by('-created_at'), file_format, request=request)
@@ -0,0 +1,108 @@
+"""
+Django management command to report overlapping schedules across the fleet
+
+Active schedules are streamed ordered by component, each component's
+schedules go into an interval tree (services.schedule_conflicts) and every
+schedule is looked up in its component's tree, so the audit costs
+O(n log n + k) for k overlaps instead of comparing every pair:
+    • conflict: overlapping schedules with different actions, the
+      component flaps between them
+    • duplicate: the same action and parameters, one of them is wasted
+
+Usage:
+    python manage.py audit_schedule_conflicts
+    python manage.py audit_schedule_conflicts --house=<uuid> --limit=0
+    python manage.py audit_schedule_conflicts --kind=conflict --fail
+"""
+import itertools
+import time
+from collections import Counter
+from django.core.management.base import BaseCommand, CommandError
+from automation.models import Schedule
+from automation.services.schedule_conflicts import CONFLICT_FIELDS, ComponentSchedules
+
+
+class Command(BaseCommand):
+    help = 'Report overlapping schedules on the same component across the fleet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--house',
+            action='append',
+            default=[],
+            help='House id to audit, repeatable (default: every house)'
+        )
+        parser.add_argument(
+            '--kind',
+            choices=('conflict', 'duplicate'),
+            default=None,
+            help='Only report this kind of overlap'
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=50,
+            help='Overlaps listed, 0 for all (default: 50)'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5_000,
+            help='Rows fetched at a time (default: 5000)'
+        )
+        parser.add_argument(
+            '--fail',
+            action='store_true',
+            help='Exit with an error when overlaps are found, for CI and cron checks'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        schedules = Schedule.objects.filter(is_active=True)
+        if options['house']:
+            schedules = schedules.filter(house_id__in=options['house'])
+        rows = schedules.order_by('component_id', 'id').values(
+            *CONFLICT_FIELDS, 'house_id', 'component__name').iterator(chunk_size=max(options['chunk_size'], 1))
+
+        totals = Counter()
+        listed = []
+        limit = options['limit']
+        for component_id, component_rows in itertools.groupby(rows, key=lambda row: row['component_id']):
+            component_rows = list(component_rows)
+            totals['schedules'] += len(component_rows)
+            totals['components'] += 1
+            if len(component_rows) < 2:
+                continue
+            names = {row['id']: row['name'] for row in component_rows}
+            for conflict in ComponentSchedules(component_rows).conflicts():
+                if options['kind'] and conflict['kind'] != options['kind']:
+                    continue
+                totals[conflict['kind']] += 1
+                if not limit or len(listed) < limit:
+                    listed.append((component_rows[0], names[conflict['schedule_id']], conflict))
+        elapsed = time.perf_counter() - started
+
+        # ========== REPORT ==========
+        self.stdout.write(f"🔍 {totals['schedules']:,} active schedules on {totals['components']:,} components "
+                          f"audited in {elapsed:.2f}s")
+        if listed:
+            self.stdout.write('')
+            self.stdout.write(f'{"kind":<10} {"at":<10} {"house":<38} {"component":<24} schedules')
+            for row, name, conflict in listed:
+                self.stdout.write(
+                    f"{conflict['kind']:<10} {conflict['at']:<10} {str(row['house_id']):<38} "
+                    f"{row['component__name'][:24]:<24} '{name}' / '{conflict['other_name']}'"
+                )
+            found = totals['conflict'] + totals['duplicate']
+            if found > len(listed):
+                self.stdout.write(f'   ... {found - len(listed):,} more, --limit=0 lists all')
+
+        self.stdout.write('')
+        if totals['conflict'] or totals['duplicate']:
+            self.stdout.write(self.style.WARNING(
+                f"⚠️  {totals['conflict']:,} conflicts, {totals['duplicate']:,} duplicates"
+            ))
+            if options['fail']:
+                raise CommandError('Overlapping schedules found')
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No overlapping schedules'))
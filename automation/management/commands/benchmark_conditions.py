@@ -0,0 +1,162 @@
+"""
+Django management command to microbenchmark AutomationRule.trigger_conditions
+evaluation
+
+For a few typical condition shapes (single comparison, range, all-of,
+nested and/or/not, time window) it times, per evaluation:
+    • interpreted: walking the condition JSON on every event, what rule
+      evaluation costs without the compiler
+    • compiled: calling the closure from conditions.compile_conditions()
+and, per rule, the one-off compile and a CompiledConditionCache hit. Both
+evaluators are checked to agree on random inputs first.
+
+Usage:
+    python manage.py benchmark_conditions
+    python manage.py benchmark_conditions --iterations=1000000
+"""
+import operator
+import random
+import time
+import uuid
+from datetime import datetime, time as dt_time, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from automation.services.conditions import CompiledConditionCache, DEFAULT_ATTRIBUTES, compile_conditions
+
+LAMP, SENSOR, DOOR = (str(uuid.UUID(int=index, version=4)) for index in range(1, 4))
+
+SHAPES = {
+    'comparison': {'component_id': LAMP, 'value': 'on'},
+    'range': {'component_id': SENSOR, 'attribute': 'value', 'operator': 'between', 'value': [18, 24]},
+    'all of 3': {'all': [
+        {'component_id': LAMP, 'value': 'on'},
+        {'component_id': SENSOR, 'attribute': 'value', 'operator': 'gt', 'value': 21},
+        {'component_id': DOOR, 'operator': 'in', 'value': ['open', 'ajar']},
+    ]},
+    'nested and/or/not': {'any': [
+        {'and': [{'component_id': LAMP, 'value': 'on'}, {'not': {'component_id': DOOR, 'value': 'closed'}}]},
+        {'component_id': SENSOR, 'attribute': 'value', 'operator': 'lte', 'value': 10},
+    ]},
+    'time window': {'all': [
+        {'component_id': DOOR, 'value': 'open'},
+        {'time_window': {'start': '22:00', 'end': '06:00', 'days': [0, 1, 2, 3, 4]}},
+    ]},
+}
+
+OPERATORS = {
+    'eq': operator.eq, 'ne': operator.ne, 'gt': operator.gt, 'gte': operator.ge, 'lt': operator.lt,
+    'lte': operator.le, 'in': lambda current, expected: current in expected,
+    'between': lambda current, expected: expected[0] <= current <= expected[1],
+}
+
+
+def interpret(node, values, now, default_attribute='power'):
+    """
+    Evaluate trigger_conditions by walking the JSON, same semantics as the
+    compiled predicate
+    """
+    for group, combine in (('all', all), ('and', all), ('any', any), ('or', any)):
+        if group in node:
+            return combine(interpret(child, values, now, default_attribute) for child in node[group])
+    if 'not' in node:
+        return not interpret(node['not'], values, now, default_attribute)
+    if 'time_window' in node:
+        window = node['time_window']
+        start, end = dt_time.fromisoformat(window['start']), dt_time.fromisoformat(window['end'])
+        moment = now.time()
+        inside = start <= moment < end if start < end else (moment >= start or moment < end)
+        days = window.get('days')
+        return inside and (days is None or now.weekday() in days)
+    current = values.get((str(node['component_id']), node.get('attribute', default_attribute)))
+    if current is None:
+        return False
+    try:
+        return bool(OPERATORS[node.get('operator', 'eq')](current, node.get('value')))
+    except TypeError:
+        return False
+
+
+class Command(BaseCommand):
+    help = 'Microbenchmark interpreted against compiled trigger_conditions evaluation'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--iterations',
+            type=int,
+            default=200_000,
+            help='Evaluations timed per shape and evaluator (default: 200000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        iterations = max(options['iterations'], 1)
+        rng = random.Random(options['seed'])
+        inputs = [self._input(rng) for _ in range(1000)]
+        default_attribute = DEFAULT_ATTRIBUTES['device_state']
+
+        # ========== AGREEMENT ==========
+        for name, conditions in SHAPES.items():
+            predicate, _ = compile_conditions(conditions)
+            for values, now in inputs:
+                if predicate(values, now) != interpret(conditions, values, now, default_attribute):
+                    raise CommandError(f'{name}: compiled and interpreted disagree on {values} at {now}')
+        self.stdout.write(self.style.SUCCESS(f'✅ Compiled and interpreted agree on {len(inputs):,} inputs per shape'))
+
+        # ========== EVALUATION ==========
+        self.stdout.write(f'\n{"shape":<20} {"interpreted":>14} {"compiled":>14} {"speedup":>8}')
+        cycle = [inputs[index % len(inputs)] for index in range(iterations)]
+        for name, conditions in SHAPES.items():
+            predicate, _ = compile_conditions(conditions)
+
+            started = time.perf_counter()
+            for values, now in cycle:
+                interpret(conditions, values, now, default_attribute)
+            interpreted = (time.perf_counter() - started) / iterations
+
+            started = time.perf_counter()
+            for values, now in cycle:
+                predicate(values, now)
+            compiled = (time.perf_counter() - started) / iterations
+
+            self.stdout.write(
+                f'{name:<20} {interpreted * 1e9:>11,.0f} ns {compiled * 1e9:>11,.0f} ns '
+                f'{interpreted / compiled:>7.1f}x'
+            )
+
+        # ========== COMPILE AND CACHE ==========
+        conditions = SHAPES['nested and/or/not']
+        count = max(iterations // 10, 1)
+        started = time.perf_counter()
+        for _ in range(count):
+            compile_conditions(conditions)
+        compile_cost = (time.perf_counter() - started) / count
+
+        cache = CompiledConditionCache(max_size=count)
+        updated_at = timezone.now()
+        rule_id = uuid.uuid4()
+        cache.get(rule_id, updated_at, conditions)
+        started = time.perf_counter()
+        for _ in range(count):
+            cache.get(rule_id, updated_at, conditions)
+        hit_cost = (time.perf_counter() - started) / count
+        self.stdout.write(
+            f'\n🔧 Compile (nested): {compile_cost * 1e6:.1f} µs per rule version, '
+            f'cache hit: {hit_cost * 1e9:,.0f} ns'
+        )
+
+    def _input(self, rng):
+        values = {}
+        if rng.random() < 0.9:
+            values[(LAMP, 'power')] = rng.choice(('on', 'off'))
+        if rng.random() < 0.9:
+            values[(SENSOR, 'value')] = rng.uniform(0, 30)
+        if rng.random() < 0.9:
+            values[(DOOR, 'power')] = rng.choice(('open', 'closed', 'ajar'))
+        now = datetime(2026, 3, 2, tzinfo=timezone.get_current_timezone()) + timedelta(
+            minutes=rng.randrange(7 * 24 * 60))
+        return values, now
@@ -0,0 +1,168 @@
+"""
+Django management command to benchmark the AutomationRule index
+
+Builds the rule index of one synthetic house (no database): --rules
+device_state / sensor_value rules over --components components, each rule
+reading one or two (component, attribute) keys. Then it replays random state
+updates through:
+    • the index (RuleIndex / HouseRules.apply), which evaluates only the
+      rules reading a changed key
+    • a full scan evaluating every rule of the house, what matching cost
+      without the index
+and reports build time, per-update latency of both, the cost of refiling a
+single edited rule, and checks both fire the same rules.
+
+Usage:
+    python manage.py benchmark_rule_index
+    python manage.py benchmark_rule_index --rules=10000 --components=200 --events=100000
+"""
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from automation.services.rule_index import HouseRules, IndexedRule
+
+
+class Command(BaseCommand):
+    help = 'Benchmark indexed against full-scan matching of device_state / sensor_value rules'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rules',
+            type=int,
+            default=10_000,
+            help='Rules in the house (default: 10000)'
+        )
+        parser.add_argument(
+            '--components',
+            type=int,
+            default=200,
+            help='Components the rules read (default: 200)'
+        )
+        parser.add_argument(
+            '--events',
+            type=int,
+            default=100_000,
+            help='State updates replayed through the index (default: 100000)'
+        )
+        parser.add_argument(
+            '--scan-events',
+            type=int,
+            default=1_000,
+            help='State updates replayed through the full scan (default: 1000)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        components = [str(uuid.UUID(int=rng.getrandbits(128), version=4)) for _ in range(max(options['components'], 1))]
+        rules = [self._rule(rng, components) for _ in range(options['rules'])]
+        events = [self._event(rng, components) for _ in range(max(options['events'], options['scan_events']))]
+
+        # ========== BUILD ==========
+        started = time.perf_counter()
+        indexed_rules = [IndexedRule(values) for values in rules]
+        compiled = time.perf_counter() - started
+        house = HouseRules('benchmark')
+        started = time.perf_counter()
+        for rule in indexed_rules:
+            house.add(rule)
+        filed = time.perf_counter() - started
+        self.stdout.write(
+            f'📦 {len(rules):,} rules over {len(components):,} components, {len(house.by_key):,} keys: '
+            f'compiled in {compiled * 1000:.0f} ms, indexed in {filed * 1000:.0f} ms'
+        )
+
+        # ========== MATCHING ==========
+        scan_events = events[:options['scan_events']]
+        scan_fired, scan_seconds = self._scan(indexed_rules, scan_events)
+
+        index_fired = []
+        started = time.perf_counter()
+        for component_id, delta in events[:options['events']]:
+            index_fired.append(house.apply(component_id, delta))
+        index_seconds = time.perf_counter() - started
+
+        index_per_event = index_seconds / max(options['events'], 1)
+        scan_per_event = scan_seconds / max(len(scan_events), 1)
+        self.stdout.write(
+            f'⚡ Index:     {index_per_event * 1e6:>10.1f} µs/update '
+            f'({options["events"] / index_seconds:,.0f} updates/s, '
+            f'{sum(map(len, index_fired)):,} firings)'
+        )
+        self.stdout.write(
+            f'🐢 Full scan: {scan_per_event * 1e6:>10.1f} µs/update '
+            f'({len(scan_events) / scan_seconds:,.0f} updates/s)'
+        )
+        self.stdout.write(f'   Speedup: {scan_per_event / index_per_event:.0f}x')
+
+        mismatches = sum(
+            [rule.id for rule in indexed] != [rule.id for rule in scanned]
+            for indexed, scanned in zip(index_fired, scan_fired)
+        )
+        if mismatches:
+            self.stdout.write(self.style.ERROR(f'❌ {mismatches} of {len(scan_fired)} updates fired different rules'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Same rules fired for all {len(scan_fired):,} compared updates'))
+
+        # ========== INCREMENTAL UPDATE ==========
+        edits = indexed_rules[:1000]
+        started = time.perf_counter()
+        for rule in edits:
+            house.remove(rule.id)
+            house.add(rule)
+        per_edit = (time.perf_counter() - started) / max(len(edits), 1)
+        self.stdout.write(f'✏️  Refiling an edited rule: {per_edit * 1e6:.1f} µs')
+
+    def _rule(self, rng, components):
+        trigger_type = rng.choice(('device_state', 'sensor_value'))
+        comparisons = []
+        for component_id in rng.sample(components, min(rng.choice((1, 1, 2)), len(components))):
+            if trigger_type == 'device_state':
+                comparisons.append({'component_id': component_id, 'value': rng.choice(('on', 'off'))})
+            else:
+                comparisons.append({'component_id': component_id, 'operator': rng.choice(('gt', 'lt')),
+                                    'value': rng.randint(0, 100)})
+        return {
+            'id': uuid.UUID(int=rng.getrandbits(128), version=4),
+            'name': 'benchmark',
+            'house_id': 'benchmark',
+            'trigger_type': trigger_type,
+            'trigger_conditions': comparisons[0] if len(comparisons) == 1 else {'all': comparisons},
+            'actions': [],
+            'priority': rng.randint(1, 10),
+            'max_executions_per_hour': 10,
+            'updated_at': timezone.now(),
+        }
+
+    def _event(self, rng, components):
+        return rng.choice(components), {'power': rng.choice(('on', 'off')), 'value': rng.randint(0, 100)}
+
+    def _scan(self, rules, events):
+        """
+        Evaluate every rule on every update, with the same fire-on-change
+        semantics as the index
+        """
+        rules = sorted(rules, key=lambda rule: rule.sort_key)
+        values, active, fired_per_event = {}, set(), []
+        started = time.perf_counter()
+        for component_id, delta in events:
+            now = timezone.localtime()
+            for attribute, value in delta.items():
+                values[(component_id, attribute)] = value
+            fired = []
+            for rule in rules:
+                if rule.predicate(values, now):
+                    if rule.id not in active:
+                        active.add(rule.id)
+                        fired.append(rule)
+                else:
+                    active.discard(rule.id)
+            fired_per_event.append(fired)
+        return fired_per_event, time.perf_counter() - started
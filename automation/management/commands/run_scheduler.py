@@ -0,0 +1,95 @@
+"""
+Django management command to run the schedule executor
+
+Long-running process that fires automation.Schedule rows: commands go to
+the microcontroller's channel group, last_triggered / next_trigger are moved
+on as schedules are claimed. Run as many as needed: due schedules are claimed
+with SELECT ... FOR UPDATE SKIP LOCKED so each fires once, and singleton jobs
+(schedule maintenance, presence sweep) run in the process holding the leader
+advisory lock. Without PostgreSQL there are no row or advisory locks, run a
+single process there.
+
+Commands only reach consumers in other processes through a shared channel
+layer (Redis), the in-memory layer used in development delivers nothing
+outside this process.
+
+Usage:
+    python manage.py run_scheduler
+    python manage.py run_scheduler --horizon=600 --refresh-interval=30
+    python manage.py run_scheduler --run-for=120 --stats-interval=10
+"""
+import asyncio
+import signal
+from django.core.management.base import BaseCommand
+from automation.services.schedule_executor import ScheduleExecutor
+
+
+class Command(BaseCommand):
+    help = 'Run the heap-based schedule executor'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--horizon',
+            type=int,
+            default=None,
+            help="Seconds of upcoming schedules kept in memory (default: SCHEDULER['HORIZON'])"
+        )
+        parser.add_argument(
+            '--refresh-interval',
+            type=int,
+            default=None,
+            help="Seconds between database refreshes (default: SCHEDULER['REFRESH_INTERVAL'])"
+        )
+        parser.add_argument(
+            '--run-for',
+            type=float,
+            default=None,
+            help='Stop after this many seconds (default: run until interrupted)'
+        )
+        parser.add_argument(
+            '--stats-interval',
+            type=float,
+            default=60,
+            help='Seconds between stats lines (default: 60, 0 to disable)'
+        )
+
+    def handle(self, *args, **options):
+        executor = ScheduleExecutor(horizon=options['horizon'], refresh_interval=options['refresh_interval'])
+        self.stdout.write(
+            f'⏰ Scheduler started (horizon {executor.horizon}s, refresh every {executor.refresh_interval}s, '
+            f'time zone {executor.tz})'
+        )
+        asyncio.run(self._run(executor, options['run_for'], options['stats_interval']))
+        self._write_stats(executor)
+        self.stdout.write(self.style.SUCCESS('✅ Scheduler stopped'))
+
+    async def _run(self, executor, run_for, stats_interval):
+        stop_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop_event.set)
+            except NotImplementedError:  # Windows
+                pass
+        if run_for:
+            loop.call_later(run_for, stop_event.set)
+
+        reporter = None
+        if stats_interval:
+            reporter = asyncio.create_task(self._report(executor, stop_event, stats_interval))
+        await executor.run(stop_event)
+        if reporter:
+            reporter.cancel()
+
+    async def _report(self, executor, stop_event, interval):
+        while not stop_event.is_set():
+            await asyncio.sleep(interval)
+            self._write_stats(executor)
+
+    def _write_stats(self, executor):
+        stats = executor.stats
+        self.stdout.write(
+            f"📊 fired {stats['fired']:,}  skipped {stats['skipped']:,}  missed {stats['missed']:,}  "
+            f"claims {stats['claims']:,}  in memory {executor.in_memory:,}  "
+            f"max jitter {stats['max_jitter'] * 1000:.0f} ms{'  (leader)' if executor.is_leader else ''}"
+        )
@@ -0,0 +1,426 @@
+"""
+Django management command to simulate schedules and automation rules in
+virtual time, for capacity planning
+
+Replays the active Schedules and device_state / sensor_value
+AutomationRules of some houses (--house, repeatable) or of the whole fleet
+over --days simulated days, without sleeping:
+    • schedule firings for the whole period are computed at once with
+      ScheduleArrays.fire_times_between()
+    • a firing that changes a component some rule reads goes through the
+      rule index (HouseRules) at its virtual time; fired rules go through
+      the chain guard (causation depth cutoff, debounce per rule and
+      component, see ChainGuard) and spend a max_executions_per_hour token
+      in virtual time, and their actions change components in turn
+    • --events-per-hour adds random changes of rule inputs per house
+      (wall switches, sensor readings), uniform over the period
+
+and reports commands per second per microcontroller (average and busiest
+second), peak concurrency (commands in flight, each one for
+--command-latency seconds) for the fleet and per board, and the firings
+suppressed, cut off or debounced. Nothing is sent or written.
+
+Only firings that can trigger a rule are looped over in Python, the rest
+is counted with NumPy, so a month of a large fleet takes minutes.
+
+Usage:
+    python manage.py simulate_automation
+    python manage.py simulate_automation --days=7 --house=<uuid> --events-per-hour=30
+    python manage.py simulate_automation --start=2026-03-01 --command-latency=0.5 --top=20
+"""
+import time
+from array import array
+from collections import Counter, deque
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from automation.models import AutomationRule, Schedule
+from automation.services.causation import Debouncer
+from automation.services.conditions import ConditionError
+from automation.services.rate_limiter import MemoryTokenBucket
+from automation.services.recurrence import schedule_timezone
+from automation.services.rule_graph import action_effect
+from automation.services.rule_index import INDEXED_TRIGGER_TYPES, RULE_FIELDS, HouseRules, IndexedRule
+from devices.models import Component
+
+SCHEDULE_FIELDS = (
+    'house_id', 'component_id', 'action_type__name', 'action_parameters',
+    'component__microcontroller_id', 'component__microcontroller__is_approved',
+    'recurrence', 'scheduled_time', 'days_of_week', 'start_date', 'end_date', 'last_triggered',
+)
+
+
+class Command(BaseCommand):
+    help = 'Simulate schedules and automation rules in virtual time and report command rates'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--house',
+            action='append',
+            default=[],
+            help='House id to simulate, repeatable (default: every house)'
+        )
+        parser.add_argument(
+            '--days',
+            type=float,
+            default=30,
+            help='Simulated days (default: 30)'
+        )
+        parser.add_argument(
+            '--start',
+            default=None,
+            help='Start of the period, ISO date or datetime (default: now)'
+        )
+        parser.add_argument(
+            '--events-per-hour',
+            type=float,
+            default=0,
+            help='Random rule input changes per house and hour (default: 0)'
+        )
+        parser.add_argument(
+            '--command-latency',
+            type=float,
+            default=0.5,
+            help='Seconds a command counts as in flight (default: 0.5)'
+        )
+        parser.add_argument(
+            '--max-chain-depth',
+            type=int,
+            default=None,
+            help="Causation depth past which rule firings are cut off (default: RULE_ENGINE['MAX_CHAIN_DEPTH'])"
+        )
+        parser.add_argument(
+            '--debounce',
+            type=float,
+            default=None,
+            help="Debounce window per rule and component in seconds (default: RULE_ENGINE['DEBOUNCE_SECONDS'])"
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=10,
+            help='Busiest microcontrollers and most suppressed rules listed (default: 10)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=1,
+            help='Random seed for --events-per-hour (default: 1)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import numpy as np
+        except ImportError:
+            raise CommandError('simulate_automation needs numpy (pip install numpy)')
+        from automation.services.recurrence_arrays import ScheduleArrays, US_PER_SECOND, from_micros, to_micros
+
+        self.np = np
+        self.from_micros = from_micros
+        tz = schedule_timezone()
+        start = self._start(options['start'], tz)
+        end = start + timedelta(days=options['days'])
+        if end <= start:
+            raise CommandError('--days must be positive')
+        self.start_us, self.end_us = to_micros(start), to_micros(end)
+        self.latency_us = int(options['command_latency'] * US_PER_SECOND)
+        config = getattr(settings, 'RULE_ENGINE', {})
+        self.max_depth = (options['max_chain_depth'] if options['max_chain_depth'] is not None
+                          else config.get('MAX_CHAIN_DEPTH', 5))
+        self.debounce = options['debounce'] if options['debounce'] is not None else config.get('DEBOUNCE_SECONDS', 2)
+        houses = options['house']
+        timings = {}
+
+        # ========== LOAD ==========
+        started = time.perf_counter()
+        schedules = Schedule.objects.filter(is_active=True)
+        rules = AutomationRule.objects.filter(is_active=True, trigger_type__in=INDEXED_TRIGGER_TYPES)
+        components = Component.objects.all()
+        if houses:
+            schedules = schedules.filter(house_id__in=houses)
+            rules = rules.filter(house_id__in=houses)
+            components = components.filter(house_id__in=houses)
+        schedule_rows = list(schedules.values_list(*SCHEDULE_FIELDS))
+
+        self.boards = {}            # microcontroller id -> index
+        self.board_houses = []
+        house_rules, invalid = {}, 0
+        for values in rules.values(*RULE_FIELDS):
+            house = house_rules.get(values['house_id'])
+            if house is None:
+                house = house_rules[values['house_id']] = HouseRules(values['house_id'], tz=tz)
+            try:
+                house.add(IndexedRule(values))
+            except ConditionError:
+                invalid += 1
+
+        targets, states = {}, {}
+        for component_id, house_id, state, microcontroller_id, approved in components.values_list(
+                'id', 'house_id', 'current_state', 'microcontroller_id', 'microcontroller__is_approved'):
+            targets[str(component_id)] = self._board(microcontroller_id, house_id) if approved else -1
+            if house_id in house_rules:
+                states.setdefault(house_id, {})[str(component_id)] = state
+        for house_id, house in house_rules.items():
+            house.set_states(states.get(house_id, {}))
+        timings['load'] = time.perf_counter() - started
+
+        # ========== SCHEDULE FIRINGS ==========
+        started = time.perf_counter()
+        arrays = ScheduleArrays.from_rows([row[6:] for row in schedule_rows])
+        fired_rows, fired_at = arrays.fire_times_between(start, end, tz)
+        schedule_boards = np.fromiter(
+            (self._board(row[4], row[0]) if row[5] else -1 for row in schedule_rows),
+            dtype=np.int64, count=len(schedule_rows))
+        firing_boards = schedule_boards[fired_rows]
+        sent = firing_boards >= 0
+        # Firings that can trigger a rule go through the rule loop
+        inputs = {house_id: {component_id for component_id, _ in house.by_key}
+                  for house_id, house in house_rules.items()}
+        triggers = np.fromiter(
+            (str(row[1]) in inputs.get(row[0], ()) for row in schedule_rows), dtype=bool, count=len(schedule_rows))
+        timings['schedules'] = time.perf_counter() - started
+
+        # ========== RULES ==========
+        started = time.perf_counter()
+        rule_count = max(sum(len(house.rules) for house in house_rules.values()), 1)
+        self.buckets = MemoryTokenBucket(max_keys=rule_count)
+        self.debouncer = Debouncer(max_keys=rule_count * 4)
+        self.stats = Counter()
+        self.suppressed = Counter()
+        self.rule_commands = (array('q'), array('q'))
+        # Schedule firings that can trigger a rule, then the random inputs,
+        # merged in time order; deltas are only built when an event is run
+        positions = np.flatnonzero(triggers[fired_rows])
+        random_times, random_keys, random_values, keys = self._random_events(
+            house_rules, options['events_per_hour'], options['seed'])
+        order = np.argsort(np.concatenate([fired_at[positions], random_times]), kind='stable')
+        schedule_times, schedule_events = fired_at[positions].tolist(), fired_rows[positions].tolist()
+        effects = {}
+        for event in (event for chunk in range(0, len(order), 1_000_000)
+                      for event in order[chunk:chunk + 1_000_000].tolist()):
+            if event < len(positions):
+                moment_us = schedule_times[event]
+                row = schedule_events[event]
+                delta = effects.get(row)
+                if delta is None:
+                    schedule = schedule_rows[row]
+                    delta = effects[row] = action_effect(schedule[2], schedule[3])
+                house_id, component_id = schedule_rows[row][0], str(schedule_rows[row][1])
+            else:
+                event -= len(positions)
+                moment_us = int(random_times[event])
+                house_id, component_id, attribute = keys[random_keys[event]]
+                value = random_values[event]
+                if attribute == 'power':
+                    value = 'on' if value < 0.5 else 'off'
+                else:
+                    value = round(float(value) * 100, 1)
+                delta = {attribute: value}
+            self._run_rules(house_rules[house_id], component_id, delta, moment_us, targets)
+        events = len(order)
+        timings['rules'] = time.perf_counter() - started
+
+        # ========== METRICS ==========
+        started = time.perf_counter()
+        times = np.concatenate([fired_at[sent], np.frombuffer(self.rule_commands[0], dtype=np.int64)])
+        boards = np.concatenate([firing_boards[sent], np.frombuffer(self.rule_commands[1], dtype=np.int64)])
+        metrics = self._metrics(times, boards)
+        timings['metrics'] = time.perf_counter() - started
+
+        self._report(options, start, end, tz, schedule_rows, house_rules, invalid, len(fired_rows),
+                     int((~sent).sum()), events, metrics, timings)
+
+    # ========== SIMULATION ==========
+
+    def _start(self, value, tz):
+        if not value:
+            return timezone.now().replace(second=0, microsecond=0)
+        try:
+            moment = datetime.fromisoformat(value)
+        except ValueError:
+            raise CommandError(f'--start must be an ISO date or datetime, got {value!r}')
+        return moment if timezone.is_aware(moment) else moment.replace(tzinfo=tz)
+
+    def _board(self, microcontroller_id, house_id):
+        if microcontroller_id is None:
+            return -1
+        index = self.boards.get(microcontroller_id)
+        if index is None:
+            index = self.boards[microcontroller_id] = len(self.boards)
+            self.board_houses.append(house_id)
+        return index
+
+    def _random_events(self, house_rules, per_hour, seed):
+        """
+        Random changes of rule inputs as columns: times, indices into keys
+        ((house_id, component_id, attribute) tuples) and uniform [0, 1)
+        draws turned into values when the event is run
+        """
+        np = self.np
+        keys, offsets, sizes = [], [], []
+        for house_id, house in house_rules.items():
+            offsets.append(len(keys))
+            sizes.append(len(house.by_key))
+            keys.extend((house_id, component_id, attribute) for component_id, attribute in house.by_key)
+        rng = np.random.default_rng(seed)
+        hours = (self.end_us - self.start_us) / 3_600_000_000
+        sizes = np.array(sizes, dtype=np.int64)
+        counts = rng.poisson(per_hour * hours, len(sizes)) if per_hour > 0 else np.zeros(len(sizes), dtype=np.int64)
+        counts[sizes == 0] = 0
+        houses = np.repeat(np.arange(len(sizes)), counts)
+        total = len(houses)
+        picks = np.array(offsets, dtype=np.int64)[houses] + (rng.random(total) * sizes[houses]).astype(np.int64)
+        times = rng.integers(self.start_us, self.end_us, total, dtype=np.int64)
+        return times, picks, rng.random(total), keys
+
+    def _run_rules(self, house, component_id, delta, moment_us, targets):
+        """
+        Feed one state change through the house's rules, following the
+        changes their actions make like ChainGuard does at runtime
+        """
+        now = self.from_micros(moment_us)
+        seconds = moment_us / 1_000_000
+        pending = deque([(component_id, delta, 0)])
+        while pending:
+            component_id, delta, depth = pending.popleft()
+            for rule in house.apply(component_id, delta, now):
+                if depth + 1 > self.max_depth:
+                    self.stats['chains_cut'] += 1
+                    continue
+                if self.debounce > 0 and not self.debouncer.allow((rule.id, component_id), self.debounce, seconds):
+                    self.stats['debounced'] += 1
+                    continue
+                capacity = rule.max_executions_per_hour
+                if capacity <= 0 or not self.buckets.take(rule.id, capacity, capacity / 3600, seconds):
+                    self.suppressed[rule.id] += 1
+                    continue
+                self.stats['rule_firings'] += 1
+                for action in rule.actions:
+                    if not isinstance(action, dict) or not action.get('component_id'):
+                        continue
+                    target = str(action['component_id'])
+                    board = targets.get(target, -1)
+                    if board < 0:
+                        self.stats['rule_actions_skipped'] += 1
+                        continue
+                    self.rule_commands[0].append(moment_us)
+                    self.rule_commands[1].append(board)
+                    pending.append((target, action_effect(action.get('action_name'), action.get('parameters')),
+                                    depth + 1))
+
+    # ========== METRICS ==========
+
+    def _metrics(self, times, boards):
+        np = self.np
+        span_seconds = max((self.end_us - self.start_us) // 1_000_000, 1)
+        metrics = {'commands': len(times), 'span_seconds': span_seconds, 'boards': len(self.boards)}
+        if not len(times):
+            return metrics
+        seconds = (times - self.start_us) // 1_000_000
+
+        per_second = np.bincount(seconds)
+        metrics['fleet_peak'] = int(per_second.max())
+        metrics['fleet_peak_second'] = int(per_second.argmax())
+
+        ordered = np.sort(times)
+        in_flight = np.arange(len(ordered)) - np.searchsorted(ordered, ordered - self.latency_us, side='right') + 1
+        metrics['fleet_concurrency'] = int(in_flight.max())
+        metrics['fleet_concurrency_at'] = int(ordered[in_flight.argmax()])
+
+        # Per board: busiest second and most commands in flight
+        keys, counts = np.unique(boards * span_seconds + seconds, return_counts=True)
+        key_boards = keys // span_seconds
+        starts = np.flatnonzero(np.r_[True, key_boards[1:] != key_boards[:-1]])
+        present = key_boards[starts]
+        board_peak = np.zeros(len(self.boards), dtype=np.int64)
+        board_peak[present] = np.maximum.reduceat(counts, starts)
+
+        order = np.lexsort((times, boards))
+        stride = self.end_us - self.start_us + self.latency_us + 1
+        flight_keys = boards[order] * stride + (times[order] - self.start_us)
+        flight = np.arange(len(order)) - np.searchsorted(flight_keys, flight_keys - self.latency_us, side='right') + 1
+        sorted_boards = boards[order]
+        starts = np.flatnonzero(np.r_[True, sorted_boards[1:] != sorted_boards[:-1]])
+        board_concurrency = np.zeros(len(self.boards), dtype=np.int64)
+        board_concurrency[sorted_boards[starts]] = np.maximum.reduceat(flight, starts)
+
+        metrics['board_total'] = np.bincount(boards, minlength=len(self.boards))
+        metrics['board_peak'] = board_peak
+        metrics['board_concurrency'] = board_concurrency
+        return metrics
+
+    def _report(self, options, start, end, tz, schedule_rows, house_rules, invalid, firings, unsent, events,
+                metrics, timings):
+        np = self.np
+        house_count = len({row[0] for row in schedule_rows} | set(house_rules))
+        rule_count = sum(len(house.rules) for house in house_rules.values())
+        span = metrics['span_seconds']
+
+        def at(second):
+            return timezone.localtime(start + timedelta(seconds=second), tz).strftime('%Y-%m-%d %H:%M:%S')
+
+        self.stdout.write(
+            f'🧪 {options["days"]:g} simulated days from {timezone.localtime(start, tz):%Y-%m-%d %H:%M} ({tz}): '
+            f'{house_count:,} houses, {len(schedule_rows):,} schedules, {rule_count:,} rules, '
+            f'{metrics["boards"]:,} microcontrollers'
+        )
+        if invalid:
+            self.stdout.write(self.style.WARNING(f'⚠️  {invalid:,} rules with invalid trigger_conditions skipped'))
+        self.stdout.write(
+            f"⏱️  load {timings['load']:.1f}s  schedules {timings['schedules']:.1f}s  "
+            f"rules {timings['rules']:.1f}s ({events:,} rule inputs)  metrics {timings['metrics']:.1f}s"
+        )
+        self.stdout.write('')
+        self.stdout.write(f'📅 Schedule firings: {firings:,} ({unsent:,} without an approved microcontroller)')
+        self.stdout.write(
+            f"⚙️  Rule firings: {self.stats['rule_firings']:,} executed, "
+            f"{sum(self.suppressed.values()):,} suppressed by max_executions_per_hour, "
+            f"{self.stats['chains_cut']:,} cut off past depth {self.max_depth}, "
+            f"{self.stats['debounced']:,} debounced ({self.debounce:g}s)"
+        )
+        if not metrics['commands']:
+            self.stdout.write('📤 No commands sent')
+            return
+
+        self.stdout.write(
+            f"📤 Commands: {metrics['commands']:,}, {metrics['commands'] / span:,.2f}/s on average, "
+            f"busiest second {metrics['fleet_peak']:,} ({at(metrics['fleet_peak_second'])})"
+        )
+        concurrency_at = (metrics['fleet_concurrency_at'] - self.start_us) // 1_000_000
+        self.stdout.write(
+            f"🔀 Peak concurrency: {metrics['fleet_concurrency']:,} commands in flight ({at(concurrency_at)}), "
+            f"{int(metrics['board_concurrency'].max()):,} on one microcontroller"
+        )
+
+        used = metrics['board_total'] > 0
+        average = metrics['board_total'][used] / span
+        peak = metrics['board_peak'][used]
+        self.stdout.write('')
+        self.stdout.write(f'Per microcontroller ({int(used.sum()):,} with commands)')
+        for label, values, unit in (('average', average, '/s'), ('busiest second', peak, '')):
+            p50, p99 = np.percentile(values, [50, 99])
+            self.stdout.write(f'   {label:<15} p50 {p50:>10,.4g}{unit}  p99 {p99:>10,.4g}{unit}  '
+                              f'max {values.max():>10,.4g}{unit}')
+
+        top = options['top']
+        if top > 0:
+            ids = {index: microcontroller_id for microcontroller_id, index in self.boards.items()}
+            self.stdout.write('')
+            self.stdout.write(f'{"microcontroller":<38} {"commands":>10} {"avg/s":>9} {"peak/s":>7} {"in flight":>9}')
+            for index in np.argsort(-metrics['board_peak'], kind='stable')[:top]:
+                if not metrics['board_total'][index]:
+                    break
+                self.stdout.write(
+                    f"{str(ids[index]):<38} {metrics['board_total'][index]:>10,} "
+                    f"{metrics['board_total'][index] / span:>9.4f} {metrics['board_peak'][index]:>7,} "
+                    f"{metrics['board_concurrency'][index]:>9,}"
+                )
+            if self.suppressed:
+                names = {rule.id: (rule.name, rule.max_executions_per_hour)
+                         for house in house_rules.values() for rule in house.rules.values()}
+                self.stdout.write('')
+                self.stdout.write(f'{"suppressed rule":<38} {"limit/h":>8} {"suppressed":>11}')
+                for rule_id, count in self.suppressed.most_common(top):
+                    name, limit = names[rule_id]
+                    self.stdout.write(f'{name[:38]:<38} {limit:>8,} {count:>11,}')
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.14 on 2026-10-19 01:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0003_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='schedule',
+            index=models.Index(fields=['updated_at'], name='schedule_updated_2f97d9_idx'),
+        ),
+    ]
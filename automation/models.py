@@ -1,10 +1,15 @@
 import uuid
+from django.conf import settings
 from django.db import models
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 from users.models import User
 from houses.models import House
 from devices.models import Component, ActionType
+from .services.conditions import STATE_TRIGGER_TYPES, ConditionError, compile_conditions, compiled_conditions
+from .services.rule_graph import RuleGraph
+from .services.schedule_conflicts import CONFLICT_FIELDS, ComponentSchedules
 
 class Schedule(models.Model):
     RECURRENCE_CHOICES = [
@@ -72,11 +77,73 @@ class Schedule(models.Model):
             models.Index(fields=['component', 'is_active']),
             models.Index(fields=['next_trigger']),
             models.Index(fields=['is_active', 'next_trigger']),
+            # Lets the schedule executor pick up edited schedules
+            models.Index(fields=['updated_at']),
         ]
 
     def __str__(self):
         return f"{self.name} - {self.component.name}"
 
+    def find_conflicts(self):
+        """
+        Overlaps with the other active schedules of the component, see
+        services.schedule_conflicts. [] for an inactive schedule.
+
+        The component's other schedules have to be read to validate anyway,
+        so the tree is built from that one query on every call: O(k log k)
+        for k schedules on the component, then O(log k + overlaps) for the
+        lookup. Only the audit command, which builds each tree once and
+        queries it per schedule, gets logarithmic lookups per schedule.
+        """
+        if not self.is_active or not self.component_id:
+            return []
+        others = Schedule.objects.filter(component_id=self.component_id, is_active=True).exclude(
+            pk=self.pk).values(*CONFLICT_FIELDS)
+        return ComponentSchedules(others).conflicts_with(
+            {field: getattr(self, field) for field in CONFLICT_FIELDS})
+
+    def check_conflicts(self):
+        """
+        Apply SCHEDULER['CONFLICTS']: 'reject' raises ValidationError when the
+        schedule overlaps one with a different action, 'warn' (default) only
+        reports it, 'off' skips the check. Duplicates are never rejected.
+        Found overlaps are kept in self.conflicts.
+        """
+        mode = getattr(settings, 'SCHEDULER', {}).get('CONFLICTS', 'warn')
+        self.conflicts = [] if mode == 'off' else self.find_conflicts()
+        if not self.conflicts:
+            return
+        summary = ', '.join(f"{conflict['kind']} with '{conflict['other_name']}' ({conflict['at']})"
+                            for conflict in self.conflicts)
+        if mode == 'reject' and any(conflict['kind'] == 'conflict' for conflict in self.conflicts):
+            raise ValidationError({'scheduled_time': f'Overlaps other schedules of the component: {summary}'})
+        print(f"Schedule {self.name} overlaps other schedules of component {self.component_id}: {summary}")
+
+    def writes_timing(self, update_fields=None):
+        """
+        Whether a save with these update_fields can change the schedule's
+        overlaps (all fields when None)
+        """
+        if update_fields is None:
+            return True
+        written = {self._meta.get_field(name).attname for name in update_fields}
+        return bool(written & {*CONFLICT_FIELDS, 'is_active'})
+
+    def clean(self):
+        super().clean()
+        self.check_conflicts()
+        self._conflicts_checked = True
+
+    def save(self, *args, **kwargs):
+        """
+        Save method that checks for overlapping schedules on the component
+        (see check_conflicts) when the save writes its timing or is_active
+        """
+        checked = self.__dict__.pop('_conflicts_checked', False)
+        if not checked and self.is_active and self.writes_timing(kwargs.get('update_fields')):
+            self.check_conflicts()
+        super().save(*args, **kwargs)
+
 class AutomationRule(models.Model):
     TRIGGER_TYPES = [
         ('schedule', 'Schedule'),
@@ -120,4 +187,81 @@ class AutomationRule(models.Model):
         ]
 
     def __str__(self):
-        return f"{self.name} ({self.trigger_type})"
\ No newline at end of file
+        return f"{self.name} ({self.trigger_type})"
+
+    def compile_trigger_conditions(self):
+        """
+        Compiled (predicate, keys) for device_state / sensor_value rules, None
+        for the other trigger types. Raises ValidationError on conditions the
+        rule engine cannot evaluate.
+        """
+        if self.trigger_type not in STATE_TRIGGER_TYPES:
+            return None
+        try:
+            return compile_conditions(self.trigger_conditions, self.trigger_type)
+        except ConditionError as e:
+            raise ValidationError({'trigger_conditions': str(e)})
+
+    def check_rule_loops(self, compiled):
+        """
+        Raise ValidationError when the rule's actions can make it fire again
+        through the other active rules of the house (see services.rule_graph)
+        """
+        if compiled is None or not self.is_active:
+            return
+        rules = [(self.pk, compiled[1], self.actions)]
+        names = {self.pk: self.name}
+        others = AutomationRule.objects.filter(
+            house_id=self.house_id, is_active=True, trigger_type__in=STATE_TRIGGER_TYPES,
+        ).exclude(pk=self.pk).values('id', 'name', 'trigger_type', 'trigger_conditions', 'actions', 'updated_at')
+        for other in others:
+            try:
+                _, keys = compiled_conditions.get(other['id'], other['updated_at'], other['trigger_conditions'],
+                                                  other['trigger_type'])
+            except ConditionError:
+                continue
+            rules.append((other['id'], keys, other['actions']))
+            names[other['id']] = other['name']
+        cycle = RuleGraph(rules).find_cycle(self.pk)
+        if cycle:
+            loop = ' → '.join(names[rule_id] for rule_id in cycle)
+            raise ValidationError({'actions': f'Creates a rule loop: {loop}'})
+
+    def writes_conditions(self, update_fields=None):
+        """
+        Whether a save with these update_fields needs the conditions and
+        loops checked again (all fields when None)
+        """
+        if update_fields is None:
+            return True
+        written = {self._meta.get_field(name).attname for name in update_fields}
+        return bool(written & {'trigger_type', 'trigger_conditions', 'actions', 'is_active'})
+
+    def validate_rule(self):
+        """
+        compile_trigger_conditions() + check_rule_loops() for an active rule,
+        None for an inactive one: it is validated when it gets activated
+        """
+        if not self.is_active:
+            return None
+        compiled = self.compile_trigger_conditions()
+        self.check_rule_loops(compiled)
+        return compiled
+
+    def clean(self):
+        super().clean()
+        self._validated = self.validate_rule()
+
+    def save(self, *args, **kwargs):
+        """Save method that rejects uncompilable trigger_conditions and rule loops"""
+        if '_validated' in self.__dict__:
+            # clean() just ran (admin forms)
+            compiled = self.__dict__.pop('_validated')
+        elif self.writes_conditions(kwargs.get('update_fields')):
+            compiled = self.validate_rule()
+        else:
+            compiled = None
+        super().save(*args, **kwargs)
+        if compiled is not None:
+            # The rule index of this process picks it up from the cache
+            compiled_conditions.put(self.id, self.updated_at, compiled)
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import time
+import uuid
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from activities.services.activity_logger import ActivityLogger
+from devices.metadata_cache import metadata_cache
+from devices.models import Component
+from ..models import AutomationRule
+from .causation import chain_guard
+
+
+class ActionExecutor:
+    """
+    Executes the actions of a fired AutomationRule.
+
+    AutomationRule.actions is a list of
+
+        {"component_id": "<uuid>", "action_name": "turn_off", "parameters": {...}}
+
+    The target components are resolved in one query and the actions grouped
+    by the microcontroller that drives them: each board gets a single
+    'device_commands' frame carrying all of its commands, and the frames for
+    different boards are sent concurrently, so a whole-house scene costs one
+    round trip instead of one per action. Commands are cached for the ACK
+    like single commands (see CommandBufferService), and the outcome of every
+    action is logged as one automation_trigger entry.
+
+    Every command carries the trace_id of the chain of rules it belongs to
+    and its causation_depth, one more than the state report that fired the
+    rule (see ChainGuard).
+    """
+
+    def __init__(self, channel_layer=None, command_timeout=None):
+        self._channel_layer = channel_layer
+        self.command_timeout = command_timeout or getattr(settings, 'COMMAND_TIMEOUT', 30)
+
+    @property
+    def channel_layer(self):
+        if self._channel_layer is None:
+            self._channel_layer = get_channel_layer()
+        return self._channel_layer
+
+    async def execute(self, rule, trigger_data, house=None, component=None, cause=None):
+        """
+        Send the rule's actions and log the aggregated result, which is
+        also returned. cause is the {'trace_id', 'causation_depth'} of the
+        state report that fired the rule, None starts a new trace.
+        """
+        started = time.perf_counter()
+        trace_id = cause['trace_id'] if cause else str(uuid.uuid4())
+        depth = cause['causation_depth'] + 1 if cause else 1
+        targets, fired_at = await sync_to_async(self._prepare)(rule)
+        created_at = fired_at.isoformat()
+
+        # One getrandom() call per firing instead of one per uuid4()
+        entropy = os.urandom(16 * len(rule.actions))
+        executed, frames, cache_entries = [], {}, {}
+        for index, action in enumerate(rule.actions):
+            action = action if isinstance(action, dict) else {}
+            outcome = {
+                'component_id': str(action['component_id']) if action.get('component_id') else None,
+                'action_name': action.get('action_name'),
+            }
+            executed.append(outcome)
+            error = self._check(action, targets)
+            if error:
+                outcome.update(success=False, error_message=error)
+                continue
+            target = targets[outcome['component_id']]
+            command_id = str(uuid.UUID(bytes=entropy[index * 16:index * 16 + 16], version=4))
+            action_type_id = target['action_types'].get(outcome['action_name'])
+            command = {
+                'command_id': command_id,
+                'house_id': str(rule.house_id),
+                'component_id': outcome['component_id'],
+                'action_type_id': str(action_type_id) if action_type_id else None,
+                'action_name': outcome['action_name'],
+                'parameters': action.get('parameters', {}),
+                'automation_rule_id': str(rule.id),
+                'trace_id': trace_id,
+                'causation_depth': depth,
+                'created_at': created_at,
+            }
+            outcome.update(command_id=command_id, microcontroller_id=target['microcontroller_id'])
+            frames.setdefault(target['microcontroller_id'], []).append(command)
+            cache_entries[f"command_{command_id}"] = command
+
+        if cache_entries:
+            await sync_to_async(self._remember, thread_sensitive=False)(cache_entries)
+        boards = list(frames)
+        results = await asyncio.gather(*(
+            self.channel_layer.group_send(
+                f'microcontroller_{microcontroller_id}',
+                {'type': 'device_commands', 'commands': frames[microcontroller_id]}
+            )
+            for microcontroller_id in boards
+        ), return_exceptions=True)
+        failed_boards = {
+            microcontroller_id: str(result)
+            for microcontroller_id, result in zip(boards, results) if isinstance(result, Exception)
+        }
+        for outcome in executed:
+            if 'command_id' in outcome:
+                error = failed_boards.get(outcome['microcontroller_id'])
+                outcome.update(success=error is None, error_message=error)
+
+        result = {
+            'success': all(outcome['success'] for outcome in executed),
+            'actions_executed': executed,
+            'total_execution_time': time.perf_counter() - started,
+            'error_messages': [outcome['error_message'] for outcome in executed if outcome['error_message']],
+            'microcontrollers': len(boards),
+            'trace_id': trace_id,
+            'causation_depth': depth,
+        }
+        await ActivityLogger.alog_automation_trigger(house, component, rule, trigger_data, result)
+        return result
+
+    @staticmethod
+    def _check(action, targets):
+        if not action.get('component_id') or not action.get('action_name'):
+            return 'Action needs component_id and action_name'
+        target = targets.get(str(action['component_id']))
+        if target is None:
+            return 'Component not found in the house'
+        if not target['microcontroller_id']:
+            return 'Component has no microcontroller'
+        if not target['is_approved']:
+            return 'Microcontroller is not approved'
+        return None
+
+    def _remember(self, cache_entries):
+        # ACK handling in CommandBufferService looks commands up here, the
+        # state reports they cause find their trace here
+        cache.set_many(cache_entries, self.command_timeout)
+        chain_guard.remember(cache_entries.values())
+
+    def _prepare(self, rule):
+        """
+        Resolve the components the actions target, one query, and stamp the
+        rule's last_triggered
+        """
+        component_ids = {str(action['component_id']) for action in rule.actions
+                         if isinstance(action, dict) and action.get('component_id')}
+        targets = {}
+        try:
+            rows = Component.objects.filter(house_id=rule.house_id, id__in=component_ids).values(
+                'id', 'microcontroller_id', 'microcontroller__is_approved')
+            for row in rows:
+                targets[str(row['id'])] = {
+                    'microcontroller_id': str(row['microcontroller_id']) if row['microcontroller_id'] else None,
+                    'is_approved': row['microcontroller__is_approved'],
+                    'action_types': {},
+                }
+        except Exception as e:
+            # Malformed component ids: every action fails its check
+            print(f"Automation rule {rule.id} targets could not be resolved: {e}")
+        for action in rule.actions:
+            target = isinstance(action, dict) and targets.get(str(action.get('component_id')))
+            if target and action.get('action_name'):
+                action_type = metadata_cache.action_type_by_name(action['action_name'])
+                target['action_types'][action['action_name']] = action_type.id if action_type else None
+
+        fired_at = timezone.now()
+        # update() leaves updated_at alone, the rule index does not reload it
+        AutomationRule.objects.filter(id=rule.id).update(last_triggered=fired_at)
+        return targets, fired_at
+
+
+action_executor = ActionExecutor()
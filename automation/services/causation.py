@@ -0,0 +1,112 @@
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+
+
+class Debouncer:
+    """
+    Drops repeats of a key within a window, LRU bounded by max_keys: the
+    first call passes and opens the window, later calls inside it do not.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._last = OrderedDict()
+        self._lock = threading.Lock()
+
+    def allow(self, key, window, now):
+        with self._lock:
+            last = self._last.get(key)
+            if last is not None and now - last < window:
+                self._last.move_to_end(key)
+                return False
+            self._last[key] = now
+            self._last.move_to_end(key)
+            if len(self._last) > self.max_keys:
+                self._last.popitem(last=False)
+            return True
+
+
+class ChainGuard:
+    """
+    Stops automation rules from feeding each other without end.
+
+    Commands sent for a rule carry a trace_id and a causation_depth; the
+    state report a command causes comes back from the board without them, so
+    the executor also remembers the cause per target component for
+    CAUSATION_TTL seconds (boards that echo trace_id / causation_depth in
+    their status report take precedence). Rules fired by a report run one
+    level deeper than its cause, a report with no cause starts a new trace
+    at depth 0. Then:
+
+    - a firing deeper than MAX_CHAIN_DEPTH is cut off
+    - a rule firing again for the same component within DEBOUNCE_SECONDS is
+      absorbed. A board is connected to one worker, so its components'
+      reports always reach the same process and the debounce windows are
+      kept in process.
+
+    Cut and debounced firings only bump counters, like suppressed ones.
+    """
+
+    KEY_PREFIX = 'automation:cause'
+
+    def __init__(self, max_depth=None, debounce_seconds=None, cause_ttl=None, max_keys=None):
+        config = getattr(settings, 'RULE_ENGINE', {})
+        self.max_depth = max_depth if max_depth is not None else config.get('MAX_CHAIN_DEPTH', 5)
+        self.debounce_seconds = (debounce_seconds if debounce_seconds is not None
+                                 else config.get('DEBOUNCE_SECONDS', 2))
+        self.cause_ttl = cause_ttl or config.get('CAUSATION_TTL', 30)
+        self.debouncer = Debouncer(max_keys or config.get('RATE_LIMIT_MAX_KEYS', 100000))
+        self.cut = Counter()
+        self.debounced = Counter()
+
+    @classmethod
+    def cause_key(cls, component_id):
+        return f'{cls.KEY_PREFIX}:{component_id}'
+
+    def cause(self, component_id, report=None):
+        """
+        {'trace_id', 'causation_depth'} of a component's state report
+        """
+        report = report or {}
+        if report.get('trace_id'):
+            try:
+                depth = int(report.get('causation_depth') or 0)
+            except (TypeError, ValueError):
+                depth = 0
+            return {'trace_id': str(report['trace_id']), 'causation_depth': depth}
+        remembered = cache.get(self.cause_key(component_id))
+        if remembered:
+            return remembered
+        return {'trace_id': str(uuid.uuid4()), 'causation_depth': 0}
+
+    def remember(self, commands):
+        """
+        Attach the cause of sent commands to their target components
+        """
+        cache.set_many({
+            self.cause_key(command['component_id']): {
+                'trace_id': command['trace_id'], 'causation_depth': command['causation_depth'],
+            }
+            for command in commands
+        }, self.cause_ttl)
+
+    def admit(self, rule, component_id, cause, now=None):
+        """
+        False when firing the rule for this report would go past
+        MAX_CHAIN_DEPTH or falls in its debounce window
+        """
+        if cause['causation_depth'] + 1 > self.max_depth:
+            self.cut[rule.id] += 1
+            return False
+        if self.debounce_seconds > 0 and not self.debouncer.allow(
+                (rule.id, str(component_id)), self.debounce_seconds, time.monotonic() if now is None else now):
+            self.debounced[rule.id] += 1
+            return False
+        return True
+
+
+chain_guard = ChainGuard()
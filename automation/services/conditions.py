@@ -0,0 +1,230 @@
+import functools
+import operator
+import threading
+from collections import OrderedDict
+from datetime import time
+from django.conf import settings
+
+
+class ConditionError(ValueError):
+    pass
+
+
+def _between(current, expected):
+    return expected[0] <= current <= expected[1]
+
+
+OPERATORS = {
+    'eq': operator.eq,
+    'ne': operator.ne,
+    'gt': operator.gt,
+    'gte': operator.ge,
+    'lt': operator.lt,
+    'lte': operator.le,
+    'in': lambda current, expected: current in expected,
+    'between': _between,
+}
+
+# AutomationRule trigger types whose trigger_conditions are compiled
+STATE_TRIGGER_TYPES = ('device_state', 'sensor_value')
+
+# Attribute a comparison reads when it does not name one
+DEFAULT_ATTRIBUTES = {
+    'device_state': 'power',
+    'sensor_value': 'value',
+}
+
+COMPARISON_KEYS = frozenset(('component_id', 'attribute', 'operator', 'value'))
+TIME_WINDOW_KEYS = frozenset(('start', 'end', 'days'))
+GROUPS = {'all': all, 'and': all, 'any': any, 'or': any}
+
+
+def compile_conditions(conditions, trigger_type='device_state'):
+    """
+    Turn AutomationRule.trigger_conditions into (predicate, keys), raising
+    ConditionError for anything malformed.
+
+    trigger_conditions is one node:
+
+        comparison   {"component_id": "<uuid>", "attribute": "power", "operator": "eq", "value": "on"}
+                     operator eq (default), ne, gt, gte, lt, lte, in (value is
+                     a list) or between (value is [low, high], inclusive);
+                     attribute defaults to "power" for device_state rules and
+                     "value" for sensor_value rules
+        time window  {"time_window": {"start": "22:00", "end": "06:00", "days": [0, 1, 2, 3, 4]}}
+                     local time (SCHEDULER['TIME_ZONE']) in [start, end),
+                     wrapping past midnight when end <= start; days
+                     (0 = Monday) is optional. A window only filters the
+                     state changes that may fire the rule, it never fires
+                     it by itself
+        groups       {"all": [...]} / {"and": [...]}, {"any": [...]} / {"or": [...]},
+                     {"not": node}
+
+    predicate(values, now) takes a {(component_id, attribute): value}
+    mapping and the current local datetime and returns a bool; a missing
+    value or one that cannot be compared makes the comparison false. keys is
+    the set of (component_id, attribute) pairs the rule reads, which is what
+    RuleIndex files it under.
+    """
+    keys = set()
+    predicate = _compile(conditions, DEFAULT_ATTRIBUTES.get(trigger_type, 'power'), keys)
+    if not keys:
+        raise ConditionError('trigger_conditions do not reference any component')
+    return predicate, keys
+
+
+def _compile(node, default_attribute, keys):
+    if not isinstance(node, dict):
+        raise ConditionError(f'Expected an object, got {node!r}')
+
+    for group, combine in GROUPS.items():
+        if group in node:
+            _only(node, {group})
+            children = node[group]
+            if not isinstance(children, list) or not children:
+                raise ConditionError(f'"{group}" needs a non-empty list')
+            predicates = [_compile(child, default_attribute, keys) for child in children]
+            # Chain pairs of closures rather than all()/any() over a
+            # generator, which costs more than the comparisons themselves
+            return functools.reduce(_and if combine is all else _or, predicates)
+
+    if 'not' in node:
+        _only(node, {'not'})
+        negated = _compile(node['not'], default_attribute, keys)
+        return lambda values, now: not negated(values, now)
+
+    if 'time_window' in node:
+        _only(node, {'time_window'})
+        return _time_window(node['time_window'])
+
+    if 'component_id' not in node:
+        raise ConditionError(f'Comparison without component_id: {node!r}')
+    _only(node, COMPARISON_KEYS)
+    return _comparison(node, default_attribute, keys)
+
+
+def _and(first, second):
+    return lambda values, now: first(values, now) and second(values, now)
+
+
+def _or(first, second):
+    return lambda values, now: first(values, now) or second(values, now)
+
+
+def _only(node, allowed):
+    unknown = set(node) - set(allowed)
+    if unknown:
+        raise ConditionError(f'Unexpected keys {sorted(unknown)} in {node!r}')
+
+
+def _comparison(node, default_attribute, keys):
+    name = node.get('operator', 'eq')
+    op = OPERATORS.get(name)
+    if op is None:
+        raise ConditionError(f'Unknown operator {name!r}')
+    expected = node.get('value')
+    if name == 'in':
+        if not isinstance(expected, list):
+            raise ConditionError('"in" needs a list value')
+        # Hashable members (the usual strings and numbers) get a set lookup
+        try:
+            expected = frozenset(expected)
+        except TypeError:
+            pass
+    elif name == 'between':
+        if not isinstance(expected, list) or len(expected) != 2:
+            raise ConditionError('"between" needs a [low, high] value')
+        try:
+            if expected[0] > expected[1]:
+                raise ConditionError(f'"between" range {expected!r} is empty')
+        except TypeError:
+            raise ConditionError(f'"between" bounds {expected!r} cannot be compared')
+        expected = tuple(expected)
+    elif expected is None:
+        raise ConditionError(f'Comparison without value: {node!r}')
+
+    attribute = node.get('attribute', default_attribute)
+    if not isinstance(attribute, str):
+        raise ConditionError(f'attribute must be a string, got {attribute!r}')
+    key = (str(node['component_id']), attribute)
+    keys.add(key)
+
+    if name == 'eq':
+        # The common case, skip the try and the operator call
+        return lambda values, now: values.get(key) == expected
+
+    def compare(values, now):
+        current = values.get(key)
+        if current is None:
+            return False
+        try:
+            return bool(op(current, expected))
+        except TypeError:
+            return False
+
+    return compare
+
+
+def _time_window(window):
+    if not isinstance(window, dict):
+        raise ConditionError(f'time_window must be an object, got {window!r}')
+    _only(window, TIME_WINDOW_KEYS)
+    try:
+        start = time.fromisoformat(window['start'])
+        end = time.fromisoformat(window['end'])
+    except (KeyError, TypeError, ValueError):
+        raise ConditionError(f'time_window needs "start" and "end" as HH:MM, got {window!r}')
+    days = window.get('days')
+    if days is not None:
+        if not isinstance(days, list) or not all(isinstance(day, int) and 0 <= day <= 6 for day in days):
+            raise ConditionError(f'time_window days must be weekday numbers 0-6, got {days!r}')
+        days = frozenset(days)
+
+    if start < end:
+        inside = lambda moment: start <= moment < end
+    else:
+        inside = lambda moment: moment >= start or moment < end
+    if days is None:
+        return lambda values, now: inside(now.time())
+    return lambda values, now: now.weekday() in days and inside(now.time())
+
+
+class CompiledConditionCache:
+    """
+    Compiled predicates by (rule id, updated_at), so a rule is compiled once
+    per version whichever path loads it. Saving a rule changes updated_at,
+    which is what retires the old entry; LRU bounded by max_size.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size or getattr(settings, 'RULE_ENGINE', {}).get('PREDICATE_CACHE_SIZE', 50000)
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, rule_id, updated_at, conditions, trigger_type='device_state'):
+        key = (rule_id, updated_at)
+        with self._lock:
+            compiled = self._data.get(key)
+            if compiled is not None:
+                self._data.move_to_end(key)
+                return compiled
+        compiled = compile_conditions(conditions, trigger_type)
+        self.put(rule_id, updated_at, compiled)
+        return compiled
+
+    def put(self, rule_id, updated_at, compiled):
+        with self._lock:
+            self._data[(rule_id, updated_at)] = compiled
+            self._data.move_to_end((rule_id, updated_at))
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+compiled_conditions = CompiledConditionCache()
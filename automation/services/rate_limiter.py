@@ -0,0 +1,159 @@
+import threading
+import time
+import traceback
+from collections import Counter, OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from activities.services.usage_counter import incr_counter
+
+
+class MemoryTokenBucket:
+    """
+    Token buckets kept in process, LRU bounded by max_keys.
+
+    A bucket holds up to `capacity` tokens and refills continuously at `rate`
+    tokens per second; take() spends one if there is one. Two floats per key,
+    O(1) per check.
+    """
+
+    def __init__(self, max_keys):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, now):
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [float(capacity), now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(float(capacity), bucket[0] + max(now - bucket[1], 0) * rate)
+                bucket[1] = now
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True
+            return False
+
+
+# KEYS[1] bucket hash; ARGV capacity, rate (tokens/s), now, expiry (s)
+TAKE_SCRIPT = """
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local capacity = tonumber(ARGV[1])
+local now = tonumber(ARGV[3])
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(now - ts, 0) * tonumber(ARGV[2]))
+local allowed = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return allowed
+"""
+
+
+class RedisTokenBucket:
+    """
+    The same buckets shared by all workers: one Lua script call per check
+    refills and spends atomically in Redis. Idle buckets expire once they
+    would be full again.
+    """
+
+    KEY_PREFIX = 'automation:bucket'
+
+    def __init__(self):
+        from django_redis import get_redis_connection
+
+        self._script = get_redis_connection('default').register_script(TAKE_SCRIPT)
+
+    def take(self, key, capacity, rate, now):
+        expiry = int(capacity / rate) + 60 if rate > 0 else 3600
+        return bool(self._script(keys=[f'{self.KEY_PREFIX}:{key}'], args=[capacity, rate, now, expiry]))
+
+
+class RuleRateLimiter:
+    """
+    Enforces AutomationRule.max_executions_per_hour with one token bucket per
+    rule: up to max_executions_per_hour firings in a burst, refilled evenly
+    over the hour. 0 (or less) stops the rule from executing at all.
+
+    BACKEND 'memory' keeps the buckets per process, 'redis' shares them
+    between workers and falls back to the process buckets while Redis is
+    unreachable. A suppressed firing is not logged: it bumps an in-process
+    counter and an hourly per-rule counter in the cache, which
+    suppressed_counts() reads for the metrics endpoint.
+    """
+
+    KEY_PREFIX = 'automation:suppressed'
+    # Keep the hourly counters for a day
+    TIMEOUT = 24 * 60 * 60
+
+    def __init__(self, backend=None, max_keys=None):
+        config = getattr(settings, 'RULE_ENGINE', {})
+        backend = backend or config.get('RATE_LIMIT_BACKEND', 'memory')
+        self.memory = MemoryTokenBucket(max_keys or config.get('RATE_LIMIT_MAX_KEYS', 100000))
+        self.shared = RedisTokenBucket() if backend == 'redis' else None
+        self.allowed = 0
+        self.suppressed = Counter()
+        self._redis_failing = False
+
+    @classmethod
+    def hour(cls, now):
+        return int(now // 3600)
+
+    @classmethod
+    def counter_key(cls, rule_id, hour):
+        return f'{cls.KEY_PREFIX}:{rule_id}:{hour}'
+
+    def allow(self, rule, now=None):
+        """
+        Spend one execution of the rule, False when its bucket is empty
+        """
+        now = time.time() if now is None else now
+        capacity = rule.max_executions_per_hour
+        if capacity <= 0:
+            allowed = False
+        else:
+            allowed = self._take(str(rule.id), capacity, capacity / 3600, now)
+        if allowed:
+            self.allowed += 1
+        else:
+            self.suppressed[rule.id] += 1
+            incr_counter(self.counter_key(rule.id, self.hour(now)), 1, self.TIMEOUT)
+        return allowed
+
+    def _take(self, key, capacity, rate, now):
+        if self.shared is not None:
+            try:
+                allowed = self.shared.take(key, capacity, rate, now)
+                self._redis_failing = False
+                return allowed
+            except Exception as e:
+                # Once per outage, this runs for every firing
+                if not self._redis_failing:
+                    self._redis_failing = True
+                    print(f"Rule rate limiter: Redis unavailable, using process buckets: {e}")
+                    print(f"Traceback: {traceback.format_exc()}")
+        return self.memory.take(key, capacity, rate, now)
+
+    @classmethod
+    def suppressed_counts(cls, rule_ids, now=None):
+        """
+        {rule_id: (suppressed this hour, suppressed last hour)} across workers
+        """
+        hour = cls.hour(time.time() if now is None else now)
+        keys = {cls.counter_key(rule_id, period): (rule_id, offset)
+                for rule_id in rule_ids for offset, period in enumerate((hour, hour - 1))}
+        counts = {rule_id: [0, 0] for rule_id in rule_ids}
+        for key, value in cache.get_many(list(keys)).items():
+            rule_id, offset = keys[key]
+            counts[rule_id][offset] = int(value or 0)
+        return {rule_id: tuple(pair) for rule_id, pair in counts.items()}
+
+
+rule_rate_limiter = RuleRateLimiter()
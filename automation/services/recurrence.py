@@ -0,0 +1,112 @@
+import calendar
+from datetime import datetime, timedelta, timezone as dt_timezone
+from zoneinfo import ZoneInfo
+from django.conf import settings
+from django.utils import timezone
+
+WEEKDAYS = frozenset(range(5))
+WEEKENDS = frozenset((5, 6))
+
+
+def schedule_timezone():
+    """
+    Time zone scheduled_time is interpreted in (SCHEDULER['TIME_ZONE'],
+    default settings.TIME_ZONE)
+    """
+    name = getattr(settings, 'SCHEDULER', {}).get('TIME_ZONE')
+    return ZoneInfo(name) if name else timezone.get_default_timezone()
+
+
+def fire_days(recurrence, days_of_week, start_date):
+    """
+    Weekdays (0 = Monday) a day-based recurrence fires on, None for
+    'once' and 'monthly'
+    """
+    if recurrence == 'daily':
+        return frozenset(range(7))
+    if recurrence == 'weekdays':
+        return WEEKDAYS
+    if recurrence == 'weekends':
+        return WEEKENDS
+    if recurrence in ('weekly', 'custom'):
+        days = set()
+        for day in days_of_week or ():
+            try:
+                day = int(day)
+            except (TypeError, ValueError):
+                continue
+            if 0 <= day <= 6:
+                days.add(day)
+        if not days and recurrence == 'weekly' and start_date:
+            days.add(start_date.weekday())
+        return frozenset(days)
+    return None
+
+
+def next_fire_time(recurrence, scheduled_time, days_of_week, start_date, end_date, after,
+                   last_triggered=None, tz=None):
+    """
+    First fire time strictly after `after` (aware datetime), in UTC, or None
+    when the schedule will not fire again.
+
+    scheduled_time is a wall clock time in `tz`, so firings stay at the same
+    local time across DST changes. 'once' fires at the first occurrence of
+    scheduled_time from start_date on, monthly schedules on the day of month
+    of start_date (clamped to the length of shorter months).
+    """
+    tz = tz or schedule_timezone()
+    local_after = after.astimezone(tz)
+    first_day = max(local_after.date(), start_date) if start_date else local_after.date()
+
+    def fire_at(day):
+        return datetime.combine(day, scheduled_time, tzinfo=tz)
+
+    if recurrence == 'once':
+        # Next occurrence of scheduled_time from start_date on, until it fired
+        if last_triggered is not None:
+            return None
+        candidate = fire_at(first_day)
+        if candidate <= after:
+            candidate = fire_at(first_day + timedelta(days=1))
+        if end_date and candidate.date() > end_date:
+            return None
+        return candidate.astimezone(dt_timezone.utc)
+
+    if recurrence == 'monthly':
+        day_of_month = (start_date or first_day).day
+        year, month = first_day.year, first_day.month
+        for _ in range(3):
+            day = first_day.replace(day=min(day_of_month, calendar.monthrange(year, month)[1]))
+            if end_date and day > end_date:
+                return None
+            candidate = fire_at(day)
+            if day >= first_day and candidate > after:
+                return candidate.astimezone(dt_timezone.utc)
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+            first_day = first_day.replace(year=year, month=month, day=1)
+        return None
+
+    days = fire_days(recurrence, days_of_week, start_date)
+    if not days:
+        return None
+    # Today may already be past scheduled_time, so look one day beyond a week
+    for offset in range(8):
+        day = first_day + timedelta(days=offset)
+        if end_date and day > end_date:
+            return None
+        if day.weekday() in days:
+            candidate = fire_at(day)
+            if candidate > after:
+                return candidate.astimezone(dt_timezone.utc)
+    return None
+
+
+def schedule_next_fire_time(schedule, after=None, tz=None):
+    """
+    next_fire_time() for a Schedule instance or a values() dict
+    """
+    get = schedule.get if isinstance(schedule, dict) else lambda name: getattr(schedule, name)
+    return next_fire_time(
+        get('recurrence'), get('scheduled_time'), get('days_of_week'), get('start_date'),
+        get('end_date'), after or timezone.now(), last_triggered=get('last_triggered'), tz=tz,
+    )
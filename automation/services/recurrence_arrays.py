@@ -0,0 +1,235 @@
+"""
+Vectorized next_fire_time() over many schedules at once (needs numpy)
+
+Times are int64 microseconds since the Unix epoch, days are days since the
+epoch. Results match recurrence.next_fire_time() row for row, see
+NextFireTimesTests.
+"""
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+import numpy as np
+from .recurrence import fire_days
+
+RECURRENCE_CODES = {
+    'once': 0, 'daily': 1, 'weekly': 2, 'monthly': 3, 'weekdays': 4, 'weekends': 5, 'custom': 6,
+}
+ONCE, MONTHLY = RECURRENCE_CODES['once'], RECURRENCE_CODES['monthly']
+
+NEVER = np.iinfo(np.int64).min  # no next fire time
+NO_START = np.iinfo(np.int32).min // 2
+NO_END = np.iinfo(np.int32).max // 2
+US_PER_SECOND = 1_000_000
+US_PER_DAY = 86_400 * US_PER_SECOND
+EPOCH = date(1970, 1, 1)
+EPOCH_WEEKDAY = EPOCH.weekday()  # Thursday
+
+
+def to_micros(value):
+    """
+    Aware datetime -> microseconds since the epoch, None -> NEVER
+    """
+    if value is None:
+        return NEVER
+    return (value - datetime(1970, 1, 1, tzinfo=dt_timezone.utc)) // timedelta(microseconds=1)
+
+
+def from_micros(value):
+    """
+    Inverse of to_micros()
+    """
+    if value == NEVER:
+        return None
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(microseconds=int(value))
+
+
+class ScheduleArrays:
+    """
+    Column arrays of the recurrence fields of a set of schedules
+    """
+
+    def __init__(self, time_of_day, recurrence, weekday_mask, start_day, end_day, day_of_month, fired):
+        self.time_of_day = time_of_day      # int64 microseconds after local midnight
+        self.recurrence = recurrence        # int8 RECURRENCE_CODES
+        self.weekday_mask = weekday_mask    # uint8, bit n set = fires on weekday n (0 = Monday)
+        self.start_day = start_day          # int32 epoch days, NO_START when unset
+        self.end_day = end_day              # int32 epoch days, NO_END when unset
+        self.day_of_month = day_of_month    # int8 day of start_date (monthly), 0 when unset
+        self.fired = fired                  # bool, last_triggered is set ('once')
+
+    def __len__(self):
+        return len(self.recurrence)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build from (recurrence, scheduled_time, days_of_week, start_date,
+        end_date, last_triggered) tuples
+        """
+        count = len(rows)
+        time_of_day = np.empty(count, dtype=np.int64)
+        recurrence = np.empty(count, dtype=np.int8)
+        weekday_mask = np.zeros(count, dtype=np.uint8)
+        start_day = np.empty(count, dtype=np.int32)
+        end_day = np.empty(count, dtype=np.int32)
+        day_of_month = np.zeros(count, dtype=np.int8)
+        fired = np.empty(count, dtype=bool)
+        epoch_ordinal = EPOCH.toordinal()
+        masks = {}
+
+        for index, (code, scheduled_time, days_of_week, start_date, end_date, last_triggered) in enumerate(rows):
+            time_of_day[index] = (
+                (scheduled_time.hour * 3600 + scheduled_time.minute * 60 + scheduled_time.second) * US_PER_SECOND
+                + scheduled_time.microsecond
+            )
+            recurrence[index] = RECURRENCE_CODES.get(code, -1)
+            start_day[index] = start_date.toordinal() - epoch_ordinal if start_date else NO_START
+            end_day[index] = end_date.toordinal() - epoch_ordinal if end_date else NO_END
+            if start_date:
+                day_of_month[index] = start_date.day
+            fired[index] = last_triggered is not None
+
+            # Few distinct day lists in practice, so map each one once
+            key = (code, tuple(days_of_week) if isinstance(days_of_week, list) else days_of_week,
+                   start_date.weekday() if start_date else None)
+            mask = masks.get(key)
+            if mask is None:
+                days = fire_days(code, days_of_week, start_date)
+                mask = masks[key] = sum(1 << day for day in days) if days else 0
+            weekday_mask[index] = mask
+
+        return cls(time_of_day, recurrence, weekday_mask, start_day, end_day, day_of_month, fired)
+
+    def next_fire_times(self, after, tz):
+        """
+        next_fire_time() for every schedule: int64 microseconds (UTC), NEVER
+        when the schedule will not fire again
+        """
+        after_us = to_micros(after)
+        after_local = after_us + int(after.astimezone(tz).utcoffset() // timedelta(microseconds=1))
+        first = np.maximum(np.int64(after_local // US_PER_DAY), self.start_day.astype(np.int64))
+
+        # Every candidate lies within ~3 months of its first day
+        offsets = _OffsetTable(tz, int(first.min()) - 1 if len(first) else 0,
+                               int(first.max()) + 100 if len(first) else 0)
+        result = np.full(len(self), NEVER, dtype=np.int64)
+        pending = self.recurrence >= 0
+        end = self.end_day.astype(np.int64)
+
+        # Day-based recurrences: first matching weekday in the next 8 days.
+        # 'once' behaves like 'daily' until it has fired, and never after.
+        mask = np.where(self.recurrence == ONCE, np.where(self.fired, 0, 0x7F), self.weekday_mask).astype(np.int64)
+        day_based = pending & (self.recurrence != MONTHLY) & (mask != 0)
+        for offset in range(8):
+            day = first + offset
+            fire_at = offsets.to_utc(day * US_PER_DAY + self.time_of_day)
+            weekday = (day + EPOCH_WEEKDAY) % 7
+            hit = day_based & ((mask >> weekday) & 1 == 1) & (fire_at > after_us) & (day <= end)
+            result[hit] = fire_at[hit]
+            day_based &= ~hit
+
+        # Monthly: day of month of start_date (or of the first day), clamped
+        monthly = pending & (self.recurrence == MONTHLY)
+        if monthly.any():
+            first_month = first.astype('datetime64[D]').astype('datetime64[M]')
+            first_month_start = first_month.astype('datetime64[D]').astype(np.int64)
+            day_of_month = np.where(self.day_of_month > 0, self.day_of_month, first - first_month_start + 1)
+            for offset in range(3):
+                month = first_month + offset
+                month_start = month.astype('datetime64[D]').astype(np.int64)
+                month_length = (month + 1).astype('datetime64[D]').astype(np.int64) - month_start
+                day = month_start + np.minimum(day_of_month, month_length) - 1
+                fire_at = offsets.to_utc(day * US_PER_DAY + self.time_of_day)
+                hit = monthly & (day >= first) & (fire_at > after_us) & (day <= end)
+                result[hit] = fire_at[hit]
+                monthly &= ~hit
+
+        return result
+
+    def fire_times_between(self, start, end, tz):
+        """
+        Every firing in [start, end): (row indices, int64 microseconds UTC),
+        ordered by time. Same rules as next_fire_time(), a 'once' schedule
+        fires at most once.
+        """
+        start_us, end_us = to_micros(start), to_micros(end)
+        first_day = int((start_us + int(start.astimezone(tz).utcoffset() // timedelta(microseconds=1)))
+                        // US_PER_DAY) - 1
+        last_day = int((end_us + int(end.astimezone(tz).utcoffset() // timedelta(microseconds=1)))
+                       // US_PER_DAY) + 1
+        offsets = _OffsetTable(tz, first_day - 1, last_day + 1)
+        rows, times = [], []
+
+        once = self.recurrence == ONCE
+        if once.any():
+            following = self.next_fire_times(start - timedelta(microseconds=1), tz)
+            hit = once & (following != NEVER) & (following < end_us)
+            rows.append(np.flatnonzero(hit))
+            times.append(following[hit])
+
+        repeating = (self.recurrence > ONCE) & (self.recurrence != MONTHLY) & (self.weekday_mask != 0)
+        monthly = self.recurrence == MONTHLY
+        mask = self.weekday_mask.astype(np.int64)
+        for day in range(first_day, last_day + 1):
+            in_range = (self.start_day <= day) & (self.end_day >= day)
+            hit = repeating & in_range & ((mask >> ((day + EPOCH_WEEKDAY) % 7)) & 1 == 1)
+            if monthly.any():
+                calendar_day = np.datetime64(day, 'D')
+                month = calendar_day.astype('datetime64[M]')
+                month_length = int((month + 1).astype('datetime64[D]').astype(np.int64)
+                                   - month.astype('datetime64[D]').astype(np.int64))
+                day_of_month = int(day - month.astype('datetime64[D]').astype(np.int64)) + 1
+                # Without a start_date next_fire_time() uses the day it is
+                # asked about, here the start of the period
+                wanted = np.minimum(np.where(self.day_of_month > 0, self.day_of_month, start.astimezone(tz).day),
+                                    month_length)
+                hit |= monthly & in_range & (wanted == day_of_month)
+            indices = np.flatnonzero(hit)
+            fire_at = offsets.to_utc(day * US_PER_DAY + self.time_of_day[indices])
+            keep = (fire_at >= start_us) & (fire_at < end_us)
+            rows.append(indices[keep])
+            times.append(fire_at[keep])
+
+        rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+        times = np.concatenate(times) if times else np.empty(0, dtype=np.int64)
+        order = np.argsort(times, kind='stable')
+        return rows[order], times[order]
+
+
+class _OffsetTable:
+    """
+    Local wall clock -> UTC for a range of days, with the same fold=0
+    choice as datetime.combine(..., tzinfo=tz): times skipped or repeated
+    by a DST change use the offset from before the change.
+    """
+
+    def __init__(self, tz, first_day, last_day):
+        start = datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(days=first_day)
+
+        def offset_at(seconds):
+            moment = start + timedelta(seconds=seconds)
+            return int(moment.astimezone(tz).utcoffset() // timedelta(microseconds=1))
+
+        boundaries, offsets = [], [offset_at(0)]
+        # Sample once per day (zones never change offset twice in a day) and
+        # bisect each change down to the second
+        for day in range(1, last_day - first_day + 1):
+            offset = offset_at(day * 86_400)
+            if offset == offsets[-1]:
+                continue
+            low, high = (day - 1) * 86_400, day * 86_400
+            while high - low > 1:
+                middle = (low + high) // 2
+                if offset_at(middle) == offsets[-1]:
+                    low = middle
+                else:
+                    high = middle
+            change_us = (first_day * 86_400 + high) * US_PER_SECOND
+            boundaries.append(change_us + max(offsets[-1], offset))
+            offsets.append(offset)
+
+        self.boundaries = np.array(boundaries, dtype=np.int64)
+        self.offsets = np.array(offsets, dtype=np.int64)
+
+    def to_utc(self, local_us):
+        if not len(self.boundaries):
+            return local_us - self.offsets[0]
+        return local_us - self.offsets[np.searchsorted(self.boundaries, local_us, side='right')]
@@ -0,0 +1,95 @@
+"""
+Dependency graph of the device_state / sensor_value rules of a house
+
+Rule A leads to rule B when an action of A changes a (component_id,
+attribute) key B's trigger_conditions read: A firing can make B fire. A
+cycle in that graph is a rule loop, the rules could keep triggering each
+other (and flooding the boards) for as long as the devices answer.
+"""
+
+# Attributes an action name is known to set, anything else may set any
+# attribute of the component
+ACTION_ATTRIBUTES = {
+    'turn_on': {'power': 'on'}, 'on': {'power': 'on'}, 'open': {'power': 'on'}, 'unlock': {'power': 'on'},
+    'turn_off': {'power': 'off'}, 'off': {'power': 'off'}, 'close': {'power': 'off'}, 'lock': {'power': 'off'},
+}
+ANY_ATTRIBUTE = None
+
+
+def action_effect(action_name, parameters):
+    """
+    State delta a command is assumed to leave its component in
+    """
+    delta = dict(ACTION_ATTRIBUTES.get(action_name, {}))
+    if isinstance(parameters, dict):
+        delta.update(parameters)
+    return delta
+
+
+def written_keys(actions):
+    """
+    (component_id, attribute) keys a list of rule actions may change,
+    attribute ANY_ATTRIBUTE for action names of unknown effect
+    """
+    keys = set()
+    for action in actions or ():
+        if not isinstance(action, dict) or not action.get('component_id'):
+            continue
+        component_id = str(action['component_id'])
+        if action.get('action_name') in ACTION_ATTRIBUTES:
+            keys.update((component_id, attribute)
+                        for attribute in action_effect(action['action_name'], action.get('parameters')))
+        else:
+            keys.add((component_id, ANY_ATTRIBUTE))
+    return keys
+
+
+class RuleGraph:
+    """
+    rule id -> ids of the rules its actions can trigger
+    """
+
+    def __init__(self, rules):
+        """
+        rules: (rule_id, read keys, actions) tuples
+        """
+        rules = list(rules)
+        readers = {}
+        for rule_id, keys, _ in rules:
+            for component_id, attribute in keys:
+                readers.setdefault(component_id, {}).setdefault(attribute, set()).add(rule_id)
+        self.edges = {}
+        for rule_id, _, actions in rules:
+            targets = set()
+            for component_id, attribute in written_keys(actions):
+                by_attribute = readers.get(component_id, {})
+                if attribute is ANY_ATTRIBUTE:
+                    for rule_ids in by_attribute.values():
+                        targets |= rule_ids
+                else:
+                    targets |= by_attribute.get(attribute, set())
+            self.edges[rule_id] = targets
+
+    def find_cycle(self, start):
+        """
+        Rule ids of a loop through `start` (first and last are `start`), or
+        None. Depth-first, O(rules + edges).
+        """
+        parents = {start: None}
+        stack = [(start, iter(self.edges.get(start, ())))]
+        while stack:
+            rule_id, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                stack.pop()
+                continue
+            if child == start:
+                path = [start]
+                while rule_id is not None:
+                    path.append(rule_id)
+                    rule_id = parents[rule_id]
+                return path[::-1]
+            if child not in parents:
+                parents[child] = rule_id
+                stack.append((child, iter(self.edges.get(child, ()))))
+        return None
@@ -0,0 +1,251 @@
+import bisect
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from devices.models import Component
+from ..models import AutomationRule
+from .conditions import STATE_TRIGGER_TYPES as INDEXED_TRIGGER_TYPES, ConditionError, compiled_conditions
+from .recurrence import schedule_timezone
+
+RULE_FIELDS = ('id', 'name', 'house_id', 'trigger_type', 'trigger_conditions', 'actions', 'priority',
+               'max_executions_per_hour', 'updated_at')
+
+_MISSING = object()
+
+
+class IndexedRule:
+    """
+    An active device_state / sensor_value rule with its compiled predicate
+    """
+
+    __slots__ = ('id', 'name', 'house_id', 'trigger_type', 'trigger_conditions', 'actions', 'priority',
+                 'max_executions_per_hour', 'updated_at', 'predicate', 'keys', 'sort_key')
+
+    def __init__(self, values):
+        for field in RULE_FIELDS:
+            setattr(self, field, values[field])
+        self.predicate, self.keys = compiled_conditions.get(self.id, self.updated_at, self.trigger_conditions,
+                                                            self.trigger_type)
+        # Highest priority first, id keeps the order stable
+        self.sort_key = (-self.priority, str(self.id))
+
+
+class HouseRules:
+    """
+    The rules of one house filed under every (component_id, attribute) they
+    read, each list in priority order.
+
+    values holds the last known value of every key some rule reads and active
+    the ids of rules whose conditions currently hold: a rule fires when its
+    conditions become true, not again on every update while they stay true.
+    """
+
+    def __init__(self, house_id, version=None, tz=None):
+        self.house_id = house_id
+        self.version = version
+        self.tz = tz or schedule_timezone()
+        self.checked_at = time.monotonic()
+        self.synced_at = None
+        self.rules = {}
+        self.by_key = {}
+        self.values = {}
+        self.active = set()
+
+    def add(self, rule):
+        self.remove(rule.id)
+        self.rules[rule.id] = rule
+        for key in rule.keys:
+            bisect.insort(self.by_key.setdefault(key, []), rule, key=lambda indexed: indexed.sort_key)
+        if rule.predicate(self.values, self.local_now()):
+            self.active.add(rule.id)
+
+    def remove(self, rule_id):
+        rule = self.rules.pop(rule_id, None)
+        if rule is None:
+            return
+        for key in rule.keys:
+            rules = self.by_key[key]
+            rules.remove(rule)
+            if not rules:
+                del self.by_key[key]
+                self.values.pop(key, None)
+        self.active.discard(rule_id)
+
+    def missing_components(self):
+        return {component_id for component_id, _ in self.by_key} - {
+            component_id for component_id, _ in self.values}
+
+    def set_states(self, states):
+        """
+        Seed values from {component_id: current_state} without firing anything
+        """
+        for (component_id, attribute) in self.by_key:
+            state = states.get(component_id)
+            if state is not None and attribute in state:
+                self.values[(component_id, attribute)] = state[attribute]
+        now = self.local_now()
+        self.active = {rule.id for rule in self.rules.values() if rule.predicate(self.values, now)}
+
+    def local_now(self, now=None):
+        """
+        Time windows in trigger_conditions are read in SCHEDULER['TIME_ZONE']
+        """
+        return timezone.localtime(now or timezone.now(), self.tz)
+
+    def apply(self, component_id, delta, now=None):
+        """
+        Record a state delta and return the rules it makes fire, in priority
+        order. Only the rules filed under a changed key are evaluated.
+        """
+        changed = []
+        for attribute, value in delta.items():
+            key = (component_id, attribute)
+            if key in self.by_key and self.values.get(key, _MISSING) != value:
+                self.values[key] = value
+                changed.append(key)
+        if not changed:
+            return []
+
+        if len(changed) == 1:
+            candidates = self.by_key[changed[0]]
+        else:
+            candidates = sorted({rule for key in changed for rule in self.by_key[key]},
+                                key=lambda indexed: indexed.sort_key)
+        now = self.local_now(now)
+        fired = []
+        for rule in candidates:
+            if rule.predicate(self.values, now):
+                if rule.id not in self.active:
+                    self.active.add(rule.id)
+                    fired.append(rule)
+            else:
+                self.active.discard(rule.id)
+        return fired
+
+
+class RuleIndex:
+    """
+    Process-local index of device_state and sensor_value AutomationRules, so
+    a component state update is checked only against the rules that read it
+    instead of every active rule of the house.
+
+    Houses are loaded on first use (one query for the rules, one for the
+    component states) and kept in an LRU of MAX_HOUSES. Saving or deleting a
+    rule updates the index of this process in place (see automation/signals.py)
+    and bumps a per-house version in the cache; other processes compare that
+    version at most every CHECK_INTERVAL seconds and then re-read only the
+    rules updated since their last sync.
+    """
+
+    def __init__(self, max_houses=None, check_interval=None):
+        config = getattr(settings, 'RULE_ENGINE', {})
+        self.max_houses = max_houses or config.get('MAX_HOUSES', 1000)
+        self.check_interval = check_interval if check_interval is not None else config.get('CHECK_INTERVAL', 5)
+        self._houses = OrderedDict()
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def version_key(house_id):
+        return f"automation_rules_version_{house_id}"
+
+    def match(self, house_id, component_id, delta):
+        """
+        Apply a {attribute: value} state delta of a component and return the
+        rules that fire, highest priority first. Touches the database when
+        the house is not loaded yet or its rules changed elsewhere.
+        """
+        with self._lock:
+            return self._house(house_id).apply(str(component_id), delta)
+
+    def rule_changed(self, values):
+        """
+        A rule was saved or deleted: update the local index and tell the
+        other processes. values holds RULE_FIELDS and is_active as saved (only
+        id and house_id for a deleted rule). Call after the transaction
+        commits.
+        """
+        version = uuid.uuid4().hex
+        cache.set(self.version_key(values['house_id']), version, None)
+        with self._lock:
+            house = self._houses.get(values['house_id'])
+            if house is None:
+                return
+            # Our own change, no need to resync for it
+            house.version = version
+            if values.get('is_active') and values.get('trigger_type') in INDEXED_TRIGGER_TYPES:
+                self._add(house, values)
+                self._load_states(house)
+            else:
+                house.remove(values['id'])
+
+    def invalidate(self, house_id=None):
+        with self._lock:
+            if house_id is None:
+                self._houses.clear()
+            else:
+                self._houses.pop(house_id, None)
+
+    def __len__(self):
+        return len(self._houses)
+
+    # ========== LOADING ==========
+
+    def _house(self, house_id):
+        house = self._houses.get(house_id)
+        if house is None:
+            house = HouseRules(house_id, cache.get(self.version_key(house_id)))
+            self._sync(house)
+            self._houses[house_id] = house
+            if len(self._houses) > self.max_houses:
+                self._houses.popitem(last=False)
+        else:
+            self._houses.move_to_end(house_id)
+            if time.monotonic() - house.checked_at >= self.check_interval:
+                house.checked_at = time.monotonic()
+                version = cache.get(self.version_key(house_id))
+                if version != house.version:
+                    house.version = version
+                    self._sync(house)
+        return house
+
+    def _sync(self, house):
+        """
+        Load the house's rules, or only the ones updated since the last sync
+        """
+        started = timezone.now()
+        rules = AutomationRule.objects.filter(house_id=house.house_id)
+        if house.synced_at is not None:
+            # Rules deleted or moved out of the index since
+            indexed = set(rules.filter(is_active=True, trigger_type__in=INDEXED_TRIGGER_TYPES)
+                          .values_list('id', flat=True))
+            for rule_id in set(house.rules) - indexed:
+                house.remove(rule_id)
+            # A little overlap for clock skew between processes
+            rules = rules.filter(updated_at__gte=house.synced_at - timedelta(seconds=1))
+        for values in rules.values(*RULE_FIELDS, 'is_active'):
+            if values['is_active'] and values['trigger_type'] in INDEXED_TRIGGER_TYPES:
+                self._add(house, values)
+            else:
+                house.remove(values['id'])
+        house.synced_at = started
+        self._load_states(house)
+
+    def _add(self, house, values):
+        try:
+            house.add(IndexedRule(values))
+        except ConditionError as e:
+            house.remove(values['id'])
+            print(f"Automation rule {values['id']} skipped, invalid trigger_conditions: {e}")
+
+    def _load_states(self, house):
+        if house.missing_components():
+            states = Component.objects.filter(house_id=house.house_id).values_list('id', 'current_state')
+            house.set_states({str(component_id): state for component_id, state in states})
+
+
+rule_index = RuleIndex()
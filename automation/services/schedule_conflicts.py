@@ -0,0 +1,174 @@
+"""
+Overlapping schedules on the same component
+
+A schedule holds its component from scheduled_time for max_duration_minutes
+on every day it fires. Occupied times are laid out on the week (seconds
+after Monday 00:00, wrapping into the next week), 'once' and 'monthly'
+schedules on every weekday since their weekday changes. Two schedules
+overlap when their intervals intersect and their start_date..end_date
+ranges do too: with different actions they fight over the component
+('conflict'), with the same action and parameters one of them is wasted
+('duplicate').
+"""
+from datetime import timedelta
+from django.utils import timezone
+from .recurrence import fire_days
+
+DAY = 86_400
+WEEK = 7 * DAY
+WEEKDAY_NAMES = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+
+# Schedule fields the overlap check reads, values() of active schedules
+CONFLICT_FIELDS = (
+    'id', 'name', 'component_id', 'action_type_id', 'action_parameters', 'recurrence', 'scheduled_time',
+    'days_of_week', 'start_date', 'end_date', 'max_duration_minutes',
+)
+
+
+class IntervalTree:
+    """
+    Static augmented interval tree over half-open (start, end, item)
+    intervals: sorted by start and read as an implicit balanced binary tree,
+    each node keeping the largest end in its subtree. Building is
+    O(n log n), overlapping() O(log n + k) for k hits.
+    """
+
+    def __init__(self, intervals):
+        self.intervals = sorted(intervals, key=lambda interval: (interval[0], interval[1]))
+        self.max_end = [0] * len(self.intervals)
+        stack = [(0, len(self.intervals), False)]
+        # Post-order without recursion: children before their parent
+        while stack:
+            low, high, ready = stack.pop()
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            if not ready:
+                stack.extend(((low, high, True), (low, middle, False), (middle + 1, high, False)))
+                continue
+            max_end = self.intervals[middle][1]
+            if low < middle:
+                max_end = max(max_end, self.max_end[(low + middle) // 2])
+            if middle + 1 < high:
+                max_end = max(max_end, self.max_end[(middle + 1 + high) // 2])
+            self.max_end[middle] = max_end
+
+    def __len__(self):
+        return len(self.intervals)
+
+    def overlapping(self, start, end):
+        """
+        Intervals intersecting [start, end)
+        """
+        found = []
+        stack = [(0, len(self.intervals))]
+        while stack:
+            low, high = stack.pop()
+            if low >= high:
+                continue
+            middle = (low + high) // 2
+            # Nothing below this node ends after start
+            if self.max_end[middle] <= start:
+                continue
+            stack.append((low, middle))
+            interval = self.intervals[middle]
+            if interval[0] < end:
+                if interval[1] > start:
+                    found.append(interval)
+                # Intervals to the right start later still
+                stack.append((middle + 1, high))
+        return found
+
+
+def occupied_intervals(schedule):
+    """
+    (start, end) seconds of the week a schedule holds its component
+    """
+    days = fire_days(schedule['recurrence'], schedule['days_of_week'], schedule['start_date'])
+    if days is None:
+        days = range(7)
+    scheduled_time = schedule['scheduled_time']
+    begin = scheduled_time.hour * 3600 + scheduled_time.minute * 60 + scheduled_time.second
+    duration = min(max(schedule['max_duration_minutes'] or 0, 1) * 60, WEEK)
+    intervals = []
+    for day in sorted(days):
+        start = day * DAY + begin
+        end = start + duration
+        if end <= WEEK:
+            intervals.append((start, end))
+        else:
+            intervals.extend(((start, WEEK), (0, end - WEEK)))
+    return intervals
+
+
+def date_range(schedule):
+    """
+    First and last day a schedule can fire, a day wider at the end for
+    durations running past midnight
+    """
+    first = schedule['start_date'] or timezone.localdate()
+    last = schedule['end_date']
+    if schedule['recurrence'] == 'once':
+        # Fires on start_date, or the day after when saved past its time
+        last = min(last, first + timedelta(days=1)) if last else first + timedelta(days=1)
+    return first, (last + timedelta(days=1)) if last else None
+
+
+def format_week_time(seconds):
+    day, seconds = divmod(seconds % WEEK, DAY)
+    return f'{WEEKDAY_NAMES[day]} {seconds // 3600:02d}:{seconds // 60 % 60:02d}'
+
+
+class ComponentSchedules:
+    """
+    The active schedules of one component in an interval tree
+    """
+
+    def __init__(self, schedules):
+        self.schedules = {schedule['id']: schedule for schedule in schedules}
+        self.ranges = {schedule_id: date_range(schedule) for schedule_id, schedule in self.schedules.items()}
+        self.tree = IntervalTree(
+            (start, end, schedule_id)
+            for schedule_id, schedule in self.schedules.items()
+            for start, end in occupied_intervals(schedule)
+        )
+
+    def conflicts_with(self, schedule):
+        """
+        Overlaps of a schedule (values dict, saved or not) with the others,
+        one per other schedule, conflicts before duplicates
+        """
+        first, last = date_range(schedule)
+        found = {}
+        for start, end in occupied_intervals(schedule):
+            for other_start, other_end, other_id in self.tree.overlapping(start, end):
+                if other_id == schedule['id'] or other_id in found:
+                    continue
+                other_first, other_last = self.ranges[other_id]
+                if (last is not None and other_first > last) or (other_last is not None and first > other_last):
+                    continue
+                other = self.schedules[other_id]
+                same_action = (other['action_type_id'] == schedule['action_type_id']
+                               and (other['action_parameters'] or {}) == (schedule['action_parameters'] or {}))
+                found[other_id] = {
+                    'kind': 'duplicate' if same_action else 'conflict',
+                    'schedule_id': schedule['id'],
+                    'other_id': other_id,
+                    'other_name': other['name'],
+                    'component_id': schedule['component_id'],
+                    'at': format_week_time(max(start, other_start)),
+                }
+        return sorted(found.values(), key=lambda conflict: conflict['kind'] != 'conflict')
+
+    def conflicts(self):
+        """
+        Every overlapping pair of the component's schedules, once
+        """
+        seen, pairs = set(), []
+        for schedule in self.schedules.values():
+            for conflict in self.conflicts_with(schedule):
+                pair = frozenset((conflict['schedule_id'], conflict['other_id']))
+                if pair not in seen:
+                    seen.add(pair)
+                    pairs.append(conflict)
+        return pairs
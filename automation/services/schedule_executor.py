@@ -0,0 +1,314 @@
+import asyncio
+import heapq
+import os
+import time
+import traceback
+import uuid
+from datetime import timedelta
+from asgiref.sync import sync_to_async
+from channels.layers import get_channel_layer
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from activities.services.activity_logger import ActivityLogger
+from activities.services.leader_lock import LeaderLock
+from devices.services.presence import PresenceService
+from ..models import Schedule
+from .recurrence import schedule_next_fire_time, schedule_timezone
+from .values_update import update_from_values
+
+SCHEDULE_FIELDS = (
+    'id', 'name', 'house_id', 'component_id', 'action_type_id', 'action_type__name', 'created_by_id',
+    'action_parameters', 'scheduled_time', 'start_date', 'end_date', 'recurrence', 'days_of_week',
+    'is_active', 'last_triggered', 'next_trigger',
+    'component__microcontroller_id', 'component__microcontroller__is_approved',
+)
+
+
+class ScheduleExecutor:
+    """
+    Fires automation.Schedule rows; any number of executors can run at once.
+
+    Every REFRESH_INTERVAL seconds the distinct next_trigger values due within
+    HORIZON seconds are read through the (is_active, next_trigger) index into
+    a min-heap, and the loop sleeps until the earliest one. When it wakes it
+    claims the due rows in batches of BATCH_SIZE with SELECT ... FOR UPDATE
+    SKIP LOCKED and moves their next_trigger on in the same transaction, so
+    concurrent executors split the due rows between them and never fire one
+    twice. Each claimed batch is then sent to the microcontroller groups
+    (command cached for the ACK like CommandBufferService does) and logged
+    through ActivityLogger.alog.
+
+    Rows more than MISFIRE_GRACE seconds overdue (all executors were down)
+    are moved to their next fire time without firing.
+
+    Singleton jobs run only in the executor holding the 'automation.scheduler'
+    advisory lock (see LeaderLock): setting next_trigger of new and edited
+    schedules, deactivating finished ones and the microcontroller presence
+    sweep (PresenceService).
+    """
+
+    def __init__(self, channel_layer=None, horizon=None, refresh_interval=None, misfire_grace=None,
+                 batch_size=None, command_timeout=None, presence_interval=None, leader_lock=None):
+        config = getattr(settings, 'SCHEDULER', {})
+        self.channel_layer = channel_layer or get_channel_layer()
+        self.horizon = horizon or config.get('HORIZON', 300)
+        self.refresh_interval = refresh_interval or config.get('REFRESH_INTERVAL', 15)
+        self.misfire_grace = misfire_grace or config.get('MISFIRE_GRACE', 60)
+        self.batch_size = batch_size or config.get('BATCH_SIZE', 1000)
+        self.command_timeout = command_timeout or getattr(settings, 'COMMAND_TIMEOUT', 30)
+        self.presence_interval = presence_interval or config.get('PRESENCE_SWEEP_INTERVAL', 60)
+        self.leader_lock = leader_lock or LeaderLock('automation.scheduler')
+        self.tz = schedule_timezone()
+
+        self._heap = []                 # upcoming fire timestamps, wake-up hints only
+        self._maintained_at = None      # updated_at lower bound for edited schedules, None: full pass
+        self._next_presence_sweep = 0.0
+        self.is_leader = False
+        self.stats = {'fired': 0, 'missed': 0, 'skipped': 0, 'claims': 0, 'max_jitter': 0.0}
+
+    @property
+    def in_memory(self):
+        return len(self._heap)
+
+    # ========== MAIN LOOP ==========
+
+    async def run(self, stop_event=None):
+        stop_event = stop_event or asyncio.Event()
+        stopping = asyncio.create_task(stop_event.wait())
+        leader_task = None
+        next_refresh = 0.0
+        try:
+            while not stop_event.is_set():
+                if time.time() >= next_refresh:
+                    await self.refresh()
+                    next_refresh = time.time() + self.refresh_interval
+                    # Leader jobs run beside firing, one round at a time
+                    if self.is_leader and (leader_task is None or leader_task.done()):
+                        leader_task = asyncio.create_task(self.run_leader_jobs())
+
+                if self._heap and self._heap[0] <= time.time():
+                    while self._heap and self._heap[0] <= time.time():
+                        heapq.heappop(self._heap)
+                    await self.fire_due()
+
+                wake = min(next_refresh, self._heap[0]) if self._heap else next_refresh
+                timeout = wake - time.time()
+                if timeout > 0:
+                    await asyncio.wait({stopping}, timeout=timeout)
+        finally:
+            stopping.cancel()
+            if leader_task:
+                await asyncio.gather(leader_task, return_exceptions=True)
+            if self.is_leader:
+                await sync_to_async(self.leader_lock.release)()
+                self.is_leader = False
+
+    async def refresh(self):
+        until = timezone.now() + timedelta(seconds=self.horizon)
+        try:
+            self.is_leader, times = await sync_to_async(self._refresh)(until)
+        except Exception as e:
+            print(f"Schedule refresh failed: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+            return
+        if not self.is_leader:
+            # Once elected again, start with a full pass
+            self._maintained_at = None
+        self._heap = [moment.timestamp() for moment in times]
+        heapq.heapify(self._heap)
+
+    async def fire_due(self):
+        """
+        Claim and fire due schedules until no unlocked ones are left
+        """
+        while True:
+            try:
+                claimed, fired, upcoming = await sync_to_async(self._claim)(timezone.now())
+            except Exception as e:
+                print(f"Schedule claim failed: {e}")
+                print(f"Traceback: {traceback.format_exc()}")
+                return
+            self._push_upcoming(upcoming)
+            if fired:
+                await self._dispatch(fired)
+            if claimed < self.batch_size:
+                return
+
+    async def run_leader_jobs(self):
+        try:
+            now = timezone.now()
+            since, self._maintained_at = self._maintained_at, now
+            # Edited schedules, then new ones (NULL next_trigger, also what
+            # recompute_schedules leaves for finished ones). One batch per
+            # call so claims on the same database thread get their turn.
+            if since is None:
+                # First round since startup or election: schedules edited
+                # while no leader ran still carry their old next_trigger.
+                # Due ones are left to the claim, it moves them on.
+                conditions = [Q(next_trigger__isnull=True) | Q(next_trigger__gt=now)]
+            else:
+                conditions = [Q(updated_at__gte=since), Q(next_trigger__isnull=True)]
+            for condition in conditions:
+                last_id = None
+                while True:
+                    last_id, upcoming = await sync_to_async(self._recompute)(condition, now, last_id)
+                    self._push_upcoming(upcoming)
+                    if last_id is None:
+                        break
+            if time.time() >= self._next_presence_sweep:
+                self._next_presence_sweep = time.time() + self.presence_interval
+                offline = await sync_to_async(PresenceService.sweep)()
+                if offline:
+                    print(f"Presence sweep: {offline} microcontrollers marked offline")
+        except Exception as e:
+            print(f"Scheduler leader jobs failed: {e}")
+            print(f"Traceback: {traceback.format_exc()}")
+
+    def _push_upcoming(self, moments):
+        horizon = time.time() + self.horizon
+        for moment in moments:
+            if moment.timestamp() <= horizon:
+                heapq.heappush(self._heap, moment.timestamp())
+
+    # ========== FIRING ==========
+
+    async def _dispatch(self, rows):
+        fired_at = timezone.now()
+        created_at = fired_at.isoformat()
+        # One getrandom() call per batch instead of one per uuid4()
+        entropy = os.urandom(16 * len(rows))
+        commands, cache_entries, sends = [], {}, []
+        for index, row in enumerate(rows):
+            scheduled_for = row['last_triggered']
+            self.stats['max_jitter'] = max(self.stats['max_jitter'], (fired_at - scheduled_for).total_seconds())
+
+            microcontroller_id = row['component__microcontroller_id']
+            if not (microcontroller_id and row['component__microcontroller__is_approved']):
+                self.stats['skipped'] += 1
+                continue
+            command_id = str(uuid.UUID(bytes=entropy[index * 16:index * 16 + 16], version=4))
+            command = self._command(row, command_id, scheduled_for, created_at)
+            commands.append((row, command))
+            cache_entries[f"command_{command_id}"] = command
+            sends.append(self.channel_layer.group_send(
+                f'microcontroller_{microcontroller_id}',
+                {'type': 'device_command', 'command': command}
+            ))
+
+        if cache_entries:
+            # ACK handling in CommandBufferService looks commands up here
+            await sync_to_async(cache.set_many, thread_sensitive=False)(cache_entries, self.command_timeout)
+        results = await asyncio.gather(*sends, return_exceptions=True)
+
+        for (row, command), result in zip(commands, results):
+            failed = isinstance(result, Exception)
+            if failed:
+                print(f"Schedule {row['id']} dispatch failed: {result}")
+            else:
+                self.stats['fired'] += 1
+            await ActivityLogger.alog({
+                'user_id': row['created_by_id'],
+                'house_id': row['house_id'],
+                'component_id': row['component_id'],
+                'action_type_id': row['action_type_id'],
+                'action_name': 'schedule_trigger',
+                'action_parameters': {
+                    'schedule_id': str(row['id']),
+                    'schedule_name': row['name'],
+                    'scheduled_for': command['scheduled_for'],
+                    'command_id': command['command_id'],
+                    'parameters': row['action_parameters'],
+                },
+                'action_result': {'success': not failed, 'error_message': str(result) if failed else None},
+                'log_level': 'warning' if failed else 'info',
+                'source': 'automation',
+                'is_automated': True,
+                'automation_source': f"schedule:{row['id']}",
+            })
+
+    def _command(self, row, command_id, scheduled_for, created_at):
+        return {
+            'command_id': command_id,
+            'house_id': str(row['house_id']),
+            'component_id': str(row['component_id']),
+            'action_type_id': str(row['action_type_id']),
+            'action_name': row['action_type__name'],
+            'parameters': row['action_parameters'],
+            'user_id': str(row['created_by_id']),
+            'schedule_id': str(row['id']),
+            'scheduled_for': scheduled_for.isoformat(),
+            'created_at': created_at,
+        }
+
+    # ========== DATABASE (worker thread) ==========
+
+    def _refresh(self, until):
+        is_leader = self.leader_lock.acquire()
+        times = list(
+            Schedule.objects.filter(is_active=True, next_trigger__lte=until)
+            .order_by().values_list('next_trigger', flat=True).distinct()
+        )
+        return is_leader, times
+
+    def _claim(self, now):
+        """
+        Lock up to batch_size due rows no other executor holds, move them to
+        their next fire time and commit.
+
+        Returns (rows claimed, rows to fire, new next_trigger values).
+        """
+        overdue = now - timedelta(seconds=self.misfire_grace)
+        with transaction.atomic():
+            rows = list(
+                Schedule.objects.select_for_update(skip_locked=True, of=('self',))
+                .filter(is_active=True, next_trigger__lte=now)
+                .order_by('next_trigger')
+                .values(*SCHEDULE_FIELDS)[:self.batch_size]
+            )
+            fired, updates = [], []
+            for row in rows:
+                scheduled_for = row['next_trigger']
+                if scheduled_for < overdue:
+                    self.stats['missed'] += 1
+                    next_trigger = schedule_next_fire_time(row, after=now, tz=self.tz)
+                else:
+                    row['last_triggered'] = scheduled_for
+                    next_trigger = schedule_next_fire_time(row, after=scheduled_for, tz=self.tz)
+                    fired.append(row)
+                updates.append((row['id'], row['last_triggered'], next_trigger, next_trigger is not None))
+            if updates:
+                # updated_at is left alone, so these writes do not look like
+                # user edits to run_leader_jobs()
+                update_from_values(Schedule, ['last_triggered', 'next_trigger', 'is_active'], updates)
+        self.stats['claims'] += 1
+        return len(rows), fired, [update[2] for update in updates if update[2]]
+
+    def _recompute(self, condition, now, last_id=None):
+        """
+        Leader only: set next_trigger of one batch of active schedules
+        matching condition and deactivate the ones that will not fire again.
+        Returns (id to continue after or None when done, new next_trigger
+        values).
+        """
+        queryset = Schedule.objects.filter(condition, is_active=True)
+        if last_id is not None:
+            queryset = queryset.filter(id__gt=last_id)
+        with transaction.atomic():
+            # Rows an executor is firing right now are skipped, they get
+            # their next_trigger from the claim
+            rows = list(
+                queryset.select_for_update(skip_locked=True, of=('self',))
+                .order_by('id').values(*SCHEDULE_FIELDS)[:self.batch_size]
+            )
+            updates = []
+            for row in rows:
+                next_trigger = schedule_next_fire_time(row, after=now, tz=self.tz)
+                if next_trigger is None or next_trigger != row['next_trigger']:
+                    updates.append((row['id'], next_trigger, next_trigger is not None))
+            if updates:
+                update_from_values(Schedule, ['next_trigger', 'is_active'], updates)
+        last_id = rows[-1]['id'] if len(rows) == self.batch_size else None
+        return last_id, [update[1] for update in updates if update[1]]
@@ -0,0 +1,48 @@
+from django.db import connections, router
+
+
+def update_from_values(model, field_names, rows, batch_size=5000, using=None):
+    """
+    UPDATE table SET f = v.f, ... FROM (VALUES (pk, f, ...), ...) v WHERE pk = v.pk
+
+    rows are (pk, value, ...) tuples in field_names order, written with one
+    statement per batch_size rows. Much cheaper than bulk_update(), which
+    builds a CASE WHEN expression per row and column. PostgreSQL and SQLite
+    3.33+; other backends fall back to bulk_update(). Like bulk_update() it
+    does not touch auto_now fields. Call inside a transaction to make the
+    batches atomic.
+    """
+    connection = connections[using or router.db_for_write(model)]
+    pk_field = model._meta.pk
+    fields = [model._meta.get_field(name) for name in field_names]
+
+    if connection.vendor not in ('postgresql', 'sqlite'):
+        objects = [model(**{pk_field.attname: row[0], **dict(zip((f.attname for f in fields), row[1:]))})
+                   for row in rows]
+        model.objects.using(connection.alias).bulk_update(objects, field_names, batch_size=batch_size)
+        return
+
+    quote = connection.ops.quote_name
+    table = quote(model._meta.db_table)
+    columns = [quote(field.column) for field in [pk_field] + fields]
+    if connection.vendor == 'postgresql':
+        # Typed placeholders, VALUES would otherwise default to text
+        row_sql = '(' + ', '.join(f'%s::{field.db_type(connection)}' for field in [pk_field] + fields) + ')'
+        assignments = ', '.join(f'{column} = v.{column}' for column in columns[1:])
+        template = (f'UPDATE {table} SET {assignments} FROM (VALUES {{rows}}) AS v ({", ".join(columns)}) '
+                    f'WHERE {table}.{columns[0]} = v.{columns[0]}')
+    else:
+        # VALUES columns are named column1, column2, ...
+        row_sql = '(' + ', '.join(['%s'] * len(columns)) + ')'
+        assignments = ', '.join(f'{column} = v.column{index + 2}' for index, column in enumerate(columns[1:]))
+        template = (f'UPDATE {table} SET {assignments} FROM (VALUES {{rows}}) AS v '
+                    f'WHERE {table}.{columns[0]} = v.column1')
+        batch_size = min(batch_size, connection.features.max_query_params // len(columns))
+
+    preps = [field.get_db_prep_value for field in [pk_field] + fields]
+    rows = list(rows)
+    with connection.cursor() as cursor:
+        for start in range(0, len(rows), batch_size):
+            batch = rows[start:start + batch_size]
+            params = [prep(value, connection) for row in batch for prep, value in zip(preps, row)]
+            cursor.execute(template.format(rows=', '.join([row_sql] * len(batch))), params)
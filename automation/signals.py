@@ -0,0 +1,20 @@
+# automation/signals.py
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import AutomationRule
+from .services.rule_index import RULE_FIELDS, rule_index
+
+
+@receiver(post_save, sender=AutomationRule)
+def reindex_saved_rule(sender, instance, **kwargs):
+    """Refile a rule in the rule index once the save is committed"""
+    values = {field: getattr(instance, field) for field in RULE_FIELDS + ('is_active',)}
+    transaction.on_commit(lambda: rule_index.rule_changed(values))
+
+
+@receiver(post_delete, sender=AutomationRule)
+def unindex_deleted_rule(sender, instance, **kwargs):
+    """Drop a deleted rule from the rule index once the delete is committed"""
+    values = {'id': instance.pk, 'house_id': instance.house_id}
+    transaction.on_commit(lambda: rule_index.rule_changed(values))
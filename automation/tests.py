@@ -1,3 +1,495 @@
-from django.test import TestCase
+import io
+import itertools
+from contextlib import redirect_stdout
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from unittest import skipUnless
+from zoneinfo import ZoneInfo
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer
+from django.core.exceptions import ValidationError
+from django.test import SimpleTestCase, TestCase
+from django.utils import timezone
+from automation.models import AutomationRule, Schedule
+from automation.services.action_executor import ActionExecutor
+from automation.services.causation import ChainGuard
+from automation.services.conditions import ConditionError, compile_conditions
+from automation.services.rate_limiter import MemoryTokenBucket, RuleRateLimiter
+from automation.services.recurrence import next_fire_time
+from automation.services.rule_index import rule_index
+from automation.services.schedule_executor import ScheduleExecutor
+from devices.models import ActionType, Component, ComponentType, Microcontroller
+from houses.models import House
+from users.models import User
 
-# Create your tests here.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UTC = dt_timezone.utc
+
+
+class NextFireTimeTests(SimpleTestCase):
+    """
+    next_fire_time() for each recurrence type
+    """
+
+    def next(self, recurrence, after, scheduled_time=time(7, 30), days_of_week=None, start_date=date(2026, 1, 1),
+             end_date=None, last_triggered=None, tz=UTC):
+        return next_fire_time(recurrence, scheduled_time, days_of_week, start_date, end_date, after,
+                              last_triggered=last_triggered, tz=tz)
+
+    def test_daily_fires_today_then_tomorrow(self):
+        self.assertEqual(self.next('daily', datetime(2026, 3, 2, 6, 0, tzinfo=UTC)),
+                         datetime(2026, 3, 2, 7, 30, tzinfo=UTC))
+        self.assertEqual(self.next('daily', datetime(2026, 3, 2, 7, 30, tzinfo=UTC)),
+                         datetime(2026, 3, 3, 7, 30, tzinfo=UTC))
+
+    def test_weekdays_skip_the_weekend(self):
+        # Friday 2026-03-06 after the firing -> Monday
+        self.assertEqual(self.next('weekdays', datetime(2026, 3, 6, 8, 0, tzinfo=UTC)),
+                         datetime(2026, 3, 9, 7, 30, tzinfo=UTC))
+        self.assertEqual(self.next('weekends', datetime(2026, 3, 2, 8, 0, tzinfo=UTC)),
+                         datetime(2026, 3, 7, 7, 30, tzinfo=UTC))
+
+    def test_custom_days_and_end_date(self):
+        after = datetime(2026, 3, 2, 8, 0, tzinfo=UTC)  # Monday
+        self.assertEqual(self.next('custom', after, days_of_week=[3]), datetime(2026, 3, 5, 7, 30, tzinfo=UTC))
+        self.assertIsNone(self.next('custom', after, days_of_week=[3], end_date=date(2026, 3, 4)))
+        self.assertIsNone(self.next('custom', after, days_of_week=[]))
+
+    def test_monthly_clamps_to_month_length(self):
+        self.assertEqual(self.next('monthly', datetime(2026, 2, 1, tzinfo=UTC), start_date=date(2026, 1, 31)),
+                         datetime(2026, 2, 28, 7, 30, tzinfo=UTC))
+
+    def test_once_fires_a_single_time(self):
+        after = datetime(2026, 3, 2, 6, 0, tzinfo=UTC)
+        self.assertEqual(self.next('once', after), datetime(2026, 3, 2, 7, 30, tzinfo=UTC))
+        self.assertIsNone(self.next('once', after, last_triggered=datetime(2026, 3, 1, 7, 30, tzinfo=UTC)))
+
+    def test_wall_clock_time_kept_across_dst(self):
+        berlin = ZoneInfo('Europe/Berlin')
+        # Clocks go forward on 2026-03-29: 07:30 local is 06:30 UTC before, 05:30 UTC after
+        self.assertEqual(self.next('daily', datetime(2026, 3, 28, 7, 0, tzinfo=UTC), tz=berlin),
+                         datetime(2026, 3, 29, 5, 30, tzinfo=UTC))
+
+
+@skipUnless(numpy, 'needs numpy')
+class NextFireTimesTests(SimpleTestCase):
+    """
+    ScheduleArrays.next_fire_times() agrees with next_fire_time() row for row
+    """
+
+    def test_matches_row_by_row(self):
+        from automation.services.recurrence_arrays import ScheduleArrays, from_micros
+
+        rows = [
+            (recurrence, scheduled_time, days_of_week, start_date, end_date, last_triggered)
+            for recurrence in ('once', 'daily', 'weekly', 'monthly', 'weekdays', 'weekends', 'custom')
+            for scheduled_time in (time(0, 0), time(2, 30), time(7, 30), time(23, 59, 59))
+            for days_of_week in ([], [0], [2, 6])
+            for start_date, end_date in itertools.product((date(2025, 1, 31), date(2026, 3, 30), None),
+                                                          (None, date(2026, 3, 29)))
+            for last_triggered in (None, datetime(2026, 3, 1, tzinfo=UTC))
+        ]
+        arrays = ScheduleArrays.from_rows(rows)
+        # Around the spring-forward and fall-back changes, and a month end
+        for tz, after in itertools.product(
+                (UTC, ZoneInfo('Europe/Berlin'), ZoneInfo('America/New_York')),
+                (datetime(2026, 3, 28, 23, 0, tzinfo=UTC), datetime(2026, 10, 25, 0, 45, tzinfo=UTC),
+                 datetime(2026, 1, 31, 12, 0, tzinfo=UTC))):
+            computed = arrays.next_fire_times(after, tz)
+            for row, value in zip(rows, computed):
+                expected = next_fire_time(*row[:5], after, last_triggered=row[5], tz=tz)
+                self.assertEqual(from_micros(value), expected, (tz, after, row))
+
+    def test_fire_times_between_matches_stepping(self):
+        from automation.services.recurrence_arrays import ScheduleArrays, from_micros
+
+        rows = [
+            (recurrence, scheduled_time, days_of_week, start_date, end_date, None)
+            for recurrence in ('once', 'daily', 'weekly', 'monthly', 'weekdays', 'custom')
+            for scheduled_time in (time(0, 30), time(2, 30), time(23, 0))
+            for days_of_week in ([], [1, 5])
+            for start_date, end_date in ((date(2026, 1, 31), None), (date(2026, 3, 10), date(2026, 4, 2)))
+        ]
+        start, end = datetime(2026, 3, 1, tzinfo=UTC), datetime(2026, 4, 15, tzinfo=UTC)
+        tz = ZoneInfo('Europe/Berlin')
+        indices, times = ScheduleArrays.from_rows(rows).fire_times_between(start, end, tz)
+        computed = sorted((int(index), from_micros(value)) for index, value in zip(indices, times))
+
+        expected = []
+        for index, row in enumerate(rows):
+            after, last_triggered = start - timedelta(microseconds=1), None
+            while True:
+                after = next_fire_time(*row[:5], after, last_triggered=last_triggered, tz=tz)
+                if after is None or after >= end:
+                    break
+                expected.append((index, after))
+                last_triggered = after
+        self.assertEqual(computed, sorted(expected))
+
+
+class ScheduleClaimTests(TestCase):
+    """
+    Due schedules are claimed once, across executors
+    """
+
+    def setUp(self):
+        user = User.objects.create_user(email='owner@example.com', password='secret',
+                                        first_name='Owner', last_name='User')
+        house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        component = Component.objects.create(
+            component_type=ComponentType.objects.create(name='light'), house=house, name='Lamp',
+            device_id='lamp-1', mac_address='AA:BB:CC:DD:EE:01',
+        )
+        self.now = timezone.now().replace(microsecond=0)
+        self.schedule = Schedule.objects.create(
+            name='Lamp on', house=house, component=component, created_by=user,
+            action_type=ActionType.objects.create(name='turn_on'),
+            scheduled_time=(self.now - timedelta(seconds=5)).time(), recurrence='daily',
+        )
+
+    def claim(self, next_trigger, executors=2):
+        Schedule.objects.filter(pk=self.schedule.pk).update(next_trigger=next_trigger)
+        return [ScheduleExecutor(channel_layer=object(), misfire_grace=60)._claim(self.now)
+                for _ in range(executors)]
+
+    def test_claimed_once_and_moved_to_next_day(self):
+        due = self.now - timedelta(seconds=5)
+        (claimed, fired, upcoming), second = self.claim(due)
+        self.assertEqual((claimed, len(fired)), (1, 1))
+        self.assertEqual(second, (0, [], []))
+        self.schedule.refresh_from_db()
+        self.assertEqual(self.schedule.last_triggered, due)
+        self.assertEqual(self.schedule.next_trigger, due + timedelta(days=1))
+        self.assertEqual(upcoming, [due + timedelta(days=1)])
+
+    def test_first_leader_round_recomputes_schedules_edited_while_down(self):
+        stale = self.now + timedelta(hours=1)
+        new_time = (self.now + timedelta(hours=2)).time()
+        Schedule.objects.filter(pk=self.schedule.pk).update(next_trigger=stale)
+        # Edited while no executor was leader
+        self.schedule.scheduled_time = new_time
+        self.schedule.save(update_fields=['scheduled_time'])
+
+        executor = ScheduleExecutor(channel_layer=object(), misfire_grace=60)
+        async_to_sync(executor.run_leader_jobs)()
+        self.schedule.refresh_from_db()
+        self.assertNotEqual(self.schedule.next_trigger, stale)
+        self.assertGreater(self.schedule.next_trigger, self.now)
+        self.assertEqual(timezone.localtime(self.schedule.next_trigger, executor.tz).time(), new_time)
+
+    def test_overdue_past_grace_is_skipped(self):
+        [(claimed, fired, _)] = self.claim(self.now - timedelta(minutes=10), executors=1)
+        self.assertEqual((claimed, fired), (1, []))
+        self.schedule.refresh_from_db()
+        self.assertIsNone(self.schedule.last_triggered)
+        self.assertGreater(self.schedule.next_trigger, self.now)
+
+
+class ScheduleConflictTests(TestCase):
+    """
+    Overlapping schedules of a component are found through the interval
+    tree, and rejected at save when SCHEDULER['CONFLICTS'] says so
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='secret',
+                                             first_name='Owner', last_name='User')
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        self.component = Component.objects.create(
+            component_type=ComponentType.objects.create(name='light'), house=self.house, name='Lamp',
+            device_id='lamp-1', mac_address='AA:BB:CC:DD:EE:01',
+        )
+        self.turn_on = ActionType.objects.create(name='turn_on')
+        self.turn_off = ActionType.objects.create(name='turn_off')
+
+    def schedule(self, action_type, scheduled_time, **fields):
+        return Schedule(name=f'{action_type.name} {scheduled_time}', house=self.house, component=self.component,
+                        created_by=self.user, action_type=action_type, scheduled_time=scheduled_time, **fields)
+
+    def test_tree_matches_brute_force(self):
+        import random
+        from automation.services.schedule_conflicts import IntervalTree
+
+        rng = random.Random(7)
+        intervals = [(start, start + rng.randint(1, 500), index)
+                     for index, start in enumerate(rng.randint(0, 10_000) for _ in range(300))]
+        tree = IntervalTree(intervals)
+        for _ in range(200):
+            start = rng.randint(-100, 10_100)
+            end = start + rng.randint(1, 800)
+            expected = sorted(item for item in intervals if item[0] < end and item[1] > start)
+            self.assertEqual(sorted(tree.overlapping(start, end)), expected)
+
+    def test_opposite_actions_in_the_same_window_are_rejected(self):
+        self.schedule(self.turn_on, time(18, 0), max_duration_minutes=120).save()
+        with self.settings(SCHEDULER={'CONFLICTS': 'reject'}):
+            with self.assertRaises(ValidationError):
+                self.schedule(self.turn_off, time(19, 0), recurrence='weekdays').save()
+            # Outside the window, on other days or in another date range
+            self.schedule(self.turn_off, time(20, 0)).save()
+            self.schedule(self.turn_off, time(19, 0), recurrence='custom', days_of_week=[]).save()
+            self.schedule(self.turn_off, time(19, 0), recurrence='once',
+                          end_date=timezone.localdate() - timedelta(days=3)).save()
+            # A duplicate is reported, not rejected
+            duplicate = self.schedule(self.turn_on, time(18, 30), max_duration_minutes=60)
+            duplicate.save()
+            self.assertEqual([conflict['kind'] for conflict in duplicate.conflicts], ['duplicate'])
+
+    def test_save_rejects_and_only_checks_timing_writes(self):
+        self.schedule(self.turn_on, time(18, 0)).save()
+        overlapping = self.schedule(self.turn_off, time(21, 0))
+        overlapping.save()
+        with self.settings(SCHEDULER={'CONFLICTS': 'reject'}):
+            overlapping.scheduled_time = time(18, 30)
+            with self.assertRaises(ValidationError):
+                overlapping.save(update_fields=['scheduled_time'])
+            with self.assertRaises(ValidationError):
+                self.schedule(self.turn_off, time(19, 0)).save()
+            # No overlap query for saves that leave the timing alone
+            with self.assertNumQueries(1):
+                overlapping.save(update_fields=['last_triggered', 'next_trigger'])
+            # Checked once when clean() already ran (admin forms)
+            overlapping.scheduled_time = time(22, 0)
+            overlapping.clean()
+            with self.assertNumQueries(1):
+                overlapping.save()
+        self.assertEqual(Schedule.objects.get(pk=overlapping.pk).scheduled_time, time(22, 0))
+
+    def test_window_wrapping_past_sunday_midnight(self):
+        self.schedule(self.turn_on, time(23, 0), recurrence='weekly', days_of_week=[6],
+                      max_duration_minutes=180).save()
+        late = self.schedule(self.turn_off, time(1, 0), recurrence='weekly', days_of_week=[0])
+        self.assertEqual([(conflict['kind'], conflict['at']) for conflict in late.find_conflicts()],
+                         [('conflict', 'Mon 01:00')])
+
+
+class ConditionCompileTests(SimpleTestCase):
+    """
+    trigger_conditions compile to predicates, malformed ones are rejected
+    """
+
+    def test_groups_ranges_and_time_windows(self):
+        predicate, keys = compile_conditions({'all': [
+            {'any': [{'component_id': 'lamp', 'value': 'on'}, {'not': {'component_id': 'door', 'value': 'closed'}}]},
+            {'component_id': 'sensor', 'attribute': 'value', 'operator': 'between', 'value': [18, 24]},
+            {'time_window': {'start': '22:00', 'end': '06:00', 'days': [0]}},
+        ]})
+        self.assertEqual(keys, {('lamp', 'power'), ('door', 'power'), ('sensor', 'value')})
+        monday_night = datetime(2026, 3, 2, 23, 0, tzinfo=UTC)
+        values = {('lamp', 'power'): 'off', ('door', 'power'): 'open', ('sensor', 'value'): 20}
+        self.assertTrue(predicate(values, monday_night))
+        # Past the window end, and on a Tuesday evening
+        self.assertFalse(predicate(values, monday_night + timedelta(hours=7)))
+        self.assertFalse(predicate(values, monday_night + timedelta(days=1)))
+        self.assertFalse(predicate({**values, ('sensor', 'value'): 'n/a'}, monday_night))
+        self.assertFalse(predicate({**values, ('door', 'power'): 'closed'}, monday_night))
+
+    def test_malformed_conditions_are_rejected(self):
+        for conditions in (
+                {},
+                {'time_window': {'start': '22:00', 'end': '06:00'}},
+                {'component_id': 'lamp', 'operator': 'matches', 'value': 'on'},
+                {'component_id': 'lamp', 'operator': 'between', 'value': [5, 1]},
+                {'all': []},
+                {'component_id': 'lamp', 'value': 'on', 'extra': 1},
+        ):
+            with self.assertRaises(ConditionError, msg=conditions):
+                compile_conditions(conditions)
+
+
+class RuleIndexTests(TestCase):
+    """
+    State updates are matched only against the rules reading the component
+    """
+
+    def setUp(self):
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        component_type = ComponentType.objects.create(name='sensor')
+        self.lamp, self.sensor = (
+            Component.objects.create(component_type=component_type, house=self.house, name=name,
+                                     device_id=name, mac_address=f'AA:BB:CC:DD:EE:{index:02X}')
+            for index, name in enumerate(('lamp', 'thermometer'))
+        )
+        rule_index.invalidate()
+        self.addCleanup(rule_index.invalidate)
+
+    def rule(self, name, conditions, trigger_type='device_state', priority=1, actions=()):
+        with self.captureOnCommitCallbacks(execute=True):
+            return AutomationRule.objects.create(name=name, house=self.house, trigger_type=trigger_type,
+                                                 trigger_conditions=conditions, priority=priority,
+                                                 actions=list(actions))
+
+    def match(self, component, delta):
+        return [rule.name for rule in rule_index.match(self.house.id, component.id, delta)]
+
+    def test_fires_referencing_rules_once_in_priority_order(self):
+        lamp_on = {'component_id': str(self.lamp.id), 'value': 'on'}
+        self.rule('low', lamp_on)
+        self.rule('high', lamp_on, priority=5)
+        self.rule('hot', {'component_id': str(self.sensor.id), 'operator': 'gt', 'value': 25},
+                  trigger_type='sensor_value')
+
+        self.assertEqual(self.match(self.lamp, {'power': 'on'}), ['high', 'low'])
+        # Still on: conditions did not become true again
+        self.assertEqual(self.match(self.lamp, {'power': 'on'}), [])
+        self.assertEqual(self.match(self.sensor, {'value': 20}), [])
+        self.assertEqual(self.match(self.sensor, {'value': 30}), ['hot'])
+
+    def test_saved_and_deleted_rules_are_refiled(self):
+        both = {'all': [{'component_id': str(self.lamp.id), 'value': 'on'},
+                        {'component_id': str(self.sensor.id), 'attribute': 'value', 'operator': 'lt', 'value': 10}]}
+        self.assertEqual(self.match(self.lamp, {'power': 'off'}), [])  # loads the house
+
+        rule = self.rule('cold and on', both)
+        self.assertEqual(self.match(self.sensor, {'value': 5}), [])
+        self.assertEqual(self.match(self.lamp, {'power': 'on'}), ['cold and on'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            rule.delete()
+        self.match(self.lamp, {'power': 'off'})
+        self.assertEqual(self.match(self.lamp, {'power': 'on'}), [])
+
+    def test_invalid_conditions_are_rejected_at_save(self):
+        with self.assertRaises(ValidationError):
+            self.rule('broken', {'component_id': str(self.lamp.id), 'operator': 'gt'})
+        self.assertFalse(AutomationRule.objects.exists())
+
+    def test_inactive_rules_and_unrelated_writes_skip_validation(self):
+        broken = {'component_id': str(self.lamp.id), 'operator': 'gt'}
+        rule = AutomationRule.objects.create(name='draft', house=self.house, trigger_type='device_state',
+                                             trigger_conditions=broken, is_active=False)
+        # Validated when it gets activated
+        rule.is_active = True
+        with self.assertRaises(ValidationError):
+            rule.save(update_fields=['is_active'])
+
+        rule = self.rule('lamp on', {'component_id': str(self.lamp.id), 'value': 'on'})
+        rule.trigger_conditions = broken
+        with self.assertNumQueries(1):
+            rule.save(update_fields=['last_triggered'])
+        # One compile and loop query when clean() already ran (admin forms)
+        rule.trigger_conditions = {'component_id': str(self.lamp.id), 'value': 'off'}
+        with self.assertNumQueries(2):
+            rule.clean()
+            rule.save()
+
+    def test_rule_loops_are_rejected_at_save(self):
+        lamp, sensor = str(self.lamp.id), str(self.sensor.id)
+        self.rule('lamp on -> sensor on', {'component_id': lamp, 'value': 'on'},
+                  actions=[{'component_id': sensor, 'action_name': 'turn_on'}])
+        # Reads the attribute the first rule's action does not set
+        self.rule('sensor hot -> lamp off', {'component_id': sensor, 'operator': 'gt', 'value': 25},
+                  trigger_type='sensor_value', actions=[{'component_id': lamp, 'action_name': 'turn_off'}])
+        with self.assertRaisesMessage(ValidationError, 'lamp on -> sensor on → sensor on -> lamp on'):
+            self.rule('sensor on -> lamp on', {'component_id': sensor, 'value': 'on'},
+                      actions=[{'component_id': lamp, 'action_name': 'turn_on'}])
+        # Unknown actions may set any attribute
+        with self.assertRaises(ValidationError):
+            self.rule('sensor hot -> lamp blink', {'component_id': sensor, 'operator': 'gt', 'value': 25},
+                      trigger_type='sensor_value', actions=[{'component_id': lamp, 'action_name': 'blink'},
+                                                            {'component_id': sensor, 'action_name': 'reset'}])
+        self.assertEqual(AutomationRule.objects.count(), 2)
+
+
+class ChainGuardTests(SimpleTestCase):
+    """
+    Rule chains are cut past the depth limit and bursts debounced
+    """
+
+    def setUp(self):
+        self.guard = ChainGuard(max_depth=3, debounce_seconds=2, cause_ttl=30, max_keys=100)
+        self.rule = AutomationRule(name='chained', trigger_type='device_state')
+
+    def test_depth_cutoff_and_reported_cause(self):
+        cause = self.guard.cause('lamp', {'trace_id': 'trace-1', 'causation_depth': '2'})
+        self.assertEqual(cause, {'trace_id': 'trace-1', 'causation_depth': 2})
+        self.assertTrue(self.guard.admit(self.rule, 'lamp', cause, now=0))
+        output = io.StringIO()
+        with redirect_stdout(output):
+            for _ in range(3):
+                self.assertFalse(self.guard.admit(self.rule, 'fan', {'trace_id': 'trace-1', 'causation_depth': 3},
+                                                  now=0))
+        self.assertEqual(self.guard.cut[self.rule.id], 3)
+        # Cut firings only bump the counter
+        self.assertEqual(output.getvalue(), '')
+
+    def test_debounce_per_rule_and_component(self):
+        cause = {'trace_id': 'trace-1', 'causation_depth': 0}
+        admitted = [self.guard.admit(self.rule, component, cause, now=now)
+                    for now, component in ((0, 'lamp'), (1, 'lamp'), (1, 'fan'), (2.5, 'lamp'))]
+        self.assertEqual(admitted, [True, False, True, True])
+        self.assertEqual(self.guard.debounced[self.rule.id], 1)
+
+
+class RuleRateLimiterTests(SimpleTestCase):
+    """
+    max_executions_per_hour is a token bucket: a full burst, then one firing
+    per 3600 / limit seconds
+    """
+
+    def test_burst_then_steady_refill(self):
+        limiter = RuleRateLimiter(backend='memory')
+        rule = AutomationRule(max_executions_per_hour=6)
+        start = 1_000_000.0
+        self.assertEqual([limiter.allow(rule, start) for _ in range(8)], [True] * 6 + [False] * 2)
+        # One token back every 10 minutes
+        self.assertFalse(limiter.allow(rule, start + 599))
+        self.assertTrue(limiter.allow(rule, start + 601))
+        self.assertEqual((limiter.allowed, limiter.suppressed[rule.id]), (7, 3))
+
+    def test_bucket_never_exceeds_capacity(self):
+        buckets = MemoryTokenBucket(max_keys=10)
+        self.assertTrue(buckets.take('rule', 2, 1.0, 0))
+        taken = [buckets.take('rule', 2, 1.0, 3600) for _ in range(3)]
+        self.assertEqual(taken, [True, True, False])
+
+
+class ActionExecutorTests(TestCase):
+    """
+    Rule actions go out as one device_commands frame per microcontroller
+    """
+
+    def setUp(self):
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        component_type = ComponentType.objects.create(name='light')
+        self.boards = [
+            Microcontroller.objects.create(house=self.house, name=f'board-{index}', firmware_version='1.0',
+                                           mac_address=f'AA:BB:CC:DD:EF:{index:02X}', is_approved=True)
+            for index in range(2)
+        ]
+        self.lights = [
+            Component.objects.create(component_type=component_type, house=self.house, name=f'Light {index}',
+                                     device_id=f'light-{index}', mac_address=f'AA:BB:CC:DD:EE:{index:02X}',
+                                     microcontroller=board)
+            for index, board in enumerate((self.boards[0], self.boards[0], self.boards[1], None))
+        ]
+        self.rule = AutomationRule.objects.create(
+            name='All off', house=self.house, trigger_type='manual',
+            actions=[{'component_id': str(light.id), 'action_name': 'turn_off'} for light in self.lights],
+        )
+
+    async def test_one_frame_per_board_and_aggregated_result(self):
+        layer = InMemoryChannelLayer()
+        channels = {}
+        for board in self.boards:
+            channels[board.id] = await layer.new_channel()
+            await layer.group_add(f'microcontroller_{board.id}', channels[board.id])
+
+        result = await ActionExecutor(channel_layer=layer).execute(
+            self.rule, {'trigger_type': 'manual'}, cause={'trace_id': 'trace-1', 'causation_depth': 1})
+
+        first, second = [await layer.receive(channels[board.id]) for board in self.boards]
+        self.assertEqual(first['type'], 'device_commands')
+        self.assertEqual([command['component_id'] for command in first['commands']],
+                         [str(light.id) for light in self.lights[:2]])
+        self.assertEqual([command['component_id'] for command in second['commands']], [str(self.lights[2].id)])
+        self.assertEqual({(command['trace_id'], command['causation_depth'])
+                          for command in first['commands'] + second['commands']}, {('trace-1', 2)})
+        self.assertFalse(result['success'])
+        self.assertEqual(result['microcontrollers'], 2)
+        self.assertEqual([action['success'] for action in result['actions_executed']], [True, True, True, False])
+        self.assertEqual(result['error_messages'], ['Component has no microcontroller'])
+        self.assertTrue(await AutomationRule.objects.filter(pk=self.rule.pk, last_triggered__isnull=False).aexists())
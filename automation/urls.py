@@ -0,0 +1,6 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('rate-limits/', views.rule_rate_limits, name='automation-rate-limits'),
+]
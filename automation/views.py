@@ -1,3 +1,43 @@
-from django.shortcuts import render
+from django.core.exceptions import ValidationError
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from .models import AutomationRule
+from .services.rate_limiter import RuleRateLimiter
 
-# Create your views here.
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def rule_rate_limits(request):
+    """
+    Firings suppressed by max_executions_per_hour this hour and the last one,
+    for the active rules of the user's houses (every house for staff). Only
+    rules with suppressed firings are listed.
+
+    Query parameters:
+        house   house id, must be one of the user's houses
+    """
+    rules = AutomationRule.objects.filter(is_active=True)
+    if not request.user.is_staff:
+        rules = rules.filter(house_id__in=request.user.house_memberships.values('house_id'))
+    house_id = request.query_params.get('house')
+    try:
+        if house_id:
+            rules = rules.filter(house_id=house_id)
+        rows = list(rules.values('id', 'name', 'house_id', 'max_executions_per_hour'))
+    except ValidationError:
+        return Response({'error': 'Invalid house id'}, status=status.HTTP_400_BAD_REQUEST)
+
+    counts = RuleRateLimiter.suppressed_counts([row['id'] for row in rows])
+    suppressed = []
+    for row in rows:
+        this_hour, last_hour = counts[row['id']]
+        if this_hour or last_hour:
+            suppressed.append({**row, 'suppressed_this_hour': this_hour, 'suppressed_last_hour': last_hour})
+    suppressed.sort(key=lambda row: (-row['suppressed_this_hour'], -row['suppressed_last_hour']))
+    return Response({
+        'suppressed_this_hour': sum(row['suppressed_this_hour'] for row in suppressed),
+        'suppressed_last_hour': sum(row['suppressed_last_hour'] for row in suppressed),
+        'rules': suppressed,
+    })
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import ComponentType, Component, Microcontroller, ActionType
 
 
@@ -232,10 +233,11 @@ class ActionTypeAdmin(admin.ModelAdmin):
     )
 
     def allowed_component_types_count(self, obj):
-        return obj.allowed_component_types.count()
+        return obj.allowed_component_types_total
     allowed_component_types_count.short_description = 'Allowed Component Types Count'
+    allowed_component_types_count.admin_order_field = 'allowed_component_types_total'
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
-        queryset = queryset.prefetch_related('allowed_component_types')
+        queryset = queryset.annotate(allowed_component_types_total=Count('allowed_component_types'))
         return queryset
\ No newline at end of file
@@ -6,7 +6,7 @@ from django.utils import timezone
 from django.core.cache import cache
 from asgiref.sync import sync_to_async
 from channels.layers import get_channel_layer
-from activities.models import ActivityLog
+from activities.services.activity_logger import ActivityLogger
 from devices.models import Component, ActionType
 
 class CommandBufferService:
@@ -93,27 +93,18 @@ class CommandBufferService:
         """
         Log the activity after successful ACK
         """
-        await sync_to_async(self._create_activity_log)(command_data, ack_data)
-    
-    def _create_activity_log(self, command_data, ack_data):
-        """
-        Create activity log entry
-        """
-        try:
-            ActivityLog.objects.create(
-                user_id=command_data.get('user_id'),
-                house_id=command_data['house_id'],
-                component_id=command_data['component_id'],
-                action_type_id=command_data['action_type_id'],
-                action_name=command_data.get('action_name', 'device_command'),
-                action_parameters=command_data.get('parameters', {}),
-                action_result=ack_data.get('result', {}),
-                log_level='info',
-                is_automated=False
-            )
-        except Exception as e:
-            print(f"Error creating activity log: {e}")
-    
+        await ActivityLogger.alog({
+            'user_id': command_data.get('user_id'),
+            'house_id': command_data['house_id'],
+            'component_id': command_data['component_id'],
+            'action_type_id': command_data.get('action_type_id'),
+            'action_name': command_data.get('action_name', 'device_command'),
+            'action_parameters': command_data.get('parameters', {}),
+            'action_result': ack_data.get('result', {}),
+            'log_level': 'info',
+            'is_automated': False,
+        })
+
     async def _notify_mobile_app(self, command_data, ack_data):
         """
         Notify mobile app about command completion
@@ -2,17 +2,36 @@ import json
 import uuid
 import time
 import traceback
+from asgiref.sync import sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ObjectDoesNotExist
 from django.utils import timezone
 from django.core.cache import cache
+from activities.services.activity_logger import ActivityLogger
+from activities.services.query_budget import query_budget_consumer
+from activities.services.usage_counter import UsageCounter
 
 User = get_user_model()
 
 
-class MobileAppConsumer(AsyncWebsocketConsumer):
+class ClientAddressMixin:
+    """
+    Client IP of a websocket connection, for the activity log
+    """
+
+    def _get_client_ip(self):
+        # Behind the Render proxy the client is the first X-Forwarded-For hop
+        for name, value in self.scope.get('headers', ()):
+            if name == b'x-forwarded-for':
+                return value.decode('latin-1').split(',')[0].strip() or None
+        client = self.scope.get('client')
+        return client[0] if client else None
+
+
+@query_budget_consumer
+class MobileAppConsumer(ClientAddressMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.house_id = self.scope['url_route']['kwargs']['house_id']
         self.user = self.scope['user']
@@ -71,6 +90,17 @@ class MobileAppConsumer(AsyncWebsocketConsumer):
                 }))
                 return
 
+            # Cache round trip, kept off the event loop
+            quota = await sync_to_async(UsageCounter.check_quota)(user_id=self.user.id, house_id=self.house_id)
+            if not quota['allowed']:
+                await self.send(text_data=json.dumps({
+                    'type': 'error',
+                    'command_id': command_id,
+                    'message': 'Monthly usage limit reached',
+                    'quota': quota,
+                }))
+                return
+
             # Send command to microcontroller group
             await self.channel_layer.group_send(
                 f'microcontroller_{component.microcontroller_id}',
@@ -86,6 +116,18 @@ class MobileAppConsumer(AsyncWebsocketConsumer):
                 }
             )
 
+            await ActivityLogger.alog_device_control(
+                user=self.user,
+                house=component.house,
+                component=component,
+                action_type=data.get('action_type'),
+                parameters=data.get('parameters', {}),
+                result={'success': True, 'device_status': 'pending'},
+                source='mobile_app',
+                request_id=command_id,
+                ip_address=self._get_client_ip(),
+            )
+
             await self.send(text_data=json.dumps({
                 'type': 'command_ack',
                 'command_id': command_id,
@@ -126,12 +168,16 @@ class MobileAppConsumer(AsyncWebsocketConsumer):
     def _get_component(self, component_id):
         from devices.models import Component
         try:
-            return Component.objects.get(id=component_id, house_id=self.house_id)
+            # house and type are read when the command is logged
+            return Component.objects.select_related('house', 'component_type').get(
+                id=component_id, house_id=self.house_id
+            )
         except Component.DoesNotExist:
             return None
 
 
-class MicrocontrollerConsumer(AsyncWebsocketConsumer):
+@query_budget_consumer
+class MicrocontrollerConsumer(ClientAddressMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.microcontroller_id = self.scope['url_route']['kwargs']['microcontroller_id']
         self.api_key = self.scope['url_route']['kwargs']['api_key']
@@ -208,6 +254,21 @@ class MicrocontrollerConsumer(AsyncWebsocketConsumer):
         except Exception as e:
             print(f"   Error sending command: {e}")
 
+    async def device_commands(self, event):
+        """
+        Several commands for this board in one frame (automation rule actions)
+        """
+        try:
+            commands = event['commands']
+            await self.send(text_data=json.dumps({
+                'type': 'device_commands',
+                'commands': commands,
+                'server_timestamp': timezone.now().isoformat()
+            }))
+            print(f"📤 Sent {len(commands)} commands to {self.microcontroller_id}")
+        except Exception as e:
+            print(f"   Error sending commands: {e}")
+
     async def _handle_auth(self, data):
         await self.send(text_data=json.dumps({
             'type': 'auth_response',
@@ -219,14 +280,39 @@ class MicrocontrollerConsumer(AsyncWebsocketConsumer):
     async def _handle_command_ack(self, data):
         command_id = data.get('command_id')
         status = data.get('status')
+        # ACKs are not billable, the command itself was counted when sent
+        await ActivityLogger.alog_microcontroller_activity(
+            self.microcontroller,
+            'command_ack',
+            data,
+            {'success': status != 'failed', 'acknowledged': True},
+            ip_address=self._get_client_ip(),
+            is_billable=False,
+        )
         print(f"✅ Command {command_id} acknowledged: {status}")
 
     async def _handle_device_status_update(self, data):
+        from devices.models import Component
+        from automation.services.action_executor import action_executor
         devices = data.get('devices', [])
         for device in devices:
             component_id = device.get('id')
             state = device.get('state')
-            await self._update_component_state(component_id, state)
+            delta = {'power': 'on' if state else 'off'}
+            # Sensors also report their reading
+            if 'value' in device:
+                delta['value'] = device['value']
+            fired, cause = await self._update_component_state(component_id, state, delta, device)
+            # Highest priority rule first
+            for rule in fired:
+                await action_executor.execute(
+                    rule,
+                    {'trigger_type': rule.trigger_type, 'conditions': rule.trigger_conditions,
+                     'trigger_value': delta, **cause},
+                    house=self.microcontroller.house,
+                    component=Component(id=component_id),
+                    cause=cause,
+                )
         print(f"📊 Device status update: {len(devices)} devices")
 
     async def _handle_heartbeat(self, data):
@@ -248,7 +334,8 @@ class MicrocontrollerConsumer(AsyncWebsocketConsumer):
         
         try:
             # Try to find the microcontroller by ID first
-            microcontroller = Microcontroller.objects.filter(
+            # house is needed to log the automation rules state updates trigger
+            microcontroller = Microcontroller.objects.select_related('house').filter(
                 id=self.microcontroller_id
             ).first()
             
@@ -295,16 +382,34 @@ class MicrocontrollerConsumer(AsyncWebsocketConsumer):
             print(f"   Heartbeat update error: {e}")
 
     @database_sync_to_async
-    def _update_component_state(self, component_id, state):
+    def _update_component_state(self, component_id, state, delta, report=None):
+        """
+        Store the new state and return the device_state / sensor_value rules
+        it triggers (only the ones reading this component are evaluated),
+        minus the ones cut off or debounced by the chain guard and the ones
+        over their max_executions_per_hour, with the cause of the report
+        """
         from devices.models import Component
+        from automation.services.causation import chain_guard
+        from automation.services.rate_limiter import rule_rate_limiter
+        from automation.services.rule_index import rule_index
         try:
-            Component.objects.filter(id=component_id).update(
+            updated = Component.objects.filter(id=component_id).update(
                 current_state={'power': 'on' if state else 'off'},
                 last_seen=timezone.now()
             )
         except Exception as e:
             print(f"   Component update error: {e}")
-
-    def _get_client_ip(self):
-        client = self.scope.get('client')
-        return client[0] if client else 'unknown'
\ No newline at end of file
+            return [], None
+        if not updated:
+            return [], None
+        try:
+            fired = rule_index.match(self.microcontroller.house_id, component_id, delta)
+            if not fired:
+                return [], None
+            cause = chain_guard.cause(component_id, report)
+            return [rule for rule in fired
+                    if chain_guard.admit(rule, component_id, cause) and rule_rate_limiter.allow(rule)], cause
+        except Exception as e:
+            print(f"   Rule matching error: {e}")
+            return [], None
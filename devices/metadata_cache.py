@@ -0,0 +1,96 @@
+import threading
+import time
+from collections import OrderedDict
+from django.conf import settings
+
+
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU with a per-entry TTL.
+
+    The TTL bounds staleness in other worker processes, which do not see the
+    signals fired where a row was saved.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=_MISSING):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class MetadataCache:
+    """
+    Process-local cache of ActionType (by name and id) and ComponentType (by
+    id), so hot paths like ActivityLogger resolve them without a SELECT.
+
+    Lookups that find nothing are cached as well. Both tables are tiny and
+    rarely written: any save/delete clears the whole map for that model (see
+    devices/signals.py).
+    """
+
+    def __init__(self, max_size=None, ttl=None):
+        config = getattr(settings, 'METADATA_CACHE', {})
+        max_size = max_size or config.get('MAX_SIZE', 1000)
+        ttl = ttl or config.get('TTL', 300)
+        self.action_types = LRUCache(max_size, ttl)
+        self.component_types = LRUCache(max_size, ttl)
+
+    def action_type_by_name(self, name):
+        return self._lookup(self.action_types, ('name', name), 'ActionType', name=name)
+
+    def action_type_by_id(self, pk):
+        return self._lookup(self.action_types, ('id', str(pk)), 'ActionType', pk=pk)
+
+    def component_type(self, pk):
+        return self._lookup(self.component_types, str(pk), 'ComponentType', pk=pk)
+
+    def invalidate_action_types(self):
+        self.action_types.clear()
+
+    def invalidate_component_types(self):
+        self.component_types.clear()
+
+    def _lookup(self, cache, key, model_name, **lookup):
+        instance = cache.get(key)
+        if instance is _MISSING:
+            from . import models
+            instance = getattr(models, model_name).objects.filter(**lookup).first()
+            cache.set(key, instance)
+            if instance is not None and model_name == 'ActionType':
+                # Warm the other key too
+                cache.set(('id', str(instance.pk)), instance)
+                cache.set(('name', instance.name), instance)
+        return instance
+
+
+metadata_cache = MetadataCache()
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.14 on 2026-10-19 01:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='component',
+            name='microcontroller',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='components', to='devices.microcontroller'),
+        ),
+    ]
@@ -1,6 +1,7 @@
 import uuid
 from django.db import models
 from houses.models import House
+from houses.mixins import FieldTrackerMixin
 import secrets  # Already imported at the top
 
 
@@ -20,7 +21,7 @@ class ComponentType(models.Model):
         return self.name
 
 
-class Component(models.Model):
+class Component(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = [
         ('online', 'Online'),
         ('offline', 'Offline'),
@@ -31,6 +32,9 @@ class Component(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     component_type = models.ForeignKey(ComponentType, on_delete=models.PROTECT, related_name='components')
     house = models.ForeignKey(House, on_delete=models.CASCADE, related_name='components')
+    # Board the component is wired to, commands go to its websocket group
+    microcontroller = models.ForeignKey('Microcontroller', on_delete=models.SET_NULL, null=True, blank=True,
+                                        related_name='components')
 
     # Identification
     name = models.CharField(max_length=100)
@@ -72,7 +76,7 @@ class Component(models.Model):
         return f"{self.name} ({self.device_id})"
 
 
-class Microcontroller(models.Model):
+class Microcontroller(FieldTrackerMixin, models.Model):
     STATUS_CHOICES = [
         ('online', 'Online'),
         ('offline', 'Offline'),
@@ -0,0 +1,38 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from ..models import Microcontroller
+
+
+class PresenceService:
+    """
+    Marks microcontrollers offline once they miss MISSED_HEARTBEATS heartbeats.
+
+    The consumer only ever refreshes last_heartbeat, so without this sweep a
+    board that loses power stays 'online' forever. Meant to run in a single
+    process (the scheduler leader), see run_scheduler.
+    """
+
+    @staticmethod
+    def missed_heartbeats():
+        return getattr(settings, 'SCHEDULER', {}).get('MISSED_HEARTBEATS', 3)
+
+    @classmethod
+    def sweep(cls, now=None):
+        """
+        Set overdue online/updating boards offline, returns how many changed
+        """
+        now = now or timezone.now()
+        live = Microcontroller.objects.filter(status__in=('online', 'updating'))
+        updated = 0
+        # One range scan on last_heartbeat per distinct interval (boards use a
+        # handful of firmware defaults)
+        intervals = live.order_by().values_list('heartbeat_interval', flat=True).distinct()
+        for interval in intervals:
+            cutoff = now - timedelta(seconds=interval * cls.missed_heartbeats())
+            updated += live.filter(
+                Q(last_heartbeat__lt=cutoff) | Q(last_heartbeat__isnull=True, updated_at__lt=cutoff),
+                heartbeat_interval=interval,
+            ).update(status='offline')
+        return updated
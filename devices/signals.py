@@ -0,0 +1,18 @@
+# devices/signals.py
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.dispatch import receiver
+from .models import ActionType, ComponentType
+from .metadata_cache import metadata_cache
+
+
+@receiver([post_save, post_delete], sender=ActionType)
+@receiver(m2m_changed, sender=ActionType.allowed_component_types.through)
+def invalidate_action_type_cache(sender, **kwargs):
+    """Drop cached ActionType lookups when one changes"""
+    metadata_cache.invalidate_action_types()
+
+
+@receiver([post_save, post_delete], sender=ComponentType)
+def invalidate_component_type_cache(sender, **kwargs):
+    """Drop cached ComponentType lookups when one changes"""
+    metadata_cache.invalidate_component_types()
@@ -1,3 +1,126 @@
-from django.test import TestCase
+from datetime import timedelta
+from channels.layers import get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from activities.models import ActivityLog
+from activities.services.activity_logger import async_log_writer
+from activities.services.usage_counter import UsageCounter
+from activities.testing import QueryBudgetTestMixin
+from devices.consumers import MobileAppConsumer
+from devices.models import ActionType, Component, ComponentType, Microcontroller
+from devices.services.presence import PresenceService
+from houses.models import House, HouseUser
+from users.models import User
 
-# Create your tests here.
+
+class DevicesQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """
+    Listing endpoints must run a fixed number of queries however many rows they show
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(email='admin@example.com', password='secret',
+                                                  first_name='Admin', last_name='User')
+        self.client.force_login(self.user)
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        HouseUser.objects.create(user=self.user, house=self.house, access_level='owner')
+        types = [ComponentType.objects.create(name=f'type-{index}') for index in range(5)]
+        for index in range(10):
+            Component.objects.create(
+                component_type=types[index % 5], house=self.house, name=f'Device {index}',
+                device_id=f'device-{index}', mac_address=f'AA:BB:CC:DD:EE:{index:02X}',
+            )
+        for index in range(10):
+            action_type = ActionType.objects.create(name=f'action-{index}')
+            action_type.allowed_component_types.set(types[:index % 5 + 1])
+
+    def test_component_list_api(self):
+        with self.assertQueryBudget('component-list', max_queries=4):
+            response = self.client.get('/api/components/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual({item['house_name'] for item in response.json()}, {'Test House'})
+
+    def test_action_type_changelist(self):
+        with self.assertQueryBudget('devices_actiontype_changelist', max_queries=8):
+            response = self.client.get('/admin/devices/actiontype/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<td class="field-allowed_component_types_count">5</td>',
+                            count=2, html=True)
+
+
+class PresenceSweepTests(TestCase):
+    """
+    Boards that miss MISSED_HEARTBEATS heartbeats are marked offline
+    """
+
+    def test_sweep_marks_only_overdue_boards_offline(self):
+        house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        now = timezone.now()
+        boards = {}
+        for name, seconds_ago in (('fresh', 100), ('stale', 200)):
+            boards[name] = Microcontroller.objects.create(
+                house=house, name=name, mac_address=f'AA:BB:CC:DD:EE:{len(boards):02X}', firmware_version='1.0',
+                status='online', heartbeat_interval=60, last_heartbeat=now - timedelta(seconds=seconds_ago),
+            )
+        self.assertEqual(PresenceService.sweep(now), 1)
+        statuses = dict(Microcontroller.objects.values_list('name', 'status'))
+        self.assertEqual(statuses, {'fresh': 'online', 'stale': 'offline'})
+
+
+class MobileAppConsumerTests(TestCase):
+    """
+    A device_command from the app reaches the board, is logged and acknowledged
+    """
+
+    def setUp(self):
+        self.user = User.objects.create_user(email='owner@example.com', password='secret',
+                                             first_name='Owner', last_name='User')
+        self.house = House.objects.create(name='Test House', address='1 Main St', house_code='TEST01')
+        HouseUser.objects.create(user=self.user, house=self.house, access_level='owner')
+        self.board = Microcontroller.objects.create(house=self.house, name='board', firmware_version='1.0',
+                                                    mac_address='AA:BB:CC:DD:EF:01', is_approved=True)
+        self.lamp = Component.objects.create(
+            component_type=ComponentType.objects.create(name='light'), house=self.house, name='Lamp',
+            device_id='lamp-1', mac_address='AA:BB:CC:DD:EE:01', microcontroller=self.board,
+        )
+
+    async def send_command(self):
+        communicator = WebsocketCommunicator(MobileAppConsumer.as_asgi(), f'/ws/house/{self.house.id}/',
+                                             headers=[(b'x-forwarded-for', b'203.0.113.7, 10.0.0.1')])
+        communicator.scope.update(user=self.user, url_route={'kwargs': {'house_id': str(self.house.id)}})
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.send_json_to({'type': 'device_command', 'component_id': str(self.lamp.id),
+                                         'action_name': 'turn_on'})
+        reply = await communicator.receive_json_from(timeout=5)
+        await communicator.disconnect()
+        return reply
+
+    async def test_device_command_is_sent_logged_and_acknowledged(self):
+        layer = get_channel_layer()
+        board_channel = await layer.new_channel()
+        await layer.group_add(f'microcontroller_{self.board.id}', board_channel)
+
+        ack = await self.send_command()
+
+        self.assertEqual(ack['type'], 'command_ack', ack)
+        sent = await layer.receive(board_channel)
+        self.assertEqual((sent['command']['command_id'], sent['command']['action_name']),
+                         (ack['command_id'], 'turn_on'))
+        await async_log_writer.flush()
+        log = await ActivityLog.objects.select_related('detail').filter(
+            action_name='device_control', user=self.user).afirst()
+        self.assertIsNotNone(log)
+        self.assertEqual(log.action_parameters['request_id'], ack['command_id'])
+        self.assertEqual(log.ip_address, '203.0.113.7')
+
+    @override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+                                           'LOCATION': 'consumer-quota-tests'}},
+                       USAGE_LIMITS={'free': {'user': 1, 'house': None}}, DEFAULT_SUBSCRIPTION_TIER='free',
+                       ENFORCE_USAGE_LIMITS=True)
+    async def test_command_over_quota_is_refused(self):
+        UsageCounter.record(user_id=self.user.id)
+        reply = await self.send_command()
+        self.assertEqual((reply['type'], reply['message']), ('error', 'Monthly usage limit reached'))
+        self.assertEqual(reply['quota']['exceeded'], ['user'])
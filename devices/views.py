@@ -1,5 +1,6 @@
 # ADD THIS IMPORT AT THE TOP
 from activities.services.activity_logger import ActivityLogger
+from activities.services.usage_counter import UsageCounter
 import time  # ADD THIS IMPORT
 from django.utils import timezone  # ADD THIS IMPORT
 
@@ -9,6 +10,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Component, ComponentType, Microcontroller, ActionType
+from .metadata_cache import metadata_cache
 from .serializers import (
     ComponentSerializer, ComponentTypeSerializer,
     MicrocontrollerSerializer, ActionTypeSerializer
@@ -25,7 +27,9 @@ class ComponentViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         # Only show components from houses the user has access to
         user_houses = self.request.user.house_memberships.values_list('house_id', flat=True)
-        return Component.objects.filter(house_id__in=user_houses)
+        return Component.objects.filter(house_id__in=user_houses).select_related(
+            'house', 'component_type', 'microcontroller'
+        )
 
     @action(detail=True, methods=['post'])
     def control(self, request, pk=None):
@@ -38,16 +42,23 @@ class ComponentViewSet(viewsets.ModelViewSet):
         try:
             # Get the component
             component = self.get_object()
+
+            # Usage limits come from cache counters, no COUNT over the logs
+            quota = UsageCounter.check_quota(user_id=request.user.id, house_id=component.house_id)
+            if not quota['allowed']:
+                return Response({
+                    'status': 'error',
+                    'message': 'Monthly usage limit reached',
+                    'quota': quota,
+                }, status=status.HTTP_429_TOO_MANY_REQUESTS)
+
             action_type_id = request.data.get('action_type_id')
             parameters = request.data.get('parameters', {})
 
             # Get the action type if provided
             action_type = None
             if action_type_id:
-                try:
-                    action_type = ActionType.objects.get(id=action_type_id)
-                except ActionType.DoesNotExist:
-                    pass
+                action_type = metadata_cache.action_type_by_id(action_type_id)
 
             # Get current state before change
             previous_state = component.current_state
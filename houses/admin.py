@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db.models import Count
 from .models import House, HouseUser
 
 
@@ -53,12 +54,13 @@ class HouseAdmin(admin.ModelAdmin):
 
     def get_queryset(self, request):
         queryset = super().get_queryset(request)
-        queryset = queryset.prefetch_related('house_users')
+        queryset = queryset.annotate(users_total=Count('house_users'))
         return queryset
 
     def users_count(self, obj):
-        return obj.house_users.count()
+        return obj.users_total
     users_count.short_description = 'Number of Users'
+    users_count.admin_order_field = 'users_total'
 
     actions = ['activate_houses', 'deactivate_houses']
 
@@ -0,0 +1,99 @@
+import copy
+from django.db import models
+
+
+class FieldTrackerMixin(models.Model):
+    """
+    Remembers the field values an instance was loaded with, so changes can be
+    detected without re-reading the row.
+
+    - get_dirty_fields() / has_changed() / previous() compare against the
+      snapshot taken in from_db (and refreshed after every save)
+    - save() on a loaded instance writes only the dirty fields (plus auto_now
+      fields, and fields that were deferred when loading but have been
+      assigned since) through update_fields, unless update_fields is given
+
+    Values changed by pre_save signal handlers are not part of the automatic
+    update_fields, set them in save() before calling super() instead.
+    """
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot_fields()
+        return instance
+
+    def _snapshot_fields(self, attnames=None):
+        loaded = self.__dict__.get('_loaded_values', {}) if attnames is not None else {}
+        deferred = self.get_deferred_fields()
+        for field in self._meta.concrete_fields:
+            if field.attname in deferred or (attnames is not None and field.attname not in attnames):
+                continue
+            value = getattr(self, field.attname)
+            # JSON values are mutable, keep a private copy to catch in-place edits
+            loaded[field.attname] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        self._loaded_values = loaded
+
+    def get_dirty_fields(self):
+        """
+        {field name: loaded value} for loaded fields whose value changed.
+        Empty for instances that were not loaded from the database.
+        """
+        loaded = self.__dict__.get('_loaded_values')
+        if loaded is None:
+            return {}
+        dirty = {}
+        for field in self._meta.concrete_fields:
+            if field.attname in loaded and getattr(self, field.attname) != loaded[field.attname]:
+                dirty[field.name] = loaded[field.attname]
+        return dirty
+
+    def _assigned_deferred_fields(self):
+        """
+        Fields deferred at load time that were assigned without being read,
+        so there is no loaded value to compare against
+        """
+        loaded = self.__dict__.get('_loaded_values', {})
+        return [field.name for field in self._meta.concrete_fields
+                if field.attname in self.__dict__ and field.attname not in loaded]
+
+    def has_changed(self, field_name):
+        return field_name in self.get_dirty_fields()
+
+    def previous(self, field_name):
+        """
+        Value of the field when the instance was loaded (or last saved)
+        """
+        field = self._meta.get_field(field_name)
+        return self.__dict__.get('_loaded_values', {}).get(field.attname)
+
+    @property
+    def is_tracked(self):
+        return '_loaded_values' in self.__dict__
+
+    def save(self, *args, **kwargs):
+        if (
+            self.is_tracked
+            and not self._state.adding
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+            and not args
+        ):
+            changed = list(self.get_dirty_fields()) + self._assigned_deferred_fields()
+            if changed:
+                auto_now = [
+                    field.name for field in self._meta.concrete_fields if getattr(field, 'auto_now', False)
+                ]
+                kwargs['update_fields'] = changed + [name for name in auto_now if name not in changed]
+        super().save(*args, **kwargs)
+        self._snapshot_fields(
+            None if kwargs.get('update_fields') is None
+            else {self._meta.get_field(name).attname for name in kwargs['update_fields']}
+        )
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using=using, fields=fields, from_queryset=from_queryset)
+        self._snapshot_fields(None if fields is None else {self._meta.get_field(name).attname for name in fields})
@@ -1,9 +1,10 @@
 import uuid
 from django.db import models
 from users.models import User
+from .mixins import FieldTrackerMixin
 
 
-class House(models.Model):
+class House(FieldTrackerMixin, models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=100)
     address = models.TextField()
@@ -33,7 +34,7 @@ class House(models.Model):
         return f"{self.name} ({self.house_code})"
 
 
-class HouseUser(models.Model):
+class HouseUser(FieldTrackerMixin, models.Model):
     ACCESS_LEVELS = [
         ('owner', 'Owner'),
         ('admin', 'Administrator'),
@@ -1,3 +1,77 @@
+from datetime import timedelta
 from django.test import TestCase
+from activities.testing import QueryBudgetTestMixin
+from houses.models import House, HouseUser
+from users.models import User
 
-# Create your tests here.
+
+class HouseAdminQueryBudgetTests(QueryBudgetTestMixin, TestCase):
+    """
+    The house changelist must not run a COUNT per row for users_count
+    """
+
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(email='admin@example.com', password='secret',
+                                                        first_name='Admin', last_name='User')
+        self.client.force_login(self.admin_user)
+        for index in range(10):
+            house = House.objects.create(name=f'House {index}', address=f'{index} Main St',
+                                         house_code=f'H{index:05d}')
+            member = User.objects.create_user(email=f'member{index}@example.com', password='secret',
+                                              first_name='Member', last_name=str(index))
+            HouseUser.objects.create(user=member, house=house)
+            HouseUser.objects.create(user=self.admin_user, house=house)
+
+    def test_changelist_query_count_does_not_grow_with_rows(self):
+        with self.assertQueryBudget('houses_house_changelist', max_queries=8):
+            response = self.client.get('/admin/houses/house/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '<td class="field-users_count">2</td>', count=10, html=True)
+
+
+class FieldTrackerTests(TestCase):
+    """
+    Loaded instances save only what changed, deferred fields included
+    """
+
+    def setUp(self):
+        self.house = House.objects.create(name='House', address='1 Main St', house_code='TRACK1')
+        # Older than any save below, to see auto_now move
+        House.objects.filter(pk=self.house.pk).update(updated_at=self.house.updated_at - timedelta(days=1))
+
+    def test_dirty_fields_and_previous_values(self):
+        house = House.objects.get(pk=self.house.pk)
+        self.assertEqual(house.get_dirty_fields(), {})
+        house.name = 'Renamed'
+        self.assertEqual(house.get_dirty_fields(), {'name': 'House'})
+        self.assertTrue(house.has_changed('name'))
+        self.assertEqual(house.previous('name'), 'House')
+        house.save()
+        self.assertEqual(house.get_dirty_fields(), {})
+        self.assertEqual(house.previous('name'), 'Renamed')
+
+    def test_save_writes_dirty_fields_and_auto_now_only(self):
+        house = House.objects.get(pk=self.house.pk)
+        stale = house.updated_at
+        # Changed behind the instance's back, must survive the save
+        House.objects.filter(pk=house.pk).update(address='2 Side St')
+        house.name = 'Renamed'
+        with self.assertNumQueries(1):
+            house.save()
+        row = House.objects.get(pk=house.pk)
+        self.assertEqual((row.name, row.address), ('Renamed', '2 Side St'))
+        self.assertGreater(row.updated_at, stale)
+
+    def test_assigned_deferred_fields_are_saved(self):
+        house = House.objects.only('name').get(pk=self.house.pk)
+        house.name = 'Renamed'
+        house.address = 'New address'
+        house.save()
+        row = House.objects.get(pk=house.pk)
+        self.assertEqual((row.name, row.address), ('Renamed', 'New address'))
+
+        # Only the deferred field assigned
+        house = House.objects.only('name').get(pk=self.house.pk)
+        house.address = 'Newer address'
+        house.save()
+        self.assertEqual(House.objects.get(pk=house.pk).address, 'Newer address')
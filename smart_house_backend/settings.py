@@ -125,6 +125,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so session/auth queries count towards the request budget
+    'activities.middleware.QueryBudgetMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -414,6 +416,117 @@ else:
     }
     print(f"⚠️  CHANNELS: Using InMemoryChannelLayer (Redis unavailable: REDIS_URL={REDIS_URL})")
 
+# ============================================
+# USAGE LIMITS (billable activity per calendar month)
+# ============================================
+
+# None means unlimited. Counters are kept in the cache, see activities/services/usage_counter.py
+USAGE_LIMITS = {
+    'free': {'user': 3000, 'house': 10000},
+    'basic': {'user': 20000, 'house': 60000},
+    'premium': {'user': 100000, 'house': 300000},
+    'enterprise': {'user': None, 'house': None},
+}
+DEFAULT_SUBSCRIPTION_TIER = os.environ.get('DEFAULT_SUBSCRIPTION_TIER', 'free')
+
+# When False quota checks only report usage, nothing is blocked
+ENFORCE_USAGE_LIMITS = os.environ.get('ENFORCE_USAGE_LIMITS', 'False').lower() in ('true', '1', 'yes')
+
+# ============================================
+# SECURITY DETECTOR (streaming SecurityEvent rules)
+# ============================================
+
+# BACKEND 'cache' shares the sliding windows between workers through Redis,
+# 'memory' keeps them per process (LRU bounded by MAX_KEYS).
+# RULES overrides window/threshold/severity per rule, see
+# activities/services/security_detector.py for the defaults.
+SECURITY_DETECTOR = {
+    'ENABLED': os.environ.get('SECURITY_DETECTOR_ENABLED', 'True').lower() in ('true', '1', 'yes'),
+    'BACKEND': os.environ.get('SECURITY_DETECTOR_BACKEND', 'cache'),
+    'MAX_KEYS': int(os.environ.get('SECURITY_DETECTOR_MAX_KEYS', 10000)),
+    'RULES': {},
+}
+
+# ============================================
+# ASYNC ACTIVITY LOGGING (ActivityLogger.alog_*)
+# ============================================
+
+# Entries are written in batches of up to BATCH_SIZE or every FLUSH_INTERVAL
+# seconds; beyond MAX_QUEUE pending entries new ones are dropped.
+ACTIVITY_LOG_ASYNC = {
+    'BATCH_SIZE': int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 500)),
+    'FLUSH_INTERVAL': float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 0.25)),
+    'MAX_QUEUE': int(os.environ.get('ACTIVITY_LOG_MAX_QUEUE', 10000)),
+}
+
+# ============================================
+# QUERY BUDGETS (activities.middleware.QueryBudgetMiddleware)
+# ============================================
+
+# Queries / database time per request or consumer message. VIEWS overrides
+# the defaults by URL name or consumer class name, either a query count or
+# {'queries': n, 'time_ms': ms}. RAISE turns overruns into errors instead of
+# warnings, HEADER adds X-Query-Count / X-Query-Time-Ms to responses.
+QUERY_BUDGET = {
+    'ENABLED': os.environ.get('QUERY_BUDGET_ENABLED', 'True').lower() in ('true', '1', 'yes'),
+    'DEFAULT_QUERIES': int(os.environ.get('QUERY_BUDGET_DEFAULT_QUERIES', 30)),
+    'DEFAULT_TIME_MS': int(os.environ.get('QUERY_BUDGET_DEFAULT_TIME_MS', 500)),
+    'VIEWS': {
+        'MobileAppConsumer': 5,
+        'MicrocontrollerConsumer': 5,
+    },
+    'RAISE': os.environ.get('QUERY_BUDGET_RAISE', 'False').lower() in ('true', '1', 'yes'),
+    'HEADER': DEBUG,
+}
+
+# ============================================
+# SCHEDULER (python manage.py run_scheduler)
+# ============================================
+
+# TIME_ZONE is the zone Schedule.scheduled_time is read in. Each executor
+# keeps the fire times due within HORIZON seconds in memory, reloads every
+# REFRESH_INTERVAL seconds, claims due schedules BATCH_SIZE at a time and
+# skips firings more than MISFIRE_GRACE seconds late. Any number of
+# run_scheduler processes can share the work; the one holding the leader
+# advisory lock also marks microcontrollers offline after MISSED_HEARTBEATS
+# heartbeats, checking every PRESENCE_SWEEP_INTERVAL seconds. CONFLICTS is
+# what saving a schedule that overlaps another one on the same component
+# with a different action does: 'reject', 'warn' or 'off'.
+SCHEDULER = {
+    'TIME_ZONE': os.environ.get('SCHEDULER_TIME_ZONE', TIME_ZONE),
+    'HORIZON': int(os.environ.get('SCHEDULER_HORIZON', 300)),
+    'REFRESH_INTERVAL': int(os.environ.get('SCHEDULER_REFRESH_INTERVAL', 15)),
+    'MISFIRE_GRACE': int(os.environ.get('SCHEDULER_MISFIRE_GRACE', 60)),
+    'BATCH_SIZE': int(os.environ.get('SCHEDULER_BATCH_SIZE', 1000)),
+    'PRESENCE_SWEEP_INTERVAL': int(os.environ.get('SCHEDULER_PRESENCE_SWEEP_INTERVAL', 60)),
+    'MISSED_HEARTBEATS': int(os.environ.get('SCHEDULER_MISSED_HEARTBEATS', 3)),
+    'CONFLICTS': os.environ.get('SCHEDULER_CONFLICTS', 'warn'),
+}
+
+# ============================================
+# RULE ENGINE (device_state / sensor_value AutomationRules)
+# ============================================
+
+# Each process keeps the rule index of up to MAX_HOUSES houses and looks for
+# rule changes made by other processes every CHECK_INTERVAL seconds.
+# Compiled trigger_conditions are cached for PREDICATE_CACHE_SIZE rule versions.
+# max_executions_per_hour is enforced with token buckets kept per process
+# (RATE_LIMIT_BACKEND 'memory', at most RATE_LIMIT_MAX_KEYS rules) or shared
+# by all workers through Redis ('redis'). Rules fired by the state changes
+# other rules' commands cause are cut off past MAX_CHAIN_DEPTH, a command's
+# cause is attached to its component for CAUSATION_TTL seconds, and a rule
+# fires at most once per DEBOUNCE_SECONDS for the same component.
+RULE_ENGINE = {
+    'MAX_HOUSES': int(os.environ.get('RULE_ENGINE_MAX_HOUSES', 1000)),
+    'CHECK_INTERVAL': int(os.environ.get('RULE_ENGINE_CHECK_INTERVAL', 5)),
+    'PREDICATE_CACHE_SIZE': int(os.environ.get('RULE_ENGINE_PREDICATE_CACHE_SIZE', 50000)),
+    'RATE_LIMIT_BACKEND': os.environ.get('RULE_ENGINE_RATE_LIMIT_BACKEND', 'memory'),
+    'RATE_LIMIT_MAX_KEYS': int(os.environ.get('RULE_ENGINE_RATE_LIMIT_MAX_KEYS', 100000)),
+    'MAX_CHAIN_DEPTH': int(os.environ.get('RULE_ENGINE_MAX_CHAIN_DEPTH', 5)),
+    'CAUSATION_TTL': int(os.environ.get('RULE_ENGINE_CAUSATION_TTL', 30)),
+    'DEBOUNCE_SECONDS': float(os.environ.get('RULE_ENGINE_DEBOUNCE_SECONDS', 2)),
+}
+
 # ============================================
 # SECURITY SETTINGS - FIXED FOR RENDER (NO REDIRECT LOOP)
 # ============================================
@@ -44,6 +44,7 @@ urlpatterns = [
     path('api/users/', include('users.urls')),          # Keep your existing users URLs  
     path('api/houses/', include('houses.urls')),        # Keep your existing houses URLs
     path('api/activities/', include('activities.urls')), # Keep your existing activities URLs
+    path('api/automation/', include('automation.urls')),
     
     # Authentication (if you have separate auth endpoints)
     path('api/auth/', include('users.urls')),           # Or your auth endpoints
@@ -4,7 +4,9 @@ import uuid
 from django.contrib.auth.signals import user_logged_in, user_logged_out, user_login_failed
 from django.dispatch import receiver
 from django.utils import timezone
-from activities.models import ActivityLog
+from activities.services.deferred_logger import deferred_logger
+from activities.services.security_detector import security_detector
+from .views import get_client_ip
 
 @receiver(user_logged_in)
 def log_user_login(sender, request, user, **kwargs):
@@ -17,13 +19,13 @@ def log_user_login(sender, request, user, **kwargs):
     # Calculate duration after the operation
     duration_ms = int((time.time() - start_time) * 1000)
     
-    ActivityLog.objects.create(
+    deferred_logger.log(
         user=user,
         action_name='user_login',
         action_parameters={
             'user_id': str(user.id),
             'user_email': user.email,
-            'ip_address': request.META.get('REMOTE_ADDR', 'unknown'),
+            'ip_address': get_client_ip(request) or 'unknown',
             'user_agent': request.META.get('HTTP_USER_AGENT', 'unknown'),
         },
         action_result={
@@ -32,7 +34,7 @@ def log_user_login(sender, request, user, **kwargs):
         },
         log_level='info',
         source='web_admin',
-        ip_address=request.META.get('REMOTE_ADDR'),
+        ip_address=get_client_ip(request),
         user_agent=request.META.get('HTTP_USER_AGENT', ''),
         request_path=request.get_full_path(),
         # Duration tracking
@@ -43,7 +45,6 @@ def log_user_login(sender, request, user, **kwargs):
         device_platform='web',
         is_billable=False,
     )
-    print(f"✅ Login logged: {user.email} (took {duration_ms}ms)")
 
 @receiver(user_logged_out)
 def log_user_logout(sender, request, user, **kwargs):
@@ -57,13 +58,13 @@ def log_user_logout(sender, request, user, **kwargs):
         # Get session ID if available
         session_id = request.session.session_key if hasattr(request, 'session') else ''
         
-        ActivityLog.objects.create(
+        deferred_logger.log(
             user=user,
             action_name='user_logout',
             action_parameters={
                 'user_id': str(user.id),
                 'user_email': user.email,
-                'ip_address': request.META.get('REMOTE_ADDR', 'unknown'),
+                'ip_address': get_client_ip(request) or 'unknown',
             },
             action_result={
                 'success': True,
@@ -71,7 +72,7 @@ def log_user_logout(sender, request, user, **kwargs):
             },
             log_level='info',
             source='web_admin',
-            ip_address=request.META.get('REMOTE_ADDR'),
+            ip_address=get_client_ip(request),
             user_agent=request.META.get('HTTP_USER_AGENT', ''),
             request_path=request.get_full_path(),
             # Duration tracking
@@ -82,11 +83,16 @@ def log_user_logout(sender, request, user, **kwargs):
             device_platform='web',
             is_billable=False,
         )
-        print(f"✅ Logout logged: {user.email} (took {duration_ms}ms)")
 
 @receiver(user_login_failed)
-def log_failed_login(sender, credentials, request, **kwargs):
-    """Log when a user fails to log in"""
+def log_failed_login(sender, credentials, request=None, **kwargs):
+    """
+    Log when a user fails to log in. This is the one place failed logins
+    (admin and API alike) reach the security detector.
+    """
+    if request is None:
+        # authenticate() called outside a request (shell, tests)
+        return
     start_time = time.time()
     
     email = credentials.get('email', 'unknown') or credentials.get('username', 'unknown')
@@ -97,12 +103,12 @@ def log_failed_login(sender, credentials, request, **kwargs):
     # Generate session ID for failed attempt
     session_id = str(uuid.uuid4())
     
-    ActivityLog.objects.create(
+    deferred_logger.log(
         user=None,
         action_name='user_login_failed',
         action_parameters={
             'attempted_email': email,
-            'ip_address': request.META.get('REMOTE_ADDR', 'unknown'),
+            'ip_address': get_client_ip(request) or 'unknown',
             'user_agent': request.META.get('HTTP_USER_AGENT', 'unknown'),
         },
         action_result={
@@ -111,7 +117,7 @@ def log_failed_login(sender, credentials, request, **kwargs):
         },
         log_level='security',
         source='web_admin',
-        ip_address=request.META.get('REMOTE_ADDR'),
+        ip_address=get_client_ip(request),
         user_agent=request.META.get('HTTP_USER_AGENT', ''),
         request_path=request.get_full_path(),
         # Duration tracking
@@ -122,4 +128,10 @@ def log_failed_login(sender, credentials, request, **kwargs):
         device_platform='web',
         is_billable=False,
     )
-    print(f"⚠️ Failed login logged: {email} (took {duration_ms}ms)")
\ No newline at end of file
+    security_detector.failed_login(
+        ip_address=get_client_ip(request),
+        email=email,
+        user_agent=request.META.get('HTTP_USER_AGENT', ''),
+        request_path=request.get_full_path(),
+        session_id=session_id,
+    )
\ No newline at end of file
@@ -1,3 +1,29 @@
 from django.test import TestCase
+from activities.services.security_detector import MemoryWindowCounter, security_detector
+from users.models import User
 
-# Create your tests here.
+
+class FailedLoginDetectionTests(TestCase):
+    """
+    A failed API login is counted once by the security detector, per client IP
+    """
+
+    def setUp(self):
+        User.objects.create_user(email='owner@example.com', password='secret',
+                                 first_name='Owner', last_name='User')
+        counter = security_detector.counter
+        self.addCleanup(setattr, security_detector, 'counter', counter)
+        security_detector.counter = MemoryWindowCounter(max_keys=100)
+
+    def hits(self, key):
+        return len(security_detector.counter._windows.get(key, ()))
+
+    def test_bad_login_counts_once_for_the_forwarded_ip(self):
+        response = self.client.post('/api/auth/token/', {'email': 'owner@example.com', 'password': 'wrong'},
+                                    content_type='application/json',
+                                    HTTP_X_FORWARDED_FOR='203.0.113.9, 10.0.0.1', REMOTE_ADDR='10.0.0.1')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.hits('failed_login_ip:203.0.113.9'), 1)
+        self.assertEqual(self.hits('failed_login_email:owner@example.com'), 1)
+        # Not the proxy address every client shares
+        self.assertEqual(self.hits('failed_login_ip:10.0.0.1'), 0)